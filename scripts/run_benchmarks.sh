@@ -0,0 +1,36 @@
+#!/bin/bash
+#
+# Micro-benchmarks of the per-message hot paths of the Python services
+# (services/*/benchmarks, pytest-benchmark). Results are stored per service
+# and machine in services/<service>/.benchmarks.
+#
+#   scripts/run_benchmarks.sh            run and print the results
+#   scripts/run_benchmarks.sh save       run and save the results as the baseline
+#   scripts/run_benchmarks.sh compare    run and compare with the latest baseline,
+#                                        failing if a benchmark's fastest round is
+#                                        MAX_REGRESSION (default 20%) or more slower
+#
+# Needs pytest and pytest-benchmark. Compare on the same, otherwise idle,
+# machine the baseline was saved on.
+
+set -e
+
+cd "$(dirname "$0")/.."
+
+mode=${1:-run}
+max_regression=${MAX_REGRESSION:-20%}
+status=0
+
+for service in api_gateway email_service template_service; do
+    echo "=== $service ==="
+    args=(benchmarks -o addopts="" -p no:cacheprovider --benchmark-only --benchmark-sort=name)
+    case $mode in
+        run) ;;
+        save) args+=(--benchmark-save=baseline) ;;
+        compare) args+=("--benchmark-compare=*_baseline" --benchmark-compare-fail=min:$max_regression) ;;
+        *) echo "usage: $0 [run|save|compare]" >&2; exit 2 ;;
+    esac
+    (cd "services/$service" && python -m pytest "${args[@]}") || status=1
+done
+
+exit $status
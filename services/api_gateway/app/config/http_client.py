@@ -0,0 +1,114 @@
+# ============================================
+# api-gateway/app/config/http_client.py
+# ============================================
+import httpx
+from typing import Dict
+from app.config.settings import settings
+from app.services.metrics import HTTP_POOL_CONNECTIONS, HTTP_POOL_WAITING_REQUESTS
+
+from app.utils.logger import logger
+
+
+class HTTPClientManager:
+    """
+    Application-scoped, pooled HTTP clients, one per upstream service.
+
+    Clients are opened in the lifespan handler and shared by every request so
+    TCP (and TLS/DNS) setup is paid once per connection instead of once per
+    cache miss.
+    """
+
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _upstreams(self) -> Dict[str, dict]:
+        return {
+            "user": {
+                "base_url": settings.USER_SERVICE_URL,
+                "timeout": settings.USER_SERVICE_TIMEOUT,
+            },
+            "template": {
+                "base_url": settings.TEMPLATE_SERVICE_URL,
+                "timeout": settings.TEMPLATE_SERVICE_TIMEOUT,
+            },
+        }
+
+    def _http2_enabled(self) -> bool:
+        if not settings.HTTP2_ENABLED:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed, using HTTP/1.1")
+            return False
+        return True
+
+    def _build_client(self, name: str) -> httpx.AsyncClient:
+        upstream = self._upstreams()[name]
+        return httpx.AsyncClient(
+            base_url=upstream["base_url"],
+            timeout=httpx.Timeout(upstream["timeout"], connect=settings.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            http2=self._http2_enabled(),
+        )
+
+    async def connect(self):
+        """Open one pooled client per upstream"""
+        for name in self._upstreams():
+            if name not in self.clients:
+                self.clients[name] = self._build_client(name)
+        logger.info(f"HTTP client pools opened for: {', '.join(self.clients)}")
+
+    async def disconnect(self):
+        """Close all pooled clients"""
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+        logger.info("HTTP client pools closed")
+
+    def get_client(self, name: str) -> httpx.AsyncClient:
+        """
+        Get the shared client for an upstream, opening it lazily when the
+        lifespan handler did not run (e.g. in scripts or tests)
+        """
+        client = self.clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build_client(name)
+            self.clients[name] = client
+        return client
+
+    def pool_stats(self, name: str) -> Dict[str, int]:
+        """Active, idle and waiting counts for an upstream's connection pool"""
+        stats = {"active": 0, "idle": 0, "waiting": 0}
+        client = self.clients.get(name)
+        # httpx does not expose pool usage publicly, so read it from the
+        # underlying httpcore pool and degrade to zeros if that changes.
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        if pool is None:
+            return stats
+
+        for connection in list(getattr(pool, "connections", [])):
+            if connection.is_idle():
+                stats["idle"] += 1
+            else:
+                stats["active"] += 1
+        stats["waiting"] = sum(
+            1 for request in list(getattr(pool, "_requests", []))
+            if getattr(request, "connection", None) is None
+        )
+        return stats
+
+    def update_pool_metrics(self):
+        """Refresh the pool usage gauges, called when metrics are scraped"""
+        for name in self._upstreams():
+            stats = self.pool_stats(name)
+            HTTP_POOL_CONNECTIONS.labels(upstream=name, state="active").set(stats["active"])
+            HTTP_POOL_CONNECTIONS.labels(upstream=name, state="idle").set(stats["idle"])
+            HTTP_POOL_WAITING_REQUESTS.labels(upstream=name).set(stats["waiting"])
+
+
+http_client_manager = HTTPClientManager()
@@ -1,36 +1,79 @@
 # ============================================
 # api-gateway/app/config/rabbitmq.py
 # ============================================
-import json
+import time
+import asyncio
+import itertools
 import aio_pika
-from typing import Optional
+from aio_pika.exceptions import DeliveryError, PublishError
+from typing import Iterator, List, Optional, Set
 from app.config.settings import settings
+from app.services.metrics import (
+    RABBITMQ_CONFIRM_LATENCY_SECONDS,
+    RABBITMQ_CONFIRM_WINDOW_IN_FLIGHT,
+    RABBITMQ_CONFIRM_WINDOW_SIZE,
+    RABBITMQ_CONFIRMS_TOTAL,
+    RABBITMQ_MESSAGE_BYTES,
+)
+from app.utils import codec
 
 from app.utils.logger import logger
 
 
+EXCHANGE_NAME = "notifications.direct"
+# Queues the gateway publishes to, declared and bound up front
+QUEUES = ("email.queue", "push.queue", "failed.queue")
+# Queues whose consumers negotiate the body format, the rest get JSON
+CODEC_QUEUES = ("email.queue",)
+
+# email.queue and push.queue were declared as plain FIFO queues and queue
+# arguments can't change once declared. Their messages now go to priority
+# queues under new names, bound to the same routing keys. The old queues are
+# unbound at connect and their consumers drain what is left in them.
+MAX_PRIORITY = 10
+PRIORITY_QUEUES = {
+    "email.queue": "email.priority.queue",
+    "push.queue": "push.priority.queue",
+}
+
 
 class RabbitMQManager:
     def __init__(self):
         self.connection: Optional[aio_pika.Connection] = None
+        # Used for topology declarations, publishes go through the channel pool
         self.channel: Optional[aio_pika.Channel] = None
+        self.publish_channels: List[aio_pika.Channel] = []
+        self._channel_cycle: Optional[Iterator[aio_pika.Channel]] = None
+        # Bounds publishes that are written but not yet confirmed by the broker
+        self._confirm_window = asyncio.Semaphore(settings.RABBITMQ_CONFIRM_WINDOW)
+        self._in_flight = 0
+        # Queues whose declaration and binding are known to exist on the broker
+        self._declared_queues: Set[str] = set()
+        self._topology_lock = asyncio.Lock()
 
     async def connect(self):
         """Establish connection to RabbitMQ"""
         try:
             connection_url = f"amqp://{settings.RABBITMQ_USER}:{settings.RABBITMQ_PASSWORD}@{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}/{settings.RABBITMQ_VHOST}"
             self.connection = await aio_pika.connect_robust(connection_url)
+            self.connection.reconnect_callbacks.add(self._on_reconnect)
             self.channel = await self.connection.channel()
+            # Channels are shared, not checked out: publishes on one channel are
+            # pipelined and their confirms are matched back by delivery tag.
+            # Without on_return_raises a returned (unroutable) publish would
+            # resolve its confirm as if the broker had taken it.
+            self.publish_channels = [
+                await self.connection.channel(
+                    publisher_confirms=settings.RABBITMQ_PUBLISHER_CONFIRMS,
+                    on_return_raises=settings.RABBITMQ_PUBLISHER_CONFIRMS,
+                )
+                for _ in range(settings.RABBITMQ_CHANNEL_POOL_SIZE)
+            ]
+            self._channel_cycle = itertools.cycle(self.publish_channels)
+            RABBITMQ_CONFIRM_WINDOW_SIZE.set(settings.RABBITMQ_CONFIRM_WINDOW)
 
-            # Declare exchanges
-            await self.channel.declare_exchange(
-                "notifications.direct", aio_pika.ExchangeType.DIRECT, durable=True
-            )
-
-            # Declare queues
-            await self.channel.declare_queue("email.queue", durable=True)
-            await self.channel.declare_queue("push.queue", durable=True)
-            await self.channel.declare_queue("failed.queue", durable=True)
+            # Declare exchange, queues and bindings once
+            await self._declare_topology()
 
             logger.info("Connected to RabbitMQ successfully")
         except Exception as e:
@@ -39,38 +82,175 @@ class RabbitMQManager:
 
     async def disconnect(self):
         """Close RabbitMQ connection"""
+        self.publish_channels = []
+        self._channel_cycle = None
         if self.connection:
             await self.connection.close()
             logger.info("Disconnected from RabbitMQ")
+        self._declared_queues.clear()
+
+    async def _on_reconnect(self, connection):
+        """Re-declare topology after the robust connection came back"""
+        logger.info("Reconnected to RabbitMQ, re-declaring topology")
+        try:
+            await self._declare_topology()
+        except Exception as e:
+            # Queues missing from the cache are declared again on their next publish
+            logger.error(f"Failed to re-declare RabbitMQ topology: {e}")
+
+    async def _declare_topology(self):
+        """
+        Retire the legacy queues, then declare and bind every queue. The
+        retirement holds the topology lock, so a publish can't bind a queue
+        while it runs or find the cache half cleared.
+        """
+        async with self._topology_lock:
+            self._declared_queues.clear()
+            await self._retire_legacy_queues()
+        for queue_name in QUEUES:
+            await self._ensure_topology(queue_name)
+
+    async def _ensure_topology(self, queue_name: str):
+        """Declare and bind a queue unless it is already in the topology cache"""
+        if queue_name in self._declared_queues:
+            return
+
+        async with self._topology_lock:
+            if queue_name in self._declared_queues:
+                return
+
+            exchange = await self.channel.declare_exchange(
+                EXCHANGE_NAME, aio_pika.ExchangeType.DIRECT, durable=True
+            )
+            if queue_name in PRIORITY_QUEUES:
+                queue = await self.channel.declare_queue(
+                    PRIORITY_QUEUES[queue_name],
+                    durable=True,
+                    arguments={"x-max-priority": MAX_PRIORITY},
+                )
+            else:
+                queue = await self.channel.declare_queue(queue_name, durable=True)
+            await queue.bind(exchange, routing_key=self.routing_key(queue_name))
+            self._declared_queues.add(queue_name)
+
+    async def _retire_legacy_queues(self):
+        """
+        Unbind the pre-priority FIFO queues so new messages only reach the
+        priority queues. Runs before the priority queues are bound: a message
+        published in between is returned as unroutable and goes to the
+        outbox, rather than being delivered twice.
+        """
+        for legacy_name in PRIORITY_QUEUES:
+            # Unbinding a queue that doesn't exist closes the channel, so use
+            # a throwaway one
+            channel = await self.connection.channel()
+            try:
+                legacy = await channel.get_queue(legacy_name, ensure=False)
+                await legacy.unbind(EXCHANGE_NAME, routing_key=self.routing_key(legacy_name))
+                logger.info(f"Unbound legacy queue '{legacy_name}', its consumers drain it")
+            except Exception as e:
+                logger.debug(f"Legacy queue '{legacy_name}' not unbound: {e}")
+            finally:
+                if not channel.is_closed:
+                    await channel.close()
+
+    @staticmethod
+    def routing_key(queue_name: str) -> str:
+        """Derive routing key from queue name"""
+        return queue_name.split('.')[0]
+
+    @staticmethod
+    def message_priority(message: dict) -> Optional[int]:
+        """
+        AMQP priority of a message: its NotificationRequest.priority, where
+        10 is the most urgent. Messages without one get the default (0).
+        """
+        try:
+            return max(0, min(MAX_PRIORITY, int(message.get("priority"))))
+        except (TypeError, ValueError):
+            return None
 
     async def publish_message(self, queue_name: str, message: dict):  # dict, not string
-        if not self.channel:
+        """
+        Publish a message and, in confirm mode, wait for the broker's ack
+
+        Raises if the broker nacks or returns the message, or does not confirm
+        it within RABBITMQ_CONFIRM_TIMEOUT.
+        """
+        if not self._channel_cycle:
             raise Exception("RabbitMQ channel not initialized")
 
         try:
-            exchange = await self.channel.declare_exchange(
-                "notifications.direct", aio_pika.ExchangeType.DIRECT, durable=True
-            )
+            # Only queues outside the cache cost declaration round trips
+            await self._ensure_topology(queue_name)
 
-            queue = await self.channel.declare_queue(queue_name, durable=True)
-            
-            # Derive routing key from queue name
-            routing_key = queue_name.split('.')[0]
-            
-            await queue.bind(exchange, routing_key=routing_key)
-
-            # json.dumps() happens HERE, only once
-            await exchange.publish(
-                aio_pika.Message(
-                    body=json.dumps(message).encode(),  # This is the ONLY json.dumps
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                    content_type='application/json',
-                ),
-                routing_key=routing_key,
+            routing_key = self.routing_key(queue_name)
+            # The message is serialized here, only once
+            if queue_name in CODEC_QUEUES:
+                body, content_type, content_encoding = codec.encode(
+                    message,
+                    settings.MESSAGE_CODEC,
+                    settings.MESSAGE_COMPRESSION or None,
+                    settings.MESSAGE_COMPRESS_MIN_BYTES,
+                )
+            else:
+                body, content_type, content_encoding = codec.encode(message)
+            RABBITMQ_MESSAGE_BYTES.labels(
+                queue=queue_name,
+                content_type=content_type,
+                content_encoding=content_encoding or "identity",
+            ).observe(len(body))
+            amqp_message = aio_pika.Message(
+                body=body,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                content_type=content_type,
+                content_encoding=content_encoding,
+                priority=self.message_priority(message) if queue_name in PRIORITY_QUEUES else None,
+                # Lets consumers measure how long the message waited in the queue
+                headers={"x-published-at": time.time()},
             )
+            await self._publish_confirmed(amqp_message, routing_key)
             logger.info(f"Published to queue='{queue_name}', routing_key='{routing_key}'")
         except Exception as e:
             logger.error(f"Failed to publish message to {queue_name}: {e}")
             raise
 
+    async def _publish_confirmed(self, message: aio_pika.Message, routing_key: str):
+        """
+        Publish inside the confirm window
+
+        Waiting callers queue on the window instead of piling up unconfirmed
+        messages. Inside it, many publishes are outstanding on each channel
+        at once and every caller resumes when its own ack or nack arrives.
+        """
+        async with self._confirm_window:
+            self._in_flight += 1
+            RABBITMQ_CONFIRM_WINDOW_IN_FLIGHT.set(self._in_flight)
+            start = time.perf_counter()
+            result = "error"
+            try:
+                channel = next(self._channel_cycle)
+                # Exchange handle without a passive declare, it was declared above
+                exchange = await channel.get_exchange(EXCHANGE_NAME, ensure=False)
+                await exchange.publish(
+                    message,
+                    routing_key=routing_key,
+                    timeout=settings.RABBITMQ_CONFIRM_TIMEOUT,
+                )
+                result = "ack" if settings.RABBITMQ_PUBLISHER_CONFIRMS else "sent"
+            except PublishError:
+                result = "returned"
+                raise
+            except DeliveryError:
+                result = "nack"
+                raise
+            except asyncio.TimeoutError:
+                result = "timeout"
+                raise
+            finally:
+                self._in_flight -= 1
+                RABBITMQ_CONFIRM_WINDOW_IN_FLIGHT.set(self._in_flight)
+                RABBITMQ_CONFIRMS_TOTAL.labels(result=result).inc()
+                RABBITMQ_CONFIRM_LATENCY_SECONDS.observe(time.perf_counter() - start)
+
 rabbitmq_manager = RabbitMQManager()
@@ -2,8 +2,9 @@
 # api-gateway/app/config/redis.py
 # ============================================
 import redis.asyncio as redis
+import asyncio
 import logging
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -12,6 +13,8 @@ logger = logging.getLogger(__name__)
 class RedisManager:
     def __init__(self):
         self.client: Optional[redis.Redis] = None
+        self._handlers: Dict[str, List[Callable[[str], Awaitable[None]]]] = {}
+        self._listener_task: Optional[asyncio.Task] = None
 
     async def connect(self):
         """Connect to Redis"""
@@ -31,6 +34,7 @@ class RedisManager:
 
     async def disconnect(self):
         """Close Redis connection"""
+        await self.stop_listener()
         if self.client:
             await self.client.close()
             logger.info("Disconnected from Redis")
@@ -46,13 +50,102 @@ class RedisManager:
         else:
             await self.client.set(key, value)
 
-    async def delete(self, key: str):
-        """Delete key from Redis"""
-        await self.client.delete(key)
+    async def delete(self, *keys: str):
+        """Delete keys from Redis"""
+        await self.client.delete(*keys)
+
+    async def delete_prefix(self, prefix: str, batch_size: int = 500):
+        """Delete every key starting with `prefix`, using SCAN so Redis isn't blocked"""
+        keys = []
+        async for key in self.client.scan_iter(match=prefix + "*", count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                await self.client.delete(*keys)
+                keys = []
+        if keys:
+            await self.client.delete(*keys)
 
     async def exists(self, key: str) -> bool:
         """Check if key exists"""
         return await self.client.exists(key)
 
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        """Get all fields of a hash"""
+        return await self.client.hgetall(key)
+
+    async def mget(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """Get several values in a single round trip"""
+        if not keys:
+            return {}
+        values = await self.client.mget(keys)
+        return dict(zip(keys, values))
+
+    def pipeline(self):
+        """Non-transactional pipeline for batching writes into one round trip"""
+        return self.client.pipeline(transaction=False)
+
+    def register_script(self, script: str):
+        """
+        Register a Lua script. The returned callable runs it with EVALSHA and
+        can be pointed at a pipeline with client=pipe.
+        """
+        return self.client.register_script(script)
+
+
+    async def publish(self, channel: str, message: str):
+        """Publish a message on a pub/sub channel"""
+        await self.client.publish(channel, message)
+
+    def subscribe(self, channel: str, handler: Callable[[str], Awaitable[None]]):
+        """
+        Register a handler for a pub/sub channel.
+
+        All channels share one subscriber connection per worker. Handlers
+        registered after the listener started take effect on its next
+        (re)subscribe, so register them before calling start_listener().
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start_listener(self):
+        """Start the shared pub/sub listener task"""
+        if self._handlers and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop_listener(self):
+        """Stop the shared pub/sub listener task"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    async def _listen(self):
+        """Dispatch pub/sub messages to handlers, resubscribing after errors"""
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self._handlers)
+                logger.info(f"Subscribed to Redis channels: {', '.join(self._handlers)}")
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    for handler in self._handlers.get(message["channel"], []):
+                        try:
+                            await handler(message["data"])
+                        except Exception as e:
+                            logger.error(f"Pub/sub handler for {message['channel']} failed: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Redis pub/sub listener error: {e}. Resubscribing in 1s")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
 
 redis_manager = RedisManager()
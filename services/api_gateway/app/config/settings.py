@@ -23,6 +23,19 @@ class Settings(BaseSettings):
     RABBITMQ_USER: str = "guest"
     RABBITMQ_PASSWORD: str = "guest"
     RABBITMQ_VHOST: str = "/"
+    # Channels shared by concurrent publishes
+    RABBITMQ_CHANNEL_POOL_SIZE: int = 8
+    # Wait for the broker to ack every publish, with at most
+    # RABBITMQ_CONFIRM_WINDOW publishes awaiting their ack at once
+    RABBITMQ_PUBLISHER_CONFIRMS: bool = True
+    RABBITMQ_CONFIRM_WINDOW: int = 512
+    RABBITMQ_CONFIRM_TIMEOUT: float = 5.0
+    # Body format for email.queue: application/json or application/msgpack.
+    # Other queues stay JSON, the push service can only read that.
+    MESSAGE_CODEC: str = "application/json"
+    # zstd, gzip or empty for none; only bodies of MESSAGE_COMPRESS_MIN_BYTES or more
+    MESSAGE_COMPRESSION: str = ""
+    MESSAGE_COMPRESS_MIN_BYTES: int = 1024
 
     # Redis
     REDIS_HOST: str = "redis"
@@ -34,12 +47,64 @@ class Settings(BaseSettings):
     USER_SERVICE_URL: str = os.getenv("USER_SERVICE_URL", "http://localhost:3001")
     TEMPLATE_SERVICE_URL: str = os.getenv("TEMPLATE_SERVICE_URL", "http://localhost:8003")
 
+    # Upstream HTTP clients (shared, pooled)
+    USER_SERVICE_TIMEOUT: float = 5.0
+    TEMPLATE_SERVICE_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 2.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2_ENABLED: bool = False
+
+    # In-process cache in front of Redis (user/template lookups)
+    LOCAL_CACHE_MAX_SIZE: int = 10000
+    LOCAL_CACHE_TTL: float = 60.0
+    # Load every template into the caches when a worker starts
+    TEMPLATE_CACHE_WARMUP: bool = True
+
+    # Local outbox for messages the broker can't take right now
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_PATH: str = "data/outbox.db"
+    # Publishes slower than this go to the outbox instead
+    OUTBOX_PUBLISH_TIMEOUT: float = 2.0
+    OUTBOX_DRAIN_BATCH_SIZE: int = 200
+    OUTBOX_DRAIN_INTERVAL: float = 1.0
+
+    # Status stream (server-sent events)
+    STATUS_STREAM_MAX_SUBSCRIBERS: int = 20000
+    # Events buffered per client before the oldest ones are dropped
+    STATUS_STREAM_QUEUE_SIZE: int = 100
+    STATUS_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # Dependency health probes, run in the background; endpoints serve the last result
+    HEALTH_CHECK_INTERVAL: float = 5.0
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+
+    # Logging (formatted and written to stdout on a background thread)
+    LOG_LEVEL: str = "INFO"
+    # Records waiting for the log thread, more are dropped
+    LOG_QUEUE_SIZE: int = 10000
+    # Fraction of INFO records to keep per event, e.g. "notification_queued=0.1"
+    LOG_SAMPLE_RATES: str = ""
+
     # Rate Limiting
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 100
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # Max tokens a worker takes from Redis at once and spends locally
+    RATE_LIMIT_LEASE_MAX: int = 10
+    # Reverse proxies (IPs or CIDRs) whose X-Forwarded-For names the client;
+    # without one every caller behind the proxy shares the proxy's limit
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = []
 
-    # Circuit Breaker
-    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    # Circuit Breaker (one per dependency, state shared through Redis)
+    CIRCUIT_BREAKER_WINDOW_SECONDS: int = 30
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int = 10
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = 2.0
     CIRCUIT_BREAKER_TIMEOUT: int = 60
+    CIRCUIT_BREAKER_SYNC_INTERVAL: float = 1.0
 
     # JWT
     JWT_SECRET: str = "your-secret-key-change-in-production"
@@ -1,18 +1,18 @@
 # ============================================
 # api-gateway/app/controllers/health_controller.py
 # ============================================
-import logging
-
-logger = logging.getLogger(__name__)
+from app.services.health_monitor import health_monitor
 
 
 class HealthController:
+    def __init__(self, monitor=None):
+        self.monitor = monitor or health_monitor
+
     async def check_health(self):
         """
-        Overall health check
+        Overall health check, from the last background probe
         """
-        rabbitmq_status = await self._check_rabbitmq()
-        redis_status = await self._check_redis()
+        snapshot = self.monitor.snapshot()
 
         is_healthy = True  # Gateway itself is healthy even if dependencies aren't
 
@@ -21,9 +21,11 @@ class HealthController:
             "service": "api-gateway",
             "version": "1.0.0",
             "dependencies": {
-                "rabbitmq": "up" if rabbitmq_status else "down",
-                "redis": "up" if redis_status else "down",
+                name: result["status"] for name, result in snapshot["dependencies"].items()
             },
+            "checks": snapshot["dependencies"],
+            "checked_at": snapshot["checked_at"],
+            "age_seconds": snapshot["age_seconds"],
             "note": "Gateway is operational. Some features may be limited if dependencies are down.",
         }
 
@@ -35,32 +37,3 @@ class HealthController:
 
         # Gateway is ready even if optional dependencies are down
         return {"ready": True, "details": health}
-
-    async def _check_rabbitmq(self) -> bool:
-        """Check RabbitMQ connection"""
-        try:
-            from app.config.rabbitmq import rabbitmq_manager
-
-            # Ensure we return a bool (some analyzers consider the expression
-            # may produce None). Cast explicitly to bool to satisfy type
-            # checkers while preserving runtime behavior.
-            return bool(
-                rabbitmq_manager.connection
-                and not rabbitmq_manager.connection.is_closed
-            )
-        except Exception as e:
-            logger.debug(f"RabbitMQ check failed: {e}")
-            return False
-
-    async def _check_redis(self) -> bool:
-        """Check Redis connection"""
-        try:
-            from app.config.redis import redis_manager
-
-            if redis_manager.client:
-                await redis_manager.client.ping()
-                return True
-            return False
-        except Exception as e:
-            logger.debug(f"Redis check failed: {e}")
-            return False
@@ -1,20 +1,31 @@
 import uuid
 import json
+import asyncio
 import logging
 from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from fastapi.encoders import jsonable_encoder
+from app.config.redis import redis_manager
 from app.schemas.notification_schema import (
+    BatchNotificationResponse,
+    BatchNotificationResult,
+    BulkStatusResponse,
     NotificationRequest,
     NotificationResponse,
     NotificationStatus,
+    NotificationStatusResult,
 )
 from app.services.queue_service import QueueService
 from app.services.idempotency_service import IdempotencyService
 from app.services.user_service import UserService
 from app.services.template_service import TemplateService
 from app.services.notification_tracker import NotificationTracker
+from app.services.status_stream import StatusSubscription, status_stream
 
+from app.config.settings import settings
+from app.services.metrics import NOTIFICATION_TYPE_TOTAL
+from app.utils.decorators import stage_timer
 from app.utils.logger import logger
 
 
@@ -32,125 +43,329 @@ class NotificationController:
         """
         Process and queue notification request
         """
+        # Reserve the request ID up front so concurrent retries of the same
+        # request wait for this one instead of publishing a second message
+        notification_id = str(uuid.uuid4())
+        with stage_timer("idempotency"):
+            existing = await self.idempotency_service.reserve(
+                notification.request_id, notification_id
+            )
+        if existing:
+            logger.warning(f"Duplicate request detected: {notification.request_id}")
+            return NotificationResponse(**existing)
+
+        published = False
         try:
-            # Check idempotency
-            if await self.idempotency_service.is_duplicate(notification.request_id):
-                logger.warning(f"Duplicate request detected: {notification.request_id}")
-                existing = await self.idempotency_service.get_result(
-                    notification.request_id
+            # Fetch user and template concurrently, they don't depend on each other
+            with stage_timer("enrich"):
+                user, template = await asyncio.gather(
+                    self.user_service.get_user(notification.user_id),
+                    self.template_service.get_template(notification.template_code),
                 )
-                return NotificationResponse(**existing)
-
-            # Fetch user
-            user = await self.user_service.get_user(notification.user_id)
-            logger.debug(f"Fetched user data for {notification.user_id}: {user}")
-
             if not user:
                 raise Exception(f"User {notification.user_id} not found")
 
-            logger.info(f"User {notification.user_id} found: {user}")
-            print(f"User data: {user}")  # You already have this
-
-            # Extract user_data
-            user_data = user.get("data", {})
-            logger.info(f"Extracted user_data: {user_data}")
-            logger.info(f"Push token from user_data: {user_data.get('push_token')}")
-
-            # Check user preferences
-            if not await self.user_service.check_preference(
-                notification.user_id, notification.notification_type.value
+            # Check user preferences on the user we already fetched
+            if not self.user_service.is_notification_enabled(
+                user, notification.notification_type.value
             ):
                 logger.info(
-                    f"User {notification.user_id} has disabled {notification.notification_type} notifications"
+                    f"User {notification.user_id} has disabled {notification.notification_type.value} notifications",
+                    extra={
+                        "event": "notification_disabled",
+                        "user_id": notification.user_id,
+                        "correlation_id": correlation_id,
+                    },
                 )
+                await self._release_quietly(notification.request_id, notification_id)
                 return NotificationResponse(
                     notification_id=str(uuid.uuid4()),
                     status=NotificationStatus.failed,
                     message=f"User has disabled {notification.notification_type} notifications",
                 )
-            logger.info(f"User {notification.user_id} preferences allow {notification.notification_type} notifications")
 
-            # Fetch template
-            template = await self.template_service.get_template(notification.template_code)
             if not template:
                 logger.error(f"Template {notification.template_code} not found")
                 raise Exception(f"Template {notification.template_code} not found")
 
-            logger.info(f"Template {notification.template_code} fetched successfully")
-
-            notification_id = str(uuid.uuid4())
-            user_data = user
-
-            # Build canonical message for queue
-            canonical_message = {
-                "notification_id": notification_id,
-                "notification_type": notification.notification_type.value,
-                "user_id": notification.user_id,
-                "template_code": notification.template_code,
-                "template": template.get("data"),
-                "variables": notification.variables.dict(),
-                "delivery": {
-                    "email": user_data.get("email"),
-                    "push_token": user_data.get("push_token")
-                },
-                "priority": notification.priority,
-                "metadata": notification.metadata or {},
-                "request_id": notification.request_id,
-                "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-
-            logger.info(f"Delivery object: {canonical_message['delivery']}")
-            logger.info(f"Push token present: {bool(canonical_message['delivery']['push_token'])}")
-
-            # Determine queue based on notification type
-            queue_name = f"{notification.notification_type.value}.queue"
-
-            if notification.notification_type.value == "email":
-                raw_vars = notification.variables.dict()
+            queue_name, queue_message = self._build_queue_message(
+                notification, notification_id, user, template, correlation_id
+            )
 
-                # Normalize to string-only keys/values
-                sanitized_vars = {
-                    key: ("" if value is None else str(value))
-                    for key, value in raw_vars.items()
-                }
+            with stage_timer("publish"):
+                await self.queue_service.publish(queue_name, queue_message)
+            published = True
+            NOTIFICATION_TYPE_TOTAL.labels(type=notification.notification_type.value).inc()
 
-                queue_message = {
-                    "notification_id": notification_id,
-                    "correlation_id": correlation_id,
-                    "to_email": user_data.get("email"),
-                    "template_id": notification.template_code,
-                    "variables": sanitized_vars,
-                    "language": sanitized_vars.get("language", "en"),
-                    "priority": str(notification.priority) if isinstance(notification.priority, int) else notification.priority,
-                    "retry_count": 0
-                }
-            elif notification.notification_type.value == "push":
-                queue_message = canonical_message
-            else:
-                queue_message = canonical_message
-
-            await self.queue_service.publish(queue_name, queue_message)
-
-            await self.tracker.track(notification_id, NotificationStatus.pending)
-
-            # Store result for idempotency
             response = NotificationResponse(
                 notification_id=notification_id,
                 status=NotificationStatus.pending,
                 message="Notification queued successfully",
             )
-            await self.idempotency_service.store_result(
-                notification.request_id, response.dict()
-            )
 
-            logger.info(f"Notification {notification_id} queued to {queue_name}")
+            # Track status and upgrade the reservation to the result in one round trip
+            with stage_timer("persist"):
+                pipe = redis_manager.pipeline()
+                await self.tracker.track(
+                    notification_id, NotificationStatus.pending, pipe=pipe, correlation_id=correlation_id
+                )
+                await self.idempotency_service.store_result(
+                    notification.request_id, response.dict(), pipe=pipe
+                )
+                await pipe.execute()
+
+            logger.info(
+                f"Notification {notification_id} queued to {queue_name}",
+                extra={
+                    "event": "notification_queued",
+                    "notification_id": notification_id,
+                    "queue": queue_name,
+                    "correlation_id": correlation_id,
+                },
+            )
             return response
 
         except Exception as e:
             logger.error(f"Failed to create notification: {e}")
+            # Once published, keep the reservation so a retry can't publish twice
+            if not published:
+                await self._release_quietly(notification.request_id, notification_id)
             raise
 
+    async def _release_quietly(self, request_id: str, notification_id: str):
+        """
+        Release an idempotency reservation without masking the original error
+        """
+        try:
+            await self.idempotency_service.release(request_id, notification_id)
+        except Exception as e:
+            logger.error(f"Failed to release idempotency reservation {request_id}: {e}")
+
+
+    async def create_notifications_batch(
+        self, notifications: List[NotificationRequest], correlation_id: str
+    ) -> BatchNotificationResponse:
+        """
+        Process and queue a batch of notification requests.
+
+        Idempotency keys are reserved in one pipelined round trip, user and
+        template lookups are deduplicated across the batch, all messages are
+        published concurrently and the tracker/idempotency writes go out in one
+        pipeline. Requests already in progress elsewhere are not waited on,
+        their in-progress state is returned instead.
+        """
+        results: List[Optional[BatchNotificationResult]] = [None] * len(notifications)
+
+        notification_ids = {
+            request_id: str(uuid.uuid4())
+            for request_id in dict.fromkeys(n.request_id for n in notifications)
+        }
+        with stage_timer("idempotency"):
+            existing = await self.idempotency_service.reserve_many(
+                list(notification_ids.items())
+            )
+
+        # Reservations made here that have no stored result or release yet
+        unsettled = {request_id for request_id in notification_ids if request_id not in existing}
+        try:
+            to_process: List[Tuple[int, NotificationRequest]] = []
+            first_index: Dict[str, int] = {}
+            in_batch_duplicates: List[Tuple[int, int]] = []
+            for index, notification in enumerate(notifications):
+                if notification.request_id in existing:
+                    results[index] = BatchNotificationResult(
+                        index=index,
+                        request_id=notification.request_id,
+                        success=True,
+                        data=NotificationResponse(**existing[notification.request_id]),
+                    )
+                elif notification.request_id in first_index:
+                    in_batch_duplicates.append((index, first_index[notification.request_id]))
+                else:
+                    first_index[notification.request_id] = index
+                    to_process.append((index, notification))
+
+            # Fetch every distinct user and template once, concurrently
+            user_ids = list(dict.fromkeys(n.user_id for _, n in to_process))
+            template_codes = list(dict.fromkeys(n.template_code for _, n in to_process))
+            with stage_timer("enrich"):
+                lookups = await asyncio.gather(
+                    *(self.user_service.get_user(user_id) for user_id in user_ids),
+                    *(self.template_service.get_template(code) for code in template_codes),
+                )
+            users = dict(zip(user_ids, lookups[: len(user_ids)]))
+            templates = dict(zip(template_codes, lookups[len(user_ids):]))
+
+            outgoing = []
+            rejected: List[str] = []
+            for index, notification in to_process:
+                user = users.get(notification.user_id)
+                template = templates.get(notification.template_code)
+                notification_type = notification.notification_type.value
+
+                if not user:
+                    error = f"User {notification.user_id} not found"
+                elif not self.user_service.is_notification_enabled(user, notification_type):
+                    message = f"User has disabled {notification.notification_type} notifications"
+                    results[index] = BatchNotificationResult(
+                        index=index,
+                        request_id=notification.request_id,
+                        success=False,
+                        data=NotificationResponse(
+                            notification_id=str(uuid.uuid4()),
+                            status=NotificationStatus.failed,
+                            message=message,
+                        ),
+                        error=message,
+                    )
+                    rejected.append(notification.request_id)
+                    continue
+                elif not template:
+                    error = f"Template {notification.template_code} not found"
+                else:
+                    notification_id = notification_ids[notification.request_id]
+                    queue_name, queue_message = self._build_queue_message(
+                        notification, notification_id, user, template, correlation_id
+                    )
+                    outgoing.append((index, notification, notification_id, queue_name, queue_message))
+                    continue
+
+                results[index] = BatchNotificationResult(
+                    index=index, request_id=notification.request_id, success=False, error=error
+                )
+                rejected.append(notification.request_id)
+
+            with stage_timer("publish"):
+                publish_errors = await self.queue_service.publish_many(
+                    [(queue_name, queue_message) for _, _, _, queue_name, queue_message in outgoing]
+                )
+
+            # Release reservations that did not produce a result so retries can go through
+            pipe = redis_manager.pipeline()
+            for request_id in rejected:
+                await self.idempotency_service.release(
+                    request_id, notification_ids[request_id], pipe=pipe
+                )
+            for (index, notification, notification_id, queue_name, _), error in zip(
+                outgoing, publish_errors
+            ):
+                if error:
+                    await self.idempotency_service.release(
+                        notification.request_id, notification_id, pipe=pipe
+                    )
+                    results[index] = BatchNotificationResult(
+                        index=index,
+                        request_id=notification.request_id,
+                        success=False,
+                        error=f"Failed to queue notification: {error}",
+                    )
+                    continue
+
+                # Published: keep the reservation so a retry can't publish twice
+                unsettled.discard(notification.request_id)
+                NOTIFICATION_TYPE_TOTAL.labels(type=notification.notification_type.value).inc()
+                response = NotificationResponse(
+                    notification_id=notification_id,
+                    status=NotificationStatus.pending,
+                    message="Notification queued successfully",
+                )
+                await self.tracker.track(
+                    notification_id, NotificationStatus.pending, pipe=pipe, correlation_id=correlation_id
+                )
+                await self.idempotency_service.store_result(
+                    notification.request_id, response.dict(), pipe=pipe
+                )
+                results[index] = BatchNotificationResult(
+                    index=index, request_id=notification.request_id, success=True, data=response
+                )
+
+            try:
+                with stage_timer("persist"):
+                    await pipe.execute()
+                unsettled.clear()
+            except Exception as e:
+                # Messages are already on the queue, so report them as queued
+                logger.error(f"Failed to store batch tracking/idempotency state: {e}")
+        finally:
+            # A failure part way through must not leave keys reserved until the TTL
+            await asyncio.gather(*(
+                self._release_quietly(request_id, notification_ids[request_id])
+                for request_id in unsettled
+            ))
+
+        for index, original in in_batch_duplicates:
+            results[index] = results[original].model_copy(update={"index": index})
+
+        queued = sum(1 for result in results if result.success)
+        logger.info(f"Batch processed: {queued}/{len(results)} notifications queued")
+
+        return BatchNotificationResponse(
+            total=len(results),
+            queued=queued,
+            failed=len(results) - queued,
+            results=results,
+        )
+
+    def _build_queue_message(
+        self,
+        notification: NotificationRequest,
+        notification_id: str,
+        user: dict,
+        template: dict,
+        correlation_id: str,
+    ) -> Tuple[str, dict]:
+        """
+        Build the queue name and message body for a notification
+        """
+        user_data = user
+
+        # Build canonical message for queue
+        canonical_message = {
+            "notification_id": notification_id,
+            "notification_type": notification.notification_type.value,
+            "user_id": notification.user_id,
+            "template_code": notification.template_code,
+            "template": template.get("data"),
+            "variables": notification.variables.dict(),
+            "delivery": {
+                "email": user_data.get("email"),
+                "push_token": user_data.get("push_token")
+            },
+            "priority": notification.priority,
+            "metadata": notification.metadata or {},
+            "request_id": notification.request_id,
+            "correlation_id": correlation_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+        # Determine queue based on notification type
+        queue_name = f"{notification.notification_type.value}.queue"
+
+        if notification.notification_type.value == "email":
+            raw_vars = notification.variables.dict()
+
+            # Normalize to string-only keys/values
+            sanitized_vars = {
+                key: ("" if value is None else str(value))
+                for key, value in raw_vars.items()
+            }
+
+            queue_message = {
+                "notification_id": notification_id,
+                "correlation_id": correlation_id,
+                "to_email": user_data.get("email"),
+                "template_id": notification.template_code,
+                "variables": sanitized_vars,
+                "language": sanitized_vars.get("language", "en"),
+                "priority": str(notification.priority) if isinstance(notification.priority, int) else notification.priority,
+                "retry_count": 0
+            }
+        elif notification.notification_type.value == "push":
+            queue_message = canonical_message
+        else:
+            queue_message = canonical_message
+
+        return queue_name, queue_message
 
     async def get_notification_status(
         self, notification_id: str
@@ -162,3 +377,66 @@ class NotificationController:
         if not status_data:
             return None
         return NotificationResponse(**status_data)
+
+    async def get_notification_statuses(
+        self, notification_ids: List[str]
+    ) -> BulkStatusResponse:
+        """
+        Get the status of many notifications with a single Redis round trip
+        """
+        unique_ids = list(dict.fromkeys(notification_ids))
+        found = await self.tracker.get_statuses(unique_ids)
+
+        statuses = []
+        for notification_id in notification_ids:
+            data = found.get(notification_id, {})
+            statuses.append(NotificationStatusResult(
+                notification_id=notification_id,
+                status=data.get("status"),
+                updated_at=data.get("updated_at"),
+                error=data.get("error"),
+            ))
+        return BulkStatusResponse(
+            total=len(statuses),
+            found=sum(1 for result in statuses if result.status is not None),
+            statuses=statuses,
+        )
+
+    def open_status_stream(
+        self, notification_ids: List[str], correlation_id: Optional[str]
+    ) -> StatusSubscription:
+        """
+        Subscribe to status changes of notifications and/or a correlation ID
+
+        Raises OverflowError when this worker has no room for more clients.
+        """
+        return status_stream.subscribe(notification_ids, correlation_id)
+
+    async def stream_statuses(
+        self, subscription: StatusSubscription, notification_ids: List[str]
+    ) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield the current status of the followed notifications, then every
+        status change as it happens, and None whenever nothing happened for
+        STATUS_STREAM_HEARTBEAT_SECONDS. Unsubscribes when the caller stops.
+        """
+        try:
+            # Subscribed first, so a change made while this read is in
+            # flight is delivered (possibly twice) rather than lost
+            if notification_ids:
+                try:
+                    current = await self.tracker.get_statuses(list(dict.fromkeys(notification_ids)))
+                except Exception as e:
+                    logger.warning(f"Could not read current statuses for stream: {e}")
+                    current = {}
+                for data in current.values():
+                    yield {
+                        field: data[field]
+                        for field in ("notification_id", "correlation_id", "status", "updated_at", "error")
+                        if data.get(field)
+                    }
+
+            while True:
+                yield await subscription.get(timeout=settings.STATUS_STREAM_HEARTBEAT_SECONDS)
+        finally:
+            status_stream.unsubscribe(subscription)
@@ -19,15 +19,16 @@ class StatusController:
         Update notification delivery status
         """
         try:
-            await self.tracker.update_status(
+            updated = await self.tracker.update_status(
                 status_update.notification_id, status_update.status, status_update.error
             )
 
-            logger.info(
-                f"Status updated for {status_update.notification_id}: {status_update.status}"
-            )
+            if updated:
+                logger.info(
+                    f"Status updated for {status_update.notification_id}: {status_update.status}"
+                )
 
-            return {"updated": True}
+            return {"updated": updated}
 
         except Exception as e:
             logger.error(f"Failed to update status: {e}")
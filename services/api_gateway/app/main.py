@@ -12,6 +12,7 @@ from app.config.settings import settings
 from app.routers import notification, health, status
 from app.middleware.correlation_id import CorrelationIdMiddleware
 from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from app.middleware.rate_limiter import RateLimiterMiddleware
 
 from app.utils.logger import logger
@@ -33,15 +34,56 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"RabbitMQ connection failed: {e}. Running in standalone mode.")
 
+    # Open the local outbox and replay anything left from a previous run
+    if settings.OUTBOX_ENABLED:
+        try:
+            from app.services.outbox import outbox
+
+            await outbox.open()
+            await outbox.start_drainer()
+        except Exception as e:
+            logger.error(f"Failed to open outbox: {e}. Publishing without it.")
+
     # Try to connect to Redis
     try:
         from app.config.redis import redis_manager
 
         await redis_manager.connect()
         logger.info("Redis connected successfully")
+
+        # Drop in-process cache entries when users/templates change anywhere
+        from app.services.cache_service import (
+            CACHE_INVALIDATION_CHANNEL,
+            handle_invalidation,
+        )
+
+        redis_manager.subscribe(CACHE_INVALIDATION_CHANNEL, handle_invalidation)
+
+        # Status changes for stream clients, one subscription per worker
+        from app.services.status_stream import STATUS_EVENTS_CHANNEL, status_stream
+
+        redis_manager.subscribe(STATUS_EVENTS_CHANNEL, status_stream.handle_event)
+        await redis_manager.start_listener()
     except Exception as e:
         logger.warning(f"Redis connection failed: {e}. Running in standalone mode.")
 
+    # Open pooled HTTP clients for the user and template services
+    from app.config.http_client import http_client_manager
+
+    await http_client_manager.connect()
+
+    # Fill the template caches before taking traffic, so the first requests
+    # after a rollout don't all miss
+    if settings.TEMPLATE_CACHE_WARMUP:
+        from app.services.template_service import TemplateService
+
+        await TemplateService().warm_cache()
+
+    # Probe dependencies in the background; health endpoints serve the result
+    from app.services.health_monitor import health_monitor
+
+    await health_monitor.start()
+
     logger.info("API Gateway started successfully")
 
     yield
@@ -49,6 +91,21 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down API Gateway...")
 
+    try:
+        from app.services.health_monitor import health_monitor
+
+        await health_monitor.stop()
+    except Exception:
+        pass
+
+    try:
+        from app.services.outbox import outbox
+
+        await outbox.stop_drainer()
+        await outbox.close()
+    except Exception:
+        pass
+
     try:
         from app.config.rabbitmq import rabbitmq_manager
 
@@ -63,6 +120,17 @@ async def lifespan(app: FastAPI):
     except Exception:  # ✅ Fixed: Changed from bare except to Exception
         pass
 
+    try:
+        from app.config.http_client import http_client_manager
+
+        await http_client_manager.disconnect()
+    except Exception:
+        pass
+
+    from app.services.metrics import mark_worker_dead
+
+    mark_worker_dead()
+
     logger.info("API Gateway shutdown complete")
 
 
@@ -86,11 +154,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add custom middleware
+# Add custom middleware (the last one added runs first)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimiterMiddleware)
 app.add_middleware(CorrelationIdMiddleware)
 app.add_middleware(ErrorHandlerMiddleware)
-# Temporarily disable rate limiter for testing
-# app.add_middleware(RateLimiterMiddleware)
+# Outermost, so rate limited and failed requests are counted too
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(health.router, prefix="/api/v1", tags=["Health"])
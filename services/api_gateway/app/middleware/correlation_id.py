@@ -2,16 +2,26 @@
 # api-gateway/app/middleware/correlation_id.py
 # ============================================
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        correlation_id = request.headers.get("X-Correlation-ID", str(uuid.uuid4()))
-        request.state.correlation_id = correlation_id
+class CorrelationIdMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        return response
+        correlation_id = Headers(scope=scope).get("X-Correlation-ID") or str(uuid.uuid4())
+        # Exposed to handlers as request.state.correlation_id
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+
+        async def send_with_correlation_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Correlation-ID"] = correlation_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_correlation_id)
@@ -2,21 +2,37 @@
 # api-gateway/app/middleware/error_handler.py
 # ============================================
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class ErrorHandlerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_tracking_start(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_tracking_start)
         except HTTPException as e:
-            return JSONResponse(
+            # Too late to replace a response that is already on the wire
+            if response_started:
+                raise
+            response = JSONResponse(
                 status_code=e.status_code,
                 content={
                     "success": False,
@@ -24,9 +40,12 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
                     "message": "Request failed",
                 },
             )
+            await response(scope, receive, send)
         except Exception as e:
             logger.error(f"Unhandled exception: {e}", exc_info=True)
-            return JSONResponse(
+            if response_started:
+                raise
+            response = JSONResponse(
                 status_code=500,
                 content={
                     "success": False,
@@ -34,3 +53,4 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
                     "message": str(e),
                 },
             )
+            await response(scope, receive, send)
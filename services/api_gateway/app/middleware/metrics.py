@@ -0,0 +1,58 @@
+# ============================================
+# api-gateway/app/middleware/metrics.py
+# ============================================
+import time
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import REQUEST_DURATION_SECONDS, REQUESTS_FAILED_TOTAL, REQUESTS_TOTAL
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the route serving a request, e.g.
+    /api/v1/notifications/{notification_id}, so that IDs in paths don't
+    each create their own series
+    """
+    route = scope.get("route")
+    if route is None:
+        # Answered before routing (rate limited) or not found
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Record request count, latency and failures for every HTTP request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = route_template(scope)
+            method = scope["method"]
+            REQUESTS_TOTAL.labels(endpoint=endpoint, method=method).inc()
+            REQUEST_DURATION_SECONDS.labels(endpoint=endpoint, method=method).observe(
+                time.perf_counter() - start
+            )
+            if status_code >= 400:
+                REQUESTS_FAILED_TOTAL.labels(endpoint=endpoint, method=method).inc()
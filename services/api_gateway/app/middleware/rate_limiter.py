@@ -1,50 +1,246 @@
 # ============================================
 # api-gateway/app/middleware/rate_limiter.py
 # ============================================
+import re
+import math
 import time
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import logging
+import ipaddress
+from typing import Dict, List, Optional
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.config.redis import redis_manager
 from app.config.settings import settings
+from app.services.metrics import RATE_LIMIT_DECISIONS_TOTAL
 
+logger = logging.getLogger(__name__)
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health checks
-        if request.url.path.startswith("/api/v1/health"):
-            return await call_next(request)
+# Sliding window counter: the previous window's count is weighted by how much
+# of it still overlaps the sliding window. Instead of one token the caller
+# leases up to ARGV[4] tokens, 10% of what is left, so a worker can serve a
+# client far below its limit locally. Close to the limit the lease shrinks to
+# a single token and every request is checked against Redis.
+# Returns {granted, remaining after the grant}.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local lease_max = tonumber(ARGV[4])
 
-        # Get client identifier (IP or user ID from auth)
-        client_id = request.client.host
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = math.floor(previous * (window - elapsed) / window) + current
+local available = limit - used
+if available < 1 then
+    return {0, 0}
+end
+
+local granted = math.max(1, math.min(lease_max, math.floor(available / 10)))
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {granted, available - granted}
+"""
+
+# How long a worker keeps rejecting a client locally after Redis said no
+DENIAL_CACHE_SECONDS = 1.0
+# Local leases/denials kept per worker before stale ones are pruned
+MAX_LOCAL_CLIENTS = 10000
+
+# Not rate limited: health and metrics probes, and the delivery status
+# callbacks the workers post for every message they process
+# (/{notification_type}/status/, not the public /notifications/status lookup)
+EXEMPT_PATHS = re.compile(r"^/api/v1/(health|metrics$|(?!notifications/)[^/]+/status/?$)")
+
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_at: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Unix time at which the current window ends
+        self.reset_at = reset_at
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* headers describing this decision"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_at)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.reset_at - time.time())))
+        return headers
+
+
+class RateLimiter:
+    """
+    Per-client sliding window limiter shared by all workers through Redis.
+
+    Each check is one Lua call. Tokens leased from Redis are spent locally
+    until they run out or the window rolls over, so clients well below their
+    limit rarely cost a Redis round trip.
+    """
+
+    def __init__(
+        self,
+        limit: int = None,
+        window: int = None,
+        lease_max: int = None,
+    ):
+        self.limit = limit or settings.RATE_LIMIT_PER_MINUTE
+        self.window = window or settings.RATE_LIMIT_WINDOW_SECONDS
+        self.lease_max = lease_max or settings.RATE_LIMIT_LEASE_MAX
+        # client_id -> [tokens left, remaining in Redis at lease time, window index]
+        self._leases: Dict[str, list] = {}
+        # client_id -> monotonic time until which the client is rejected locally
+        self._denied: Dict[str, float] = {}
+        self._script = None
+
+    async def check(self, client_id: str) -> Optional[RateLimitResult]:
+        """
+        Take one request from the client's budget.
+
+        Returns None if Redis could not be reached, callers fail open.
+        """
+        now = time.time()
+        window_index = int(now // self.window)
+        reset_at = (window_index + 1) * self.window
+
+        denied_until = self._denied.get(client_id)
+        if denied_until is not None:
+            if time.monotonic() < denied_until:
+                RATE_LIMIT_DECISIONS_TOTAL.labels(result="limited", source="local").inc()
+                return RateLimitResult(False, self.limit, 0, reset_at)
+            del self._denied[client_id]
+
+        lease = self._leases.get(client_id)
+        if lease is not None and lease[0] > 0 and lease[2] == window_index:
+            lease[0] -= 1
+            RATE_LIMIT_DECISIONS_TOTAL.labels(result="allowed", source="local").inc()
+            return RateLimitResult(True, self.limit, lease[1] + lease[0], reset_at)
+
+        try:
+            granted, remaining = await self._acquire(client_id, now, window_index)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            return None
+
+        if not granted:
+            self._leases.pop(client_id, None)
+            if len(self._denied) >= MAX_LOCAL_CLIENTS:
+                self._prune(window_index)
+            self._denied[client_id] = time.monotonic() + min(DENIAL_CACHE_SECONDS, reset_at - now)
+            RATE_LIMIT_DECISIONS_TOTAL.labels(result="limited", source="redis").inc()
+            return RateLimitResult(False, self.limit, 0, reset_at)
+
+        # One token pays for this request, the rest are kept for the next ones
+        if len(self._leases) >= MAX_LOCAL_CLIENTS and client_id not in self._leases:
+            self._prune(window_index)
+        self._leases[client_id] = [granted - 1, remaining, window_index]
+        RATE_LIMIT_DECISIONS_TOTAL.labels(result="allowed", source="redis").inc()
+        return RateLimitResult(True, self.limit, remaining + granted - 1, reset_at)
+
+    async def _acquire(self, client_id: str, now: float, window_index: int):
+        """Lease tokens for the client from the shared window in Redis"""
+        if self._script is None:
+            self._script = redis_manager.register_script(SLIDING_WINDOW_SCRIPT)
+
+        window_ms = self.window * 1000
+        elapsed_ms = int((now - window_index * self.window) * 1000)
+        granted, remaining = await self._script(
+            keys=[
+                f"rate_limit:{client_id}:{window_index}",
+                f"rate_limit:{client_id}:{window_index - 1}",
+            ],
+            args=[self.limit, window_ms, elapsed_ms, self.lease_max],
+        )
+        return int(granted), int(remaining)
+
+    def _prune(self, window_index: int):
+        """Drop spent and stale leases, or everything if that is not enough"""
+        self._leases = {
+            client_id: lease
+            for client_id, lease in self._leases.items()
+            if lease[0] > 0 and lease[2] == window_index
+        }
+        if len(self._leases) >= MAX_LOCAL_CLIENTS:
+            self._leases.clear()
+        now = time.monotonic()
+        self._denied = {
+            client_id: until for client_id, until in self._denied.items() if until > now
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+class RateLimiterMiddleware:
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = None, trusted_proxies: List[str] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy, strict=False)
+            for proxy in (settings.RATE_LIMIT_TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies)
+        ]
+
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address.strip())
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_id(self, scope: Scope) -> str:
+        """
+        The peer's IP, or behind trusted proxies the last X-Forwarded-For
+        address they didn't add themselves (earlier ones can be forged)
+        """
+        client = scope.get("client")
+        client_id = client[0] if client else "unknown"
+        if not self.trusted_proxies or not self._is_trusted(client_id):
+            return client_id
+
+        forwarded = [
+            value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+            if name == b"x-forwarded-for"
+        ]
+        hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._is_trusted(hop):
+                return hop
+        return hops[0] if hops else client_id
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or EXEMPT_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        client_id = self.client_id(scope)
 
         # Check rate limit
-        if not await self._check_rate_limit(client_id):
-            return JSONResponse(
+        result = await self.limiter.check(client_id)
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not result.allowed:
+            response = JSONResponse(
                 status_code=429,
                 content={
                     "success": False,
                     "error": "Rate limit exceeded",
                     "message": "Too many requests",
                 },
+                headers=result.headers(),
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
-
-    async def _check_rate_limit(self, client_id: str) -> bool:
-        """
-        Check if client has exceeded rate limit
-        """
-        key = f"rate_limit:{client_id}"
-        current = await redis_manager.get(key)
-
-        if current is None:
-            await redis_manager.set(key, "1", ttl=60)
-            return True
-
-        count = int(current)
-        if count >= settings.RATE_LIMIT_PER_MINUTE:
-            return False
+        async def send_with_rate_limit_headers(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(result.headers())
+            await send(message)
 
-        await redis_manager.client.incr(key)
-        return True
+        await self.app(scope, receive, send_with_rate_limit_headers)
@@ -3,6 +3,8 @@
 # ============================================
 from fastapi import APIRouter
 from app.services.metrics import prometheus_metrics
+from app.config.http_client import http_client_manager
+from app.services.circuit_breaker import circuit_breakers
 from app.controllers.health_controller import HealthController
 
 router = APIRouter()
@@ -33,6 +35,15 @@ async def liveness_check():
     return {"status": "alive"}
 
 
+@router.get("/health/circuit-breakers")
+async def circuit_breaker_states():
+    """
+    Current state of every dependency's circuit breaker in this worker
+    """
+    return {"circuit_breakers": circuit_breakers.snapshot()}
+
+
 @router.get("/metrics")
 def metrics():
+    http_client_manager.update_pool_metrics()
     return prometheus_metrics()
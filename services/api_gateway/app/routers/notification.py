@@ -1,18 +1,27 @@
 # ============================================
 # api-gateway/app/routers/notification.py
 # ============================================
-from fastapi import APIRouter, HTTPException, Request
-from app.schemas.notification_schema import NotificationRequest, NotificationResponse
+import json
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.schemas.notification_schema import (
+    BatchNotificationRequest,
+    BatchNotificationResponse,
+    BulkStatusRequest,
+    BulkStatusResponse,
+    MAX_STATUS_LOOKUP_SIZE,
+    NotificationRequest,
+    NotificationResponse,
+)
 from app.schemas.response_schema import ApiResponse
 from app.controllers.notification_controller import NotificationController
-from app.utils.decorators import monitor_endpoint
 
 router = APIRouter()
 controller = NotificationController()
 
 
 @router.post("/notifications/", response_model=ApiResponse[NotificationResponse])
-@monitor_endpoint()
 async def create_notification(
     request: Request,
     notification: NotificationRequest,
@@ -28,6 +37,89 @@ async def create_notification(
     )
 
 
+@router.post(
+    "/notifications/batch", response_model=ApiResponse[BatchNotificationResponse]
+)
+async def create_notifications_batch(
+    request: Request,
+    batch: BatchNotificationRequest,
+):
+    """
+    Create and queue a batch of notifications, returning a result per item
+    """
+    correlation_id = request.state.correlation_id
+    result = await controller.create_notifications_batch(
+        batch.notifications, correlation_id
+    )
+
+    return ApiResponse(
+        success=True,
+        data=result,
+        message=f"{result.queued} of {result.total} notifications queued",
+        meta=None,
+    )
+
+
+@router.post(
+    "/notifications/status",
+    response_model=ApiResponse[BulkStatusResponse],
+    response_model_exclude_none=True,
+)
+async def get_notification_statuses(
+    request: Request,
+    lookup: BulkStatusRequest,
+):
+    """
+    Get the status of up to 1000 notifications in one request
+    """
+    result = await controller.get_notification_statuses(lookup.notification_ids)
+
+    return ApiResponse(
+        success=True,
+        data=result,
+        message=f"{result.found} of {result.total} notifications found",
+        meta=None,
+    )
+
+
+@router.get("/notifications/stream")
+async def stream_notification_statuses(
+    notification_ids: List[str] = Query(default=[]),
+    correlation_id: Optional[str] = None,
+):
+    """
+    Server-sent events stream of status changes for the given notifications
+    and/or every notification created under a correlation ID
+    """
+    if not notification_ids and not correlation_id:
+        raise HTTPException(
+            status_code=400, detail="Give notification_ids and/or a correlation_id"
+        )
+    if len(notification_ids) > MAX_STATUS_LOOKUP_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_STATUS_LOOKUP_SIZE} notification_ids per stream",
+        )
+    try:
+        subscription = controller.open_status_stream(notification_ids, correlation_id)
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def event_source():
+        async for event in controller.stream_statuses(subscription, notification_ids):
+            if event is None:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/notifications/{notification_id}", response_model=ApiResponse[NotificationResponse]
 )
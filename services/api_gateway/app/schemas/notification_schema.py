@@ -2,7 +2,7 @@
 # api-gateway/app/schemas/notification_schema.py
 # ============================================
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from enum import Enum
 from datetime import datetime
 
@@ -40,6 +40,53 @@ class NotificationResponse(BaseModel):
     message: str
 
 
+MAX_BATCH_SIZE = 500
+
+
+class BatchNotificationRequest(BaseModel):
+    notifications: List[NotificationRequest] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+
+class BatchNotificationResult(BaseModel):
+    index: int
+    request_id: str
+    success: bool
+    data: Optional[NotificationResponse] = None
+    error: Optional[str] = None
+
+
+class BatchNotificationResponse(BaseModel):
+    total: int
+    queued: int
+    failed: int
+    results: List[BatchNotificationResult]
+
+
+MAX_STATUS_LOOKUP_SIZE = 1000
+
+
+class BulkStatusRequest(BaseModel):
+    notification_ids: List[str] = Field(
+        ..., min_length=1, max_length=MAX_STATUS_LOOKUP_SIZE
+    )
+
+
+class NotificationStatusResult(BaseModel):
+    notification_id: str
+    # None when the notification is unknown or its record has expired
+    status: Optional[NotificationStatus] = None
+    updated_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkStatusResponse(BaseModel):
+    total: int
+    found: int
+    statuses: List[NotificationStatusResult]
+
+
 class StatusUpdateRequest(BaseModel):
     notification_id: str
     status: NotificationStatus
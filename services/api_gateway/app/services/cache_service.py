@@ -0,0 +1,168 @@
+# ============================================
+# api-gateway/app/services/cache_service.py
+# ============================================
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.config.redis import redis_manager
+from app.config.settings import settings
+from app.services.metrics import (
+    LOCAL_CACHE_EVICTIONS_TOTAL,
+    LOCAL_CACHE_HITS_TOTAL,
+    LOCAL_CACHE_MISSES_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel carrying cache keys (or key prefixes ending in ":") whose
+# in-process copies must be dropped by every gateway worker
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL.
+
+    Holds parsed objects, so a hit costs neither a Redis round trip nor a
+    json.loads. Values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._hits = LOCAL_CACHE_HITS_TOTAL.labels(cache=name)
+        self._misses = LOCAL_CACHE_MISSES_TOTAL.labels(cache=name)
+        self._evictions = LOCAL_CACHE_EVICTIONS_TOTAL.labels(cache=name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses.inc()
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._misses.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions.inc()
+
+    def invalidate(self, key: str) -> int:
+        """
+        Drop a key, or every key starting with it when it ends in ":".
+        Returns the number of entries removed.
+        """
+        if not key.endswith(":"):
+            return 1 if self._entries.pop(key, None) is not None else 0
+
+        matching = [k for k in self._entries if k.startswith(key)]
+        for k in matching:
+            del self._entries[k]
+        return len(matching)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_caches: List["CacheService"] = []
+
+
+class CacheService:
+    """
+    JSON cache in Redis with an in-process L1 in front of it.
+
+    Reads hit the L1 first and fall back to Redis; writes go to both.
+    Invalidations are broadcast over CACHE_INVALIDATION_CHANNEL so every
+    worker drops its L1 copy.
+
+    Keys are the ones other services invalidate; in Redis they are stored
+    under `key_prefix`, so entries can't collide with the same key written
+    by another service sharing the Redis DB.
+    """
+
+    def __init__(self, name: str, max_size: int = None, local_ttl: float = None, key_prefix: str = ""):
+        self.key_prefix = key_prefix
+        self.local = LocalCache(
+            name,
+            max_size or settings.LOCAL_CACHE_MAX_SIZE,
+            local_ttl or settings.LOCAL_CACHE_TTL,
+        )
+        _caches.append(self)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        cached = await redis_manager.get(self.key_prefix + key)
+        if not cached:
+            return None
+
+        try:
+            value = json.loads(cached)
+        except json.JSONDecodeError:
+            logger.warning(f"Corrupted cache data for {key}, ignoring")
+            return None
+
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int = None):
+        await redis_manager.set(self.key_prefix + key, json.dumps(value), ttl=ttl)
+        self.local.set(key, value)
+
+    async def set_many(self, values: Dict[str, Any], ttl: int = None):
+        """Write several keys in one pipelined round trip"""
+        pipe = redis_manager.pipeline()
+        for key, value in values.items():
+            pipe.set(self.key_prefix + key, json.dumps(value), ex=ttl)
+        await pipe.execute()
+        for key, value in values.items():
+            self.local.set(key, value)
+
+    async def invalidate(self, key: str):
+        """Delete a key from Redis and tell every worker to drop its L1 copy"""
+        if not key.endswith(":"):
+            await redis_manager.delete(self.key_prefix + key)
+        await redis_manager.publish(CACHE_INVALIDATION_CHANNEL, key)
+
+
+async def handle_invalidation(key: str):
+    """
+    Pub/sub handler for CACHE_INVALIDATION_CHANNEL.
+
+    Other services publish here after changing a user or template. Their
+    Redis may be a different logical DB, so matching keys are also deleted
+    from the gateway's own Redis copy (idempotent across workers). A prefix
+    only has to be scanned under the gateway's own key prefixes; unprefixed
+    keys belong to the publishing service, which deletes them itself.
+    """
+    removed = sum(cache.local.invalidate(key) for cache in _caches)
+    if not key.endswith(":"):
+        await redis_manager.delete(*sorted({cache.key_prefix + key for cache in _caches}))
+    else:
+        for prefix in sorted({cache.key_prefix for cache in _caches if cache.key_prefix}):
+            await redis_manager.delete_prefix(prefix + key)
+    logger.debug(f"Invalidated {removed} local cache entries for {key}")
+
+
+user_cache = CacheService("user")
+# The template service caches raw templates under the same keys in Redis
+template_cache = CacheService("template", key_prefix="gateway:")
@@ -1,10 +1,19 @@
 # ============================================
 # api-gateway/app/services/circuit_breaker.py
 # ============================================
+import json
 import time
 import logging
+from collections import deque
 from enum import Enum
+from typing import Dict, Optional
+from app.config.redis import redis_manager
 from app.config.settings import settings
+from app.services.metrics import (
+    CIRCUIT_BREAKER_CALLS_TOTAL,
+    CIRCUIT_BREAKER_STATE,
+    CIRCUIT_BREAKER_TRANSITIONS_TOTAL,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,52 +24,218 @@ class CircuitState(Enum):
     HALF_OPEN = "half_open"
 
 
+STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitBreakerOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"Circuit breaker for {name} is OPEN")
+
+
 class CircuitBreaker:
-    def __init__(self):
-        self.failure_count = 0
-        self.failure_threshold = settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+    """
+    Circuit breaker for one dependency.
+
+    Opens when, over the last CIRCUIT_BREAKER_WINDOW_SECONDS and with at
+    least CIRCUIT_BREAKER_MINIMUM_CALLS calls, the failure rate or the rate
+    of calls slower than CIRCUIT_BREAKER_SLOW_CALL_SECONDS reaches its
+    threshold. After CIRCUIT_BREAKER_TIMEOUT seconds one trial call is let
+    through. It closes the circuit if it succeeds and reopens it if not.
+
+    Opening and closing are written to Redis, and every worker picks up the
+    other workers' transitions at most CIRCUIT_BREAKER_SYNC_INTERVAL later.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float = None):
+        self.name = name
+        self.window_seconds = settings.CIRCUIT_BREAKER_WINDOW_SECONDS
+        self.minimum_calls = settings.CIRCUIT_BREAKER_MINIMUM_CALLS
+        self.failure_rate_threshold = settings.CIRCUIT_BREAKER_FAILURE_RATE
+        self.slow_call_rate_threshold = settings.CIRCUIT_BREAKER_SLOW_CALL_RATE
+        self.slow_call_seconds = slow_call_seconds or settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
         self.timeout = settings.CIRCUIT_BREAKER_TIMEOUT
-        self.last_failure_time = None
+
         self.state = CircuitState.CLOSED
+        self.open_until = 0.0
+        self.changed_at = 0.0
+        # One [second, calls, failures, slow calls] bucket per second
+        self._buckets: deque = deque()
+        self._trial_in_flight = False
+        self._last_sync = 0.0
+        CIRCUIT_BREAKER_STATE.labels(dependency=name).set(0)
+
+    @property
+    def redis_key(self) -> str:
+        return f"circuit_breaker:{self.name}"
 
     async def call(self, func):
         """
         Execute function with circuit breaker protection
         """
+        await self._sync()
+
         if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitState.HALF_OPEN
-                logger.info("Circuit breaker entering HALF_OPEN state")
-            else:
-                raise Exception("Circuit breaker is OPEN")
+            if time.time() < self.open_until:
+                CIRCUIT_BREAKER_CALLS_TOTAL.labels(dependency=self.name, result="rejected").inc()
+                raise CircuitBreakerOpenError(self.name)
+            self._transition(CircuitState.HALF_OPEN)
 
+        trial = self.state == CircuitState.HALF_OPEN
+        if trial:
+            # Only one trial call at a time, the rest fail fast until it is done
+            if self._trial_in_flight:
+                CIRCUIT_BREAKER_CALLS_TOTAL.labels(dependency=self.name, result="rejected").inc()
+                raise CircuitBreakerOpenError(self.name)
+            self._trial_in_flight = True
+
+        start = time.perf_counter()
         try:
             result = await func()
-            self._on_success()
-            return result
-        except Exception as e:
-            self._on_failure()
-            raise e
+        except Exception:
+            await self._record(False, time.perf_counter() - start, trial)
+            raise
+        finally:
+            if trial:
+                self._trial_in_flight = False
+        await self._record(True, time.perf_counter() - start, trial)
+        return result
+
+    def snapshot(self) -> dict:
+        """Current state and window statistics"""
+        calls, failures, slow = self._totals(time.time())
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "open_until": self.open_until if self.state == CircuitState.OPEN else None,
+            "window_seconds": self.window_seconds,
+            "calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow / calls if calls else 0.0,
+        }
+
+    async def _record(self, success: bool, duration: float, trial: bool):
+        """Record a call outcome and open or close the circuit if needed"""
+        now = time.time()
+        slow = duration >= self.slow_call_seconds
+        second = int(now)
+        if self._buckets and self._buckets[-1][0] == second:
+            bucket = self._buckets[-1]
+        else:
+            bucket = [second, 0, 0, 0]
+            self._buckets.append(bucket)
+        bucket[1] += 1
+        bucket[2] += 0 if success else 1
+        bucket[3] += 1 if slow else 0
+
+        result = "failure" if not success else "slow" if slow else "success"
+        CIRCUIT_BREAKER_CALLS_TOTAL.labels(dependency=self.name, result=result).inc()
+
+        if trial:
+            if success and not slow:
+                self._buckets.clear()
+                self._transition(CircuitState.CLOSED)
+            else:
+                self._open(now)
+            await self._publish()
+            return
+
+        if self.state != CircuitState.CLOSED:
+            return
+        calls, failures, slow_calls = self._totals(now)
+        if calls < self.minimum_calls:
+            return
+        if (
+            failures / calls >= self.failure_rate_threshold
+            or slow_calls / calls >= self.slow_call_rate_threshold
+        ):
+            logger.warning(
+                f"Circuit breaker for {self.name} OPENED "
+                f"({failures}/{calls} failed, {slow_calls}/{calls} slow)"
+            )
+            self._open(now)
+            await self._publish()
+
+    def _totals(self, now: float):
+        """Calls, failures and slow calls within the rolling window"""
+        oldest = int(now) - self.window_seconds
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+        calls = sum(bucket[1] for bucket in self._buckets)
+        failures = sum(bucket[2] for bucket in self._buckets)
+        slow = sum(bucket[3] for bucket in self._buckets)
+        return calls, failures, slow
+
+    def _open(self, now: float):
+        self.open_until = now + self.timeout
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState):
+        if state == self.state:
+            return
+        CIRCUIT_BREAKER_TRANSITIONS_TOTAL.labels(
+            dependency=self.name, from_state=self.state.value, to_state=state.value
+        ).inc()
+        CIRCUIT_BREAKER_STATE.labels(dependency=self.name).set(STATE_VALUES[state])
+        logger.info(f"Circuit breaker for {self.name}: {self.state.value} -> {state.value}")
+        self.state = state
+        self.changed_at = time.time()
 
-    def _on_success(self):
-        """Handle successful call"""
-        self.failure_count = 0
+    async def _publish(self):
+        """Share an open/closed decision with the other workers"""
         if self.state == CircuitState.HALF_OPEN:
-            self.state = CircuitState.CLOSED
-            logger.info("Circuit breaker CLOSED")
-
-    def _on_failure(self):
-        """Handle failed call"""
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-
-        if self.failure_count >= self.failure_threshold:
-            self.state = CircuitState.OPEN
-            logger.warning("Circuit breaker OPENED")
-
-    def _should_attempt_reset(self) -> bool:
-        """Check if enough time has passed to try again"""
-        return (
-            self.last_failure_time
-            and time.time() - self.last_failure_time >= self.timeout
-        )
+            return
+        value = json.dumps({
+            "state": self.state.value,
+            "open_until": self.open_until,
+            "changed_at": self.changed_at,
+        })
+        try:
+            await redis_manager.set(self.redis_key, value, ttl=max(self.timeout * 2, 60))
+        except Exception as e:
+            logger.debug(f"Could not share circuit breaker state for {self.name}: {e}")
+
+    async def _sync(self):
+        """Adopt a newer open/closed decision made by another worker"""
+        now = time.time()
+        if now - self._last_sync < settings.CIRCUIT_BREAKER_SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            value = await redis_manager.get(self.redis_key)
+        except Exception as e:
+            logger.debug(f"Could not read circuit breaker state for {self.name}: {e}")
+            return
+        if not value:
+            return
+
+        shared = json.loads(value)
+        if shared["changed_at"] <= self.changed_at:
+            return
+        if shared["state"] == CircuitState.OPEN.value and shared["open_until"] > now:
+            self.open_until = shared["open_until"]
+            self._transition(CircuitState.OPEN)
+        elif shared["state"] == CircuitState.CLOSED.value and self.state != CircuitState.CLOSED:
+            self._buckets.clear()
+            self._transition(CircuitState.CLOSED)
+        self.changed_at = shared["changed_at"]
+
+
+class CircuitBreakerRegistry:
+    """One circuit breaker per dependency, shared by the whole worker"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str, slow_call_seconds: Optional[float] = None) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(name, slow_call_seconds)
+        return self._breakers[name]
+
+    def snapshot(self) -> list:
+        return [breaker.snapshot() for breaker in self._breakers.values()]
+
+
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,126 @@
+# ============================================
+# api-gateway/app/services/health_monitor.py
+# ============================================
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from app.config.settings import settings
+from app.services.metrics import DEPENDENCY_UP
+
+from app.utils.logger import logger
+
+
+Probe = Callable[[], Awaitable[bool]]
+
+
+class HealthMonitor:
+    """
+    Dependency health, probed in the background.
+
+    Every HEALTH_CHECK_INTERVAL seconds each registered probe runs once,
+    concurrently and under HEALTH_CHECK_TIMEOUT, and the results replace the
+    snapshot. Health endpoints serve the snapshot with its age, so a
+    Kubernetes probe never opens a connection or waits on a dependency.
+    """
+
+    def __init__(self, interval: float = None, timeout: float = None):
+        self.interval = interval or settings.HEALTH_CHECK_INTERVAL
+        self.timeout = timeout or settings.HEALTH_CHECK_TIMEOUT
+        self.probes: Dict[str, Probe] = {}
+        self.results: Dict[str, dict] = {}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, probe: Probe):
+        """Add a probe; it returns True when the dependency is up"""
+        self.probes[name] = probe
+
+    async def refresh(self):
+        """Run every probe once and store the results"""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name) for name in names))
+        self.results = dict(zip(names, results))
+        self.checked_at = time.time()
+
+    async def _probe(self, name: str) -> dict:
+        started = time.perf_counter()
+        error = None
+        try:
+            up = bool(await asyncio.wait_for(self.probes[name](), self.timeout))
+        except asyncio.TimeoutError:
+            up, error = False, f"timed out after {self.timeout}s"
+        except Exception as e:
+            up, error = False, (str(e) or type(e).__name__).splitlines()[0]
+
+        DEPENDENCY_UP.labels(dependency=name).set(1 if up else 0)
+        result = {
+            "status": "up" if up else "down",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def snapshot(self) -> dict:
+        """The last results, with when they were taken and how long ago"""
+        if self.checked_at is None:
+            return {
+                "dependencies": {name: {"status": "unknown"} for name in self.probes},
+                "checked_at": None,
+                "age_seconds": None,
+            }
+        return {
+            "dependencies": self.results,
+            "checked_at": datetime.fromtimestamp(self.checked_at, timezone.utc)
+            .isoformat()
+            .replace("+00:00", "Z"),
+            "age_seconds": round(time.time() - self.checked_at, 3),
+        }
+
+    async def start(self):
+        """Take a first snapshot, then keep refreshing it in the background"""
+        if self._task is None:
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresher"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Health check refresh failed: {e}")
+
+
+async def check_rabbitmq() -> bool:
+    """The publisher's connection is open"""
+    from app.config.rabbitmq import rabbitmq_manager
+
+    return bool(rabbitmq_manager.connection and not rabbitmq_manager.connection.is_closed)
+
+
+async def check_redis() -> bool:
+    """The shared Redis client answers a PING"""
+    from app.config.redis import redis_manager
+
+    if not redis_manager.client:
+        return False
+    return bool(await redis_manager.client.ping())
+
+
+health_monitor = HealthMonitor()
+health_monitor.register("rabbitmq", check_rabbitmq)
+health_monitor.register("redis", check_redis)
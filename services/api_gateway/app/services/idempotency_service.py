@@ -1,28 +1,159 @@
 # ============================================
 # api-gateway/app/services/idempotency_service.py
 # ============================================
+import asyncio
 import json
 import logging
+from typing import Dict, List, Optional, Tuple
 from app.config.redis import redis_manager
 
 logger = logging.getLogger(__name__)
 
 IDEMPOTENCY_TTL = 86400  # 24 hours
+IN_PROGRESS_TTL = 30  # how long a reservation survives a crashed worker
+IN_PROGRESS_WAIT = 2.0  # how long a duplicate waits for the first request to finish
+IN_PROGRESS_POLL_INTERVAL = 0.05
+
+# Claim the key with an in-progress marker unless it is already taken.
+# Returns the existing value (final result or someone else's marker), or nil
+# when the caller now owns the reservation.
+RESERVE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    return existing
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return false
+"""
+
+# Drop the marker only if it is still ours and was never upgraded to a result
+RELEASE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if not existing then
+    return 0
+end
+local ok, value = pcall(cjson.decode, existing)
+if ok and value['in_progress'] and value['notification_id'] == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
 
 class IdempotencyService:
+    _reserve_script = None
+    _release_script = None
+
+    @staticmethod
+    def _key(request_id: str) -> str:
+        return f"idempotency:{request_id}"
+
+    @staticmethod
+    def _marker(notification_id: str) -> str:
+        return json.dumps({
+            "notification_id": notification_id,
+            "status": "pending",
+            "message": "Request is already being processed",
+            "in_progress": True,
+        })
+
+    @staticmethod
+    def is_in_progress(result: Optional[dict]) -> bool:
+        """
+        Check if a stored value is an in-progress marker rather than a result
+        """
+        return bool(result and result.get("in_progress"))
+
+    @classmethod
+    def _scripts(cls):
+        if cls._reserve_script is None:
+            cls._reserve_script = redis_manager.register_script(RESERVE_SCRIPT)
+            cls._release_script = redis_manager.register_script(RELEASE_SCRIPT)
+        return cls._reserve_script, cls._release_script
+
+    async def reserve(
+        self, request_id: str, notification_id: str, wait: float = IN_PROGRESS_WAIT
+    ) -> Optional[dict]:
+        """
+        Atomically reserve a request ID for processing
+
+        Returns None when the caller owns the reservation and must process the
+        request. Otherwise returns the stored result, or the in-progress marker
+        of the request holding the reservation if it did not finish within
+        `wait` seconds. If the holder releases its reservation while we wait,
+        the reservation passes to us.
+        """
+        reserve_script, _ = self._scripts()
+        key = self._key(request_id)
+        marker = self._marker(notification_id)
+        deadline = asyncio.get_running_loop().time() + wait
+
+        while True:
+            existing = await reserve_script(keys=[key], args=[marker, IN_PROGRESS_TTL])
+            if existing is None:
+                return None
+
+            result = json.loads(existing)
+            if not self.is_in_progress(result) or asyncio.get_running_loop().time() >= deadline:
+                return result
+            await asyncio.sleep(IN_PROGRESS_POLL_INTERVAL)
+
+    async def reserve_many(
+        self, reservations: List[Tuple[str, str]]
+    ) -> Dict[str, dict]:
+        """
+        Reserve several (request_id, notification_id) pairs in one round trip
+
+        Returns the stored result or in-progress marker for every request ID
+        that was already taken. Request IDs missing from the result are now
+        reserved by the caller. Taken reservations are not waited on.
+        """
+        if not reservations:
+            return {}
+        reserve_script, _ = self._scripts()
+        pipe = redis_manager.pipeline()
+        for request_id, notification_id in reservations:
+            await reserve_script(
+                keys=[self._key(request_id)],
+                args=[self._marker(notification_id), IN_PROGRESS_TTL],
+                client=pipe,
+            )
+        values = await pipe.execute()
+        return {
+            request_id: json.loads(value)
+            for (request_id, _), value in zip(reservations, values)
+            if value is not None
+        }
+
+    async def release(self, request_id: str, notification_id: str, pipe=None):
+        """
+        Release a reservation that did not produce a result so retries can
+        process the request again. A stored result is never removed.
+        """
+        _, release_script = self._scripts()
+        kwargs = {"client": pipe} if pipe is not None else {}
+        await release_script(
+            keys=[self._key(request_id)], args=[notification_id], **kwargs
+        )
+
     async def is_duplicate(self, request_id: str) -> bool:
         """
         Check if request ID has been processed
         """
-        key = f"idempotency:{request_id}"
+        key = self._key(request_id)
         return await redis_manager.exists(key)
 
-    async def store_result(self, request_id: str, result: dict):
+    async def store_result(self, request_id: str, result: dict, pipe=None):
         """
-        Store request result for idempotency
+        Store request result for idempotency, replacing the reservation
+
+        When a pipeline is given the write is only queued on it and the
+        caller is responsible for executing the pipeline.
         """
-        key = f"idempotency:{request_id}"
+        key = self._key(request_id)
+        if pipe is not None:
+            pipe.setex(key, IDEMPOTENCY_TTL, json.dumps(result))
+            return
         await redis_manager.set(key, json.dumps(result), ttl=IDEMPOTENCY_TTL)
         logger.info(f"Stored idempotency key: {request_id}")
 
@@ -30,6 +161,19 @@ class IdempotencyService:
         """
         Get cached result for duplicate request
         """
-        key = f"idempotency:{request_id}"
+        key = self._key(request_id)
         result = await redis_manager.get(key)
         return json.loads(result) if result else None
+
+    async def get_results(self, request_ids: List[str]) -> Dict[str, dict]:
+        """
+        Get cached results for several request IDs with one MGET.
+        Only request IDs that have already been processed are returned.
+        """
+        keys = [self._key(request_id) for request_id in request_ids]
+        values = await redis_manager.mget(keys)
+        return {
+            request_id: json.loads(values[key])
+            for request_id, key in zip(request_ids, keys)
+            if values.get(key)
+        }
@@ -1,8 +1,15 @@
 # api-gateway/app/metrics.py
+import os
 from prometheus_client import Counter, Histogram, Gauge
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST, multiprocess
 from fastapi import Response
 
+# Set (to an empty directory) when running several uvicorn workers: every
+# worker then writes its samples there and /metrics reports all of them.
+# multiprocess_mode says how a gauge's per-worker values are combined,
+# "live" modes ignore workers that have exited.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
 # Total API requests received
 REQUESTS_TOTAL = Counter(
     "api_gateway_requests_total",
@@ -24,6 +31,14 @@ REQUEST_DURATION_SECONDS = Histogram(
     ["endpoint", "method"]
 )
 
+# Per-stage breakdown of notification ingest (idempotency, enrich, publish, persist)
+NOTIFICATION_STAGE_DURATION_SECONDS = Histogram(
+    "api_gateway_notification_stage_duration_seconds",
+    "Time spent in each stage of notification processing",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
 # Notifications routed by type (email/push)
 NOTIFICATION_TYPE_TOTAL = Counter(
     "api_gateway_notification_type_total",
@@ -34,9 +49,168 @@ NOTIFICATION_TYPE_TOTAL = Counter(
 # Optional: Service health (1 = healthy, 0 = unhealthy)
 SERVICE_HEALTH = Gauge(
     "api_gateway_up",
-    "API Gateway service health"
+    "API Gateway service health",
+    multiprocess_mode="livemin"
+)
+
+# Last background probe of each dependency (1 = up, 0 = down)
+DEPENDENCY_UP = Gauge(
+    "api_gateway_dependency_up",
+    "Whether the last health probe of a dependency succeeded",
+    ["dependency"],
+    multiprocess_mode="livemin"
+)
+
+# Upstream HTTP connection pool usage (user/template service clients)
+HTTP_POOL_CONNECTIONS = Gauge(
+    "api_gateway_http_pool_connections",
+    "Connections in the upstream HTTP client pool",
+    ["upstream", "state"],
+    multiprocess_mode="livesum"
+)
+
+HTTP_POOL_WAITING_REQUESTS = Gauge(
+    "api_gateway_http_pool_waiting_requests",
+    "Requests waiting for a connection from the upstream HTTP client pool",
+    ["upstream"],
+    multiprocess_mode="livesum"
+)
+
+# In-process (L1) cache in front of Redis for user/template lookups
+LOCAL_CACHE_HITS_TOTAL = Counter(
+    "api_gateway_local_cache_hits_total",
+    "In-process cache hits",
+    ["cache"]
+)
+
+LOCAL_CACHE_MISSES_TOTAL = Counter(
+    "api_gateway_local_cache_misses_total",
+    "In-process cache misses",
+    ["cache"]
+)
+
+LOCAL_CACHE_EVICTIONS_TOTAL = Counter(
+    "api_gateway_local_cache_evictions_total",
+    "In-process cache entries evicted because the cache was full",
+    ["cache"]
+)
+
+# Callers that shared an in-flight upstream fetch instead of starting their own
+SINGLE_FLIGHT_COALESCED_TOTAL = Counter(
+    "api_gateway_single_flight_coalesced_total",
+    "Callers coalesced onto an in-flight fetch for the same key",
+    ["group"]
+)
+
+# Rate limiter decisions, source is "local" when served from a leased token
+RATE_LIMIT_DECISIONS_TOTAL = Counter(
+    "api_gateway_rate_limit_decisions_total",
+    "Rate limiter decisions",
+    ["result", "source"]
+)
+
+# RabbitMQ publisher confirms
+RABBITMQ_CONFIRM_LATENCY_SECONDS = Histogram(
+    "api_gateway_rabbitmq_confirm_latency_seconds",
+    "Time from publishing a message to the broker confirming it",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+RABBITMQ_CONFIRMS_TOTAL = Counter(
+    "api_gateway_rabbitmq_confirms_total",
+    "Publish outcomes (ack, nack, returned, timeout, error, or sent without confirms)",
+    ["result"]
+)
+
+RABBITMQ_CONFIRM_WINDOW_IN_FLIGHT = Gauge(
+    "api_gateway_rabbitmq_confirm_window_in_flight",
+    "Publishes waiting for a broker confirm",
+    multiprocess_mode="livesum"
+)
+
+RABBITMQ_CONFIRM_WINDOW_SIZE = Gauge(
+    "api_gateway_rabbitmq_confirm_window_size",
+    "Maximum number of publishes allowed to wait for a broker confirm",
+    multiprocess_mode="livesum"
+)
+
+RABBITMQ_MESSAGE_BYTES = Histogram(
+    "api_gateway_rabbitmq_message_bytes",
+    "Size of published message bodies after encoding and compression",
+    ["queue", "content_type", "content_encoding"],
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144)
+)
+
+# Local outbox used while RabbitMQ is slow or down
+OUTBOX_DEPTH = Gauge(
+    "api_gateway_outbox_depth",
+    "Messages waiting in the local outbox",
+    multiprocess_mode="livemax"
+)
+
+OUTBOX_WRITES_TOTAL = Counter(
+    "api_gateway_outbox_writes_total",
+    "Messages written to the local outbox instead of the broker"
+)
+
+OUTBOX_REPLAYED_TOTAL = Counter(
+    "api_gateway_outbox_replayed_total",
+    "Outbox messages replayed to the broker",
+    ["result"]
+)
+
+# Per-dependency circuit breakers (user-service, template-service, rabbitmq)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "api_gateway_circuit_breaker_state",
+    "Circuit breaker state (0 = closed, 1 = half open, 2 = open)",
+    ["dependency"],
+    multiprocess_mode="livemax"
+)
+
+CIRCUIT_BREAKER_TRANSITIONS_TOTAL = Counter(
+    "api_gateway_circuit_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ["dependency", "from_state", "to_state"]
+)
+
+CIRCUIT_BREAKER_CALLS_TOTAL = Counter(
+    "api_gateway_circuit_breaker_calls_total",
+    "Calls through a circuit breaker (success, failure, slow, rejected)",
+    ["dependency", "result"]
+)
+
+# Status stream
+STATUS_STREAM_SUBSCRIBERS = Gauge(
+    "api_gateway_status_stream_subscribers",
+    "Clients connected to the status stream",
+    multiprocess_mode="livesum"
+)
+
+STATUS_STREAM_EVENTS_TOTAL = Counter(
+    "api_gateway_status_stream_events_total",
+    "Status events queued for stream clients, or dropped for slow ones",
+    ["result"]
+)
+
+# Logging
+LOG_RECORDS_DISCARDED_TOTAL = Counter(
+    "api_gateway_log_records_discarded_total",
+    "Log records not written, sampled out or dropped with the log queue full",
+    ["reason"]
 )
 
 def prometheus_metrics():
     """Return Prometheus metrics as HTTP response"""
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    if MULTIPROC_DIR:
+        # Built per scrape, the collector reads the files of every worker
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_dead():
+    """Drop this worker's live gauges from the shared metrics on shutdown"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -4,50 +4,178 @@
 import json
 import logging
 from datetime import datetime
+from typing import Dict, List
+from redis.exceptions import ResponseError
 from app.config.redis import redis_manager
 from app.schemas.notification_schema import NotificationStatus
+from app.services.status_stream import STATUS_EVENTS_CHANNEL
 
 logger = logging.getLogger(__name__)
 
 TRACKER_TTL = 604800  # 7 days
 
+# Update a tracker hash in place. Records written before trackers were hashes
+# are JSON strings; those are converted first, keeping their remaining TTL.
+# A status may only move forward: pending -> failed -> delivered, and a
+# delivered notification never goes back to pending or failed.
+# Accepted updates are published on ARGV[4] for the status stream.
+# Returns 1 when updated, 0 when the record doesn't exist and -1 when the
+# transition is not allowed.
+UPDATE_STATUS_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'none' then
+    return 0
+end
+if kind == 'string' then
+    local ttl = redis.call('PTTL', KEYS[1])
+    local data = cjson.decode(redis.call('GET', KEYS[1]))
+    redis.call('DEL', KEYS[1])
+    for field, value in pairs(data) do
+        if type(value) == 'string' or type(value) == 'number' then
+            redis.call('HSET', KEYS[1], field, value)
+        end
+    end
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[1], ttl)
+    end
+end
+
+local allowed = {
+    pending = {pending = true, failed = true, delivered = true},
+    failed = {failed = true, delivered = true},
+    delivered = {delivered = true},
+}
+local current = redis.call('HGET', KEYS[1], 'status')
+if current and allowed[current] and not allowed[current][ARGV[1]] then
+    return -1
+end
+
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'updated_at', ARGV[2])
+if ARGV[3] ~= '' then
+    redis.call('HSET', KEYS[1], 'error', ARGV[3])
+end
+
+local event = {notification_id = ARGV[5], status = ARGV[1], updated_at = ARGV[2]}
+local correlation_id = redis.call('HGET', KEYS[1], 'correlation_id')
+if correlation_id then
+    event['correlation_id'] = correlation_id
+end
+if ARGV[3] ~= '' then
+    event['error'] = ARGV[3]
+end
+redis.call('PUBLISH', ARGV[4], cjson.encode(event))
+return 1
+"""
+
 
 class NotificationTracker:
-    async def track(self, notification_id: str, status: NotificationStatus):
+    _update_script = None
+
+    @staticmethod
+    def _key(notification_id: str) -> str:
+        return f"notification:{notification_id}"
+
+    async def track(
+        self,
+        notification_id: str,
+        status: NotificationStatus,
+        pipe=None,
+        correlation_id: str = None,
+    ):
         """
         Track notification status
+
+        When a pipeline is given the write is only queued on it and the
+        caller is responsible for executing the pipeline.
         """
-        key = f"notification:{notification_id}"
+        key = self._key(notification_id)
+        now = datetime.utcnow().isoformat()
         data = {
             "notification_id": notification_id,
             "status": status.value,
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat(),
+            "created_at": now,
+            "updated_at": now,
         }
-        await redis_manager.set(key, json.dumps(data), ttl=TRACKER_TTL)
+        if correlation_id:
+            # Lets stream clients follow every notification of a request
+            data["correlation_id"] = correlation_id
+        execute = pipe is None
+        if execute:
+            pipe = redis_manager.pipeline()
+        pipe.hset(key, mapping=data)
+        pipe.expire(key, TRACKER_TTL)
+        if execute:
+            await pipe.execute()
 
     async def update_status(
         self, notification_id: str, status: NotificationStatus, error: str = None
-    ):
+    ) -> bool:
         """
-        Update notification status
-        """
-        key = f"notification:{notification_id}"
-        existing = await redis_manager.get(key)
-
-        if existing:
-            data = json.loads(existing)
-            data["status"] = status.value
-            data["updated_at"] = datetime.utcnow().isoformat()
-            if error:
-                data["error"] = error
+        Update notification status in a single atomic round trip
 
-            await redis_manager.set(key, json.dumps(data), ttl=TRACKER_TTL)
+        Returns False if the notification is unknown or the update would move
+        it back to an earlier status, for example delivered to pending.
+        """
+        if NotificationTracker._update_script is None:
+            NotificationTracker._update_script = redis_manager.register_script(
+                UPDATE_STATUS_SCRIPT
+            )
+        result = await self._update_script(
+            keys=[self._key(notification_id)],
+            args=[
+                status.value,
+                datetime.utcnow().isoformat(),
+                error or "",
+                STATUS_EVENTS_CHANNEL,
+                notification_id,
+            ],
+        )
+        if int(result) < 0:
+            logger.info(
+                f"Ignored status {status.value} for {notification_id}, "
+                f"it already has a later status"
+            )
+        return int(result) == 1
 
     async def get_status(self, notification_id: str) -> dict:
         """
         Get notification status
         """
-        key = f"notification:{notification_id}"
-        result = await redis_manager.get(key)
-        return json.loads(result) if result else None
+        key = self._key(notification_id)
+        try:
+            result = await redis_manager.hgetall(key)
+        except ResponseError:
+            # Record written before trackers were hashes
+            result = await redis_manager.get(key)
+            return json.loads(result) if result else None
+        return result or None
+
+    async def get_statuses(self, notification_ids: List[str]) -> Dict[str, dict]:
+        """
+        Get the status of several notifications in one pipelined round trip
+
+        Only notifications that have a tracker record are returned.
+        """
+        keys = [self._key(notification_id) for notification_id in notification_ids]
+        pipe = redis_manager.pipeline()
+        for key in keys:
+            pipe.hgetall(key)
+        values = await pipe.execute(raise_on_error=False)
+
+        statuses = {}
+        legacy = []
+        for notification_id, key, value in zip(notification_ids, keys, values):
+            if isinstance(value, ResponseError):
+                legacy.append((notification_id, key))
+            elif isinstance(value, Exception):
+                raise value
+            elif value:
+                statuses[notification_id] = value
+
+        if legacy:
+            # Records written before trackers were hashes
+            legacy_values = await redis_manager.mget([key for _, key in legacy])
+            for notification_id, key in legacy:
+                if legacy_values.get(key):
+                    statuses[notification_id] = json.loads(legacy_values[key])
+        return statuses
@@ -0,0 +1,213 @@
+# ============================================
+# api-gateway/app/services/outbox.py
+# ============================================
+import json
+import os
+import time
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from app.config.settings import settings
+from app.services.metrics import OUTBOX_DEPTH, OUTBOX_REPLAYED_TOTAL, OUTBOX_WRITES_TOTAL
+
+from app.utils.logger import logger
+
+
+# How long a drainer owns the rows it claimed before another worker may retry them
+CLAIM_SECONDS = 60
+
+
+class Outbox:
+    """
+    Durable local queue for messages the broker could not take right away.
+
+    Rows live in a SQLite database in WAL mode, so an append is a single
+    local insert that survives a gateway restart. Several workers may share
+    the file. Each drainer claims a batch before publishing it, so two
+    workers don't replay the same rows at the same time. Replay is at least
+    once: if a worker dies after publishing but before deleting, the rows
+    are published again once the claim expires.
+
+    SQLite calls block, up to the busy timeout while another worker holds
+    the write lock, so they run on a thread of their own rather than on
+    the event loop.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.OUTBOX_PATH
+        self.conn: Optional[sqlite3.Connection] = None
+        self._drainer_task: Optional[asyncio.Task] = None
+        # One thread, so the connection is never used by two at once
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        """Open (and create if needed) the outbox database"""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        await self._run(self._open)
+        depth = await self.depth()
+        OUTBOX_DEPTH.set(depth)
+        logger.info(f"Outbox opened at {self.path} with {depth} pending messages")
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None, timeout=5.0, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Commits survive a process crash without an fsync per append
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue_name TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                claimed_until REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    async def close(self):
+        """Close the outbox database"""
+        if self.conn:
+            await self._run(self.conn.close)
+            self.conn = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def append(self, queue_name: str, message: dict):
+        """Store a message for later delivery"""
+        await self._run(
+            self.conn.execute,
+            "INSERT INTO outbox (queue_name, message, created_at) VALUES (?, ?, ?)",
+            (queue_name, json.dumps(message), time.time()),
+        )
+        OUTBOX_WRITES_TOTAL.inc()
+        OUTBOX_DEPTH.inc()
+
+    async def depth(self) -> int:
+        """Number of messages waiting in the outbox"""
+        return await self._run(self._depth)
+
+    def _depth(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    async def claim(self, limit: int) -> List[Tuple[int, str, dict]]:
+        """Claim up to `limit` of the oldest unclaimed messages"""
+        return await self._run(self._claim, limit)
+
+    def _claim(self, limit: int) -> List[Tuple[int, str, dict]]:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT id, queue_name, message FROM outbox "
+                "WHERE claimed_until < ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            if rows:
+                self.conn.executemany(
+                    "UPDATE outbox SET claimed_until = ? WHERE id = ?",
+                    [(now + CLAIM_SECONDS, row[0]) for row in rows],
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [(row_id, queue_name, json.loads(message)) for row_id, queue_name, message in rows]
+
+    async def complete(self, ids: List[int]):
+        """Delete messages that were delivered"""
+        if ids:
+            await self._run(self.conn.executemany, "DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    async def release(self, ids: List[int]):
+        """Make claimed messages available again after a failed delivery"""
+        if ids:
+            await self._run(
+                self.conn.executemany,
+                "UPDATE outbox SET claimed_until = 0 WHERE id = ?",
+                [(i,) for i in ids],
+            )
+
+    async def drain_once(self, publish) -> int:
+        """
+        Replay one batch through `publish(queue_name, message)`
+
+        Returns how many messages were delivered. Stops at the first batch
+        with a failure so a broker that is still down isn't hammered.
+        """
+        batch = await self.claim(settings.OUTBOX_DRAIN_BATCH_SIZE)
+        if not batch:
+            return 0
+
+        results = await asyncio.gather(
+            *(publish(queue_name, message) for _, queue_name, message in batch),
+            return_exceptions=True,
+        )
+        delivered = [row[0] for row, result in zip(batch, results) if not isinstance(result, Exception)]
+        failed = [row[0] for row, result in zip(batch, results) if isinstance(result, Exception)]
+        await self.complete(delivered)
+        await self.release(failed)
+
+        OUTBOX_REPLAYED_TOTAL.labels(result="delivered").inc(len(delivered))
+        OUTBOX_REPLAYED_TOTAL.labels(result="failed").inc(len(failed))
+        OUTBOX_DEPTH.set(await self.depth())
+        if failed:
+            raise Exception(f"{len(failed)} of {len(batch)} outbox messages failed to publish")
+        return len(delivered)
+
+    async def start_drainer(self):
+        """Start the background task that replays the outbox"""
+        if self.conn and self._drainer_task is None:
+            self._drainer_task = asyncio.create_task(self._drain())
+
+    async def stop_drainer(self):
+        """Stop the background drainer"""
+        if self._drainer_task:
+            self._drainer_task.cancel()
+            try:
+                await self._drainer_task
+            except asyncio.CancelledError:
+                pass
+            self._drainer_task = None
+
+    async def _drain(self):
+        """Replay outbox batches whenever the broker is reachable"""
+        from app.config.rabbitmq import rabbitmq_manager
+
+        interval = settings.OUTBOX_DRAIN_INTERVAL
+        while True:
+            try:
+                if not await self.depth():
+                    await asyncio.sleep(interval)
+                    continue
+
+                # The gateway may have started while the broker was down
+                if rabbitmq_manager.connection is None:
+                    await rabbitmq_manager.connect()
+
+                delivered = await self.drain_once(rabbitmq_manager.publish_message)
+                interval = settings.OUTBOX_DRAIN_INTERVAL
+                if delivered:
+                    logger.info(f"Replayed {delivered} messages from the outbox")
+                else:
+                    # Depth counts rows another worker has claimed; wait for
+                    # their claim to finish or lapse instead of spinning
+                    await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Back off while the broker is unavailable
+                interval = min(interval * 2, 30.0)
+                logger.warning(f"Outbox drain failed: {e}. Retrying in {interval:.0f}s")
+                await asyncio.sleep(interval)
+
+
+outbox = Outbox()
@@ -2,9 +2,13 @@
 # api-gateway/app/services/queue_service.py
 # ============================================
 import json
+import asyncio
 import logging
+from typing import List, Optional, Tuple
 from app.config.rabbitmq import rabbitmq_manager
-from app.services.circuit_breaker import CircuitBreaker
+from app.config.settings import settings
+from app.services.circuit_breaker import circuit_breakers
+from app.services.outbox import outbox
 from fastapi.encoders import jsonable_encoder  # Add this import
 
 from app.utils.logger import logger
@@ -12,27 +16,70 @@ from app.utils.logger import logger
 
 class QueueService:
     def __init__(self):
-        self.circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breakers.get("rabbitmq")
 
     async def publish(self, queue_name: str, message: dict):
         """
         Publish message to RabbitMQ queue with circuit breaker
+
+        If the broker fails, is too slow or the circuit is open, the message
+        goes to the local outbox and is replayed once the broker recovers.
         """
+        # Convert Pydantic models and special types to JSON-serializable dict
+        serializable_message = jsonable_encoder(message)
+        use_outbox = self._outbox_available()
 
         async def _publish():
-            # Convert Pydantic models and special types to JSON-serializable dict
-            serializable_message = jsonable_encoder(message)
             # Pass dict directly - let publish_message handle json.dumps
-            await rabbitmq_manager.publish_message(queue_name, serializable_message)
+            publish = rabbitmq_manager.publish_message(queue_name, serializable_message)
+            if use_outbox:
+                # Don't hold the request hostage to a slow broker
+                publish = asyncio.wait_for(publish, timeout=settings.OUTBOX_PUBLISH_TIMEOUT)
+            await publish
 
         try:
             await self.circuit_breaker.call(_publish)
         except Exception as e:
             logger.error(f"Failed to publish to {queue_name}: {e}")
+            if use_outbox and await self._write_to_outbox(queue_name, serializable_message):
+                return
             # Move to failed queue
             await self._handle_failed_publish(message, str(e))
             raise
 
+    async def publish_many(
+        self, messages: List[Tuple[str, dict]]
+    ) -> List[Optional[Exception]]:
+        """
+        Publish several (queue_name, message) pairs concurrently.
+
+        The publishes are spread over the channel pool so their broker
+        confirmations are awaited together instead of one after another.
+        Returns one entry per message: None on success, or the exception
+        that made it fail.
+        """
+        results = await asyncio.gather(
+            *(self.publish(queue_name, message) for queue_name, message in messages),
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    @staticmethod
+    def _outbox_available() -> bool:
+        return settings.OUTBOX_ENABLED and outbox.conn is not None
+
+    async def _write_to_outbox(self, queue_name: str, message: dict) -> bool:
+        """
+        Store a message in the local outbox, returning False if that failed
+        """
+        try:
+            await outbox.append(queue_name, message)
+            logger.warning(f"Stored message for {queue_name} in the outbox")
+            return True
+        except Exception as e:
+            logger.critical(f"Failed to write to outbox: {e}")
+            return False
+
     async def _handle_failed_publish(self, message: dict, error: str):
         """
         Handle failed message publication
@@ -0,0 +1,106 @@
+# ============================================
+# api-gateway/app/services/status_stream.py
+# ============================================
+import json
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+from app.config.settings import settings
+from app.services.metrics import STATUS_STREAM_EVENTS_TOTAL, STATUS_STREAM_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+# Every tracker update is published here by the update script
+STATUS_EVENTS_CHANNEL = "notification:status-events"
+
+
+class StatusSubscription:
+    """
+    One client's view of the status stream: the notifications and
+    correlation IDs it follows and the events waiting to be sent to it.
+    """
+
+    def __init__(self, notification_ids: List[str], correlation_id: Optional[str]):
+        self.topics = [f"notification:{notification_id}" for notification_id in notification_ids]
+        if correlation_id:
+            self.topics.append(f"correlation:{correlation_id}")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.STATUS_STREAM_QUEUE_SIZE)
+
+    def offer(self, event: dict):
+        """Queue an event, dropping the oldest one if the client is too slow"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            STATUS_STREAM_EVENTS_TOTAL.labels(result="dropped").inc()
+        self.queue.put_nowait(event)
+        STATUS_STREAM_EVENTS_TOTAL.labels(result="queued").inc()
+
+    async def get(self, timeout: float = None) -> Optional[dict]:
+        """Next event, or None if none arrived within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatusStream:
+    """
+    Fans status events out to the stream clients of this worker.
+
+    The worker has one Redis subscription to STATUS_EVENTS_CHANNEL, shared
+    with the other pub/sub handlers through redis_manager. Each event is
+    routed in memory to the subscriptions following its notification ID or
+    its correlation ID, so the cost of a client is a queue, not a Redis
+    connection.
+    """
+
+    def __init__(self):
+        self._topics: Dict[str, Set[StatusSubscription]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(
+        self, notification_ids: List[str], correlation_id: Optional[str] = None
+    ) -> StatusSubscription:
+        """Start following notifications and/or a correlation ID"""
+        if self._count >= settings.STATUS_STREAM_MAX_SUBSCRIBERS:
+            raise OverflowError("Too many status stream subscribers on this worker")
+        subscription = StatusSubscription(notification_ids, correlation_id)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self._count += 1
+        STATUS_STREAM_SUBSCRIBERS.set(self._count)
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[topic]
+        self._count -= 1
+        STATUS_STREAM_SUBSCRIBERS.set(self._count)
+
+    def dispatch(self, event: dict) -> int:
+        """Hand an event to every subscription following it"""
+        targets = set(self._topics.get(f"notification:{event.get('notification_id')}", ()))
+        if event.get("correlation_id"):
+            targets.update(self._topics.get(f"correlation:{event['correlation_id']}", ()))
+        for subscription in targets:
+            subscription.offer(event)
+        return len(targets)
+
+    async def handle_event(self, message: str):
+        """Pub/sub handler for STATUS_EVENTS_CHANNEL"""
+        try:
+            event = json.loads(message)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed status event: {message[:200]}")
+            return
+        self.dispatch(event)
+
+
+status_stream = StatusStream()
@@ -1,13 +1,19 @@
 import httpx
 import logging
-import json
 from app.config.settings import settings
-from app.config.redis import redis_manager
+from app.config.http_client import http_client_manager
+from app.services.cache_service import template_cache
+from app.services.circuit_breaker import CircuitBreakerOpenError, circuit_breakers
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 TEMPLATE_CACHE_TTL = 3600  # seconds (1 hour)
 
+# Shared by every TemplateService so concurrent misses at a TTL boundary
+# result in one upstream fetch and one cache write
+template_fetches = SingleFlight("template")
+
 
 class TemplateService:
     def __init__(self):
@@ -17,46 +23,110 @@ class TemplateService:
     async def get_template(self, template_code: str, language: str = None) -> dict:
         """
         Fetch a template from the Template Service with optional language.
-        Uses Redis caching to reduce network calls.
+        Uses the in-process and Redis caches to reduce network calls.
         """
         cache_key = f"template:{template_code}:{language or 'default'}"
         logger.debug(f"Fetching template: code={template_code}, language={language}, cache_key={cache_key}")
 
         try:
-            # Check Redis cache first
-            cached = await redis_manager.get(cache_key)
+            # Check cache first (in-process, then Redis)
+            cached = await template_cache.get(cache_key)
             if cached:
-                logger.info(f"Cache hit for key={cache_key}")
-                try:
-                    data = json.loads(cached)
-                    logger.debug(f"Cache data successfully decoded for {cache_key}")
-                    return data
-                except json.JSONDecodeError:
-                    logger.warning(f"Corrupted cache data for {cache_key}, ignoring and fetching fresh")
-
-            logger.info(f"Cache miss for {cache_key}, fetching from Template Service")
-
-            # Fetch from Template Service API
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                params = {"language": language} if language else None
-                logger.debug(f"Sending GET {self.base_url}/api/templates/{template_code} with params={params}")
+                logger.debug(f"Cache hit for key={cache_key}")
+                return cached
+        except Exception as e:
+            logger.warning(f"Cache lookup failed for {cache_key}: {e}")
+
+        logger.info(f"Cache miss for {cache_key}, fetching from Template Service")
+        return await template_fetches.do(
+            cache_key, lambda: self._fetch_template(template_code, language, cache_key)
+        )
+
+    async def warm_cache(self) -> int:
+        """
+        Load every template from the Template Service's bulk endpoint into
+        the caches, under the keys get_template reads, so a freshly started
+        worker doesn't miss on its first request for each template code.
+        Templates have no draft or inactive state, so every one is cached.
+        Returns how many templates were cached; failures only log.
+        """
+        try:
+            client = http_client_manager.get_client("template")
+
+            async def _request():
+                response = await client.get("/api/templates")
+                response.raise_for_status()
+                return response
+
+            response = await circuit_breakers.get("template-service").call(_request)
+            body = response.json()
+        except Exception as e:
+            logger.warning(f"Template cache warm-up failed: {e}")
+            return 0
+
+        entries = {}
+        for template in body.get("data") or []:
+            # Same shape as a single-template response
+            response_data = {
+                "success": True,
+                "data": template,
+                "message": "Template retrieved successfully",
+            }
+            code = template["logical_id"]
+            keys = [f"template:{code}:{template['language']}"]
+            # Without a language the Template Service answers with English
+            if template["language"] == "en":
+                keys.append(f"template:{code}:default")
+            for key in keys:
+                entries[key] = response_data
+
+        try:
+            await template_cache.set_many(entries, ttl=TEMPLATE_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Template cache warm-up failed: {e}")
+            return 0
+
+        count = len(body.get("data") or [])
+        logger.info(
+            f"Template cache warmed with {count} templates",
+            extra={"event": "template_cache_warmed", "version": (body.get("meta") or {}).get("version")},
+        )
+        return count
+
+    async def _fetch_template(self, template_code: str, language: str, cache_key: str) -> dict:
+        """
+        Fetch a template from the Template Service and cache it
+        """
+        try:
+            # Fetch from Template Service API over the shared pooled client
+            client = http_client_manager.get_client("template")
+            params = {"language": language} if language else None
+            logger.debug(f"Sending GET {self.base_url}/api/templates/{template_code} with params={params}")
+
+            async def _request():
                 response = await client.get(
-                    f"{self.base_url}/api/templates/{template_code}",
+                    f"/api/templates/{template_code}",
                     params=params
                 )
-                response.raise_for_status()
+                # Only server errors count against the breaker, a 404 is an answer
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                return response
 
-                template_data = response.json()
-                logger.debug(f"Response received for template_code={template_code}: {template_data}")
+            response = await circuit_breakers.get("template-service").call(_request)
+            response.raise_for_status()
 
-                # Cache in Redis
-                await redis_manager.set(
-                    cache_key, json.dumps(template_data), ttl=TEMPLATE_CACHE_TTL
-                )
-                logger.info(f"Template {template_code} cached with TTL={TEMPLATE_CACHE_TTL}s")
+            template_data = response.json()
+            logger.debug(f"Response received for template_code={template_code}: {template_data}")
+
+            # Cache in Redis and in-process
+            await template_cache.set(cache_key, template_data, ttl=TEMPLATE_CACHE_TTL)
+            logger.info(f"Template {template_code} cached with TTL={TEMPLATE_CACHE_TTL}s")
 
-                return template_data
+            return template_data
 
+        except CircuitBreakerOpenError as e:
+            logger.warning(f"Not fetching template {template_code}: {e}")
         except httpx.RequestError as e:
             logger.error(
                 f"Network error contacting Template Service for code={template_code}: {e}",
@@ -4,13 +4,18 @@
 import httpx
 import logging
 from app.config.settings import settings
-from app.config.redis import redis_manager
-import json
+from app.config.http_client import http_client_manager
+from app.services.cache_service import user_cache
+from app.services.circuit_breaker import circuit_breakers
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 USER_CACHE_TTL = 3600  # 1 hour
 
+# Shared by every UserService so concurrent misses for a user fetch it once
+user_fetches = SingleFlight("user")
+
 
 class UserService:
     def __init__(self):
@@ -20,30 +25,44 @@ class UserService:
         """
         Get user from User Service with caching
         """
-        # Check cache first
+        # Check cache first (in-process, then Redis)
         cache_key = f"user:{user_id}"
-        cached = await redis_manager.get(cache_key)
+        cached = await user_cache.get(cache_key)
 
         if cached:
-            return json.loads(cached)
+            return cached
+
+        return await user_fetches.do(
+            cache_key, lambda: self._fetch_user(user_id, cache_key)
+        )
 
-        # Fetch from service
+    async def _fetch_user(self, user_id: str, cache_key: str) -> dict:
+        """
+        Fetch user from User Service and cache it
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/api/v1/users/{user_id}")
-                response.raise_for_status()
-                user_data = response.json()
+            client = http_client_manager.get_client("user")
 
-                logger.info(f"Fetched user data for {user_id}: {user_data}")
+            async def _request():
+                response = await client.get(f"/api/v1/users/{user_id}")
+                # Only server errors count against the breaker, a 404 is an answer
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                return response
 
-                # Cache result
-                await redis_manager.set(
-                    cache_key, json.dumps(user_data), ttl=USER_CACHE_TTL
-                )
+            response = await circuit_breakers.get("user-service").call(_request)
+            response.raise_for_status()
+            user_data = response.json()
 
-                logger.info(f"User {user_id} cached with TTL={USER_CACHE_TTL}s")
+            # Cache result
+            await user_cache.set(cache_key, user_data, ttl=USER_CACHE_TTL)
 
-                return user_data
+            logger.debug(
+                f"User {user_id} fetched and cached with TTL={USER_CACHE_TTL}s",
+                extra={"event": "user_fetched", "user_id": user_id},
+            )
+
+            return user_data
         except Exception as e:
             logger.error(f"Failed to fetch user {user_id}: {e}")
             return None
@@ -54,7 +73,13 @@ class UserService:
         Check if user has enabled notification type
         """
         user = await self.get_user(user_id)
+        return self.is_notification_enabled(user, notification_type)
 
+    @staticmethod
+    def is_notification_enabled(user: dict, notification_type: str) -> bool:
+        """
+        Check an already fetched user payload for the notification type preference
+        """
         if not user:
             return False
 
@@ -1,42 +1,155 @@
-import logging
+import atexit
 import json
+import logging
+import logging.handlers
+import queue
 import sys
 from datetime import datetime
 from app.config.settings import settings
+from app.services.metrics import LOG_RECORDS_DISCARDED_TOTAL
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Attributes every LogRecord has, anything else was passed through `extra`
+RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+# Extra fields that hold user data, logged as REDACTED wherever they appear
+REDACTED_FIELDS = frozenset({
+    "user", "user_data", "delivery", "variables", "email", "to_email",
+    "push_token", "phone", "phone_number", "password", "token",
+})
+REDACTED = "[REDACTED]"
+
+
+def redact(value):
+    """Copy of an extra field value with user data replaced"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key in REDACTED_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
 
 class JSONFormatter(logging.Formatter):
     def format(self, record):
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # From the record, it is formatted later on the listener thread
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
             "level": record.levelname,
             "service_name": settings.service_name,
             "message": record.getMessage(),
         }
 
-        # Add extra fields if present
-        if hasattr(record, 'correlation_id'):
-            log_entry["correlation_id"] = record.correlation_id
-        if hasattr(record, 'event'):
-            log_entry["event"] = record.event
+        # Add extra fields (correlation_id, event, notification_id, ...)
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS:
+                log_entry[key] = REDACTED if key in REDACTED_FIELDS else redact(value)
 
         # Add exception info if present
         if record.exc_info:
             log_entry["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_entry)
+        if orjson:
+            return orjson.dumps(log_entry, default=str).decode()
+        return json.dumps(log_entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the INFO and DEBUG records of chosen events.
+
+    `rates` maps an `event` to the fraction to keep, e.g. 0.1 keeps every
+    tenth record. Kept records carry `sample_rate` so counts derived from
+    logs can be scaled back up. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._seen = {}
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or record.levelno > logging.INFO:
+            return True
+        seen = self._seen.get(record.event, 0) + 1
+        self._seen[record.event] = seen
+        # Kept whenever seen * rate reaches the next whole number
+        if int(seen * rate) == int((seen - 1) * rate):
+            LOG_RECORDS_DISCARDED_TOTAL.labels(reason="sampled").inc()
+            return False
+        record.sample_rate = rate
+        return True
+
+
+def parse_sample_rates(value: str) -> dict:
+    """'event=rate,event=rate' as a dict"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without blocking the caller.
+
+    Formatting and writing to stdout happen on the listener thread, so a
+    slow stdout delays logs instead of the event loop. When the queue is
+    full the record is dropped and counted.
+    """
+
+    def prepare(self, record):
+        # Only resolve the message, the stdlib version also formats the whole
+        # record, which is the work this handler moves off the loop
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DISCARDED_TOTAL.labels(reason="queue_full").inc()
+
 
 def setup_logger():
+    # Nothing in the JSON output needs the caller, thread or process of a
+    # record, so don't look them up for every one
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+
     logger = logging.getLogger(settings.service_name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.LOG_LEVEL)
+    logger.propagate = False
 
     # Remove existing handlers
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
 
-    # Console handler
+    # Console handler, run by the listener thread
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(JSONFormatter())
-    logger.addHandler(console_handler)
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = AsyncQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(settings.LOG_SAMPLE_RATES)))
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, console_handler)
+    listener.start()
+    # Flush what is still queued on shutdown
+    atexit.register(listener.stop)
 
     return logger
 
@@ -0,0 +1,42 @@
+"""
+Single-flight request coalescing
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+from app.services.metrics import SINGLE_FLIGHT_COALESCED_TOTAL
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it
+    is still running await the same result instead of repeating it. The
+    work runs in its own task, so a cancelled caller does not cancel it for
+    the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._coalesced = SINGLE_FLIGHT_COALESCED_TOTAL.labels(group=name)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._coalesced.inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -0,0 +1,107 @@
+"""
+Bytes on the wire and encode/decode CPU per message for each queue body
+format the codec can produce.
+
+Uses an email.queue message as the gateway builds it and a push.queue
+message carrying a template body, with the baseline being the
+json.dumps(...).encode() the gateway used before. Formats whose optional
+library isn't installed are skipped.
+
+    python -m benchmarks.bench_codec --iterations 20000
+"""
+import argparse
+import json
+import time
+import uuid
+
+from app.utils import codec
+
+
+def email_message() -> dict:
+    return {
+        "notification_id": str(uuid.uuid4()),
+        "correlation_id": str(uuid.uuid4()),
+        "to_email": "john.doe@example.com",
+        "template_id": "welcome_email",
+        "variables": {"name": "John Doe", "link": "https://example.com/activate?token=abc123"},
+        "language": "en",
+        "priority": "1",
+        "retry_count": 0,
+    }
+
+
+def push_message() -> dict:
+    body = (
+        "<html><body><h1>Hello {{name}}</h1>"
+        + "<p>Your order {{order_id}} has shipped and is on its way. "
+        "Track it at {{link}} or reply to this message for help.</p>" * 12
+        + "</body></html>"
+    )
+    return {
+        "notification_id": str(uuid.uuid4()),
+        "notification_type": "push",
+        "user_id": str(uuid.uuid4()),
+        "template_code": "order_shipped",
+        "template": {"name": "order_shipped", "subject": "Your order shipped", "body": body},
+        "variables": {"name": "John Doe", "link": "https://example.com/orders/1", "meta": None},
+        "delivery": {"email": "john.doe@example.com", "push_token": "f" * 152},
+        "priority": 1,
+        "metadata": {},
+        "request_id": str(uuid.uuid4()),
+        "correlation_id": str(uuid.uuid4()),
+        "timestamp": "2024-01-01T12:00:00.000000",
+    }
+
+
+def formats():
+    yield "json.dumps (before)", None, None
+    yield "json", codec.JSON, None
+    yield "json+gzip", codec.JSON, codec.GZIP
+    if codec.zstandard:
+        yield "json+zstd", codec.JSON, codec.ZSTD
+    if codec.msgpack:
+        yield "msgpack", codec.MSGPACK, None
+        if codec.zstandard:
+            yield "msgpack+zstd", codec.MSGPACK, codec.ZSTD
+
+
+def measure(message: dict, content_type, compression, iterations: int):
+    if content_type is None:
+        encode = lambda: (json.dumps(message).encode(), None, None)
+        decode = lambda body, *_: json.loads(body)
+    else:
+        encode = lambda: codec.encode(message, content_type, compression, min_compress_size=0)
+        decode = codec.decode
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encoded = encode()
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(*encoded)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    assert decode(*encoded) == message
+    return len(encoded[0]), encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"orjson={'yes' if codec.orjson else 'no'} "
+          f"msgpack={'yes' if codec.msgpack else 'no'} "
+          f"zstandard={'yes' if codec.zstandard else 'no'}")
+    for name, message in (("email.queue", email_message()), ("push.queue", push_message())):
+        print(f"\n{name}")
+        print(f"  {'format':<20} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+        for label, content_type, compression in formats():
+            size, encode_us, decode_us = measure(message, content_type, compression, args.iterations)
+            print(f"  {label:<20} {size:>7} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
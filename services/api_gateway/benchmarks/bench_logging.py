@@ -0,0 +1,139 @@
+"""
+Event loop time spent logging one create_notification request.
+
+"before" is the old hot path: five INFO records, several of them with the
+user dict formatted in, written by a StreamHandler on the loop thread.
+"after" is the current hot path, a single notification_queued record with
+extra fields, through the queue handler that formats and writes on the
+listener thread. The middle row separates the two changes.
+
+Records go to os.devnull; --write-delay-us adds a sleep to each write to
+stand in for a slow stdout (a full pipe, a busy log collector).
+
+    python -m benchmarks.bench_logging --requests 20000 --write-delay-us 50
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import uuid
+
+from app.utils.logger import AsyncQueueHandler, JSONFormatter
+
+
+class SlowStream:
+    """devnull, optionally slowed down per write"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.file = open(os.devnull, "w")
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+def user():
+    return {
+        "success": True,
+        "data": {
+            "id": str(uuid.uuid4()),
+            "name": "John Doe",
+            "email": "john.doe@example.com",
+            "push_token": "f" * 152,
+            "preferences": {"email": True, "push": True},
+        },
+    }
+
+
+def log_before(logger, notification_id, correlation_id, user):
+    user_data = user["data"]
+    logger.debug(f"Fetched user data for {user_data['id']}: {user}")
+    logger.info(f"User {user_data['id']} found: {user}")
+    logger.info(f"Extracted user_data: {user_data}")
+    logger.info(f"Push token from user_data: {user_data.get('push_token')}")
+    logger.info(f"Notification {notification_id} queued to email.queue")
+
+
+def log_after(logger, notification_id, correlation_id, user):
+    logger.info(
+        f"Notification {notification_id} queued to email.queue",
+        extra={
+            "event": "notification_queued",
+            "notification_id": notification_id,
+            "queue": "email.queue",
+            "correlation_id": correlation_id,
+        },
+    )
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers = [handler]
+    return logger
+
+
+async def measure(logger, log, requests: int):
+    """
+    Wall and CPU seconds the loop thread spent in the log calls of
+    `requests` requests. Wall time also counts waiting for the GIL while
+    the listener thread formats.
+    """
+    users = [user() for _ in range(100)]
+    wall = cpu = 0.0
+    for i in range(requests):
+        notification_id, correlation_id = str(uuid.uuid4()), str(uuid.uuid4())
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        log(logger, notification_id, correlation_id, users[i % 100])
+        wall += time.perf_counter() - start
+        cpu += time.thread_time() - start_cpu
+        if i % 100 == 0:
+            # Let the listener thread run as it would between requests
+            await asyncio.sleep(0)
+    return wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--write-delay-us", type=float, default=0.0)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+    delay = args.write_delay_us / 1e6
+
+    def sync_handler():
+        handler = logging.StreamHandler(SlowStream(delay))
+        handler.setFormatter(JSONFormatter())
+        return handler
+
+    cases = [
+        ("before (5 records, sync)", log_before, sync_handler(), None),
+        ("1 record, sync", log_after, sync_handler(), None),
+    ]
+    log_queue = queue.Queue(maxsize=args.queue_size)
+    listener = logging.handlers.QueueListener(log_queue, sync_handler())
+    cases.append(("after (1 record, queued)", log_after, AsyncQueueHandler(log_queue), listener))
+
+    print(f"{args.requests} requests, {args.write_delay_us:g}us per write")
+    print(f"  {'':<26} {'wall us/request':>16} {'cpu us/request':>15}")
+    for label, log, handler, listener in cases:
+        if listener:
+            listener.start()
+        logger = make_logger(label.split()[0], handler)
+        wall, cpu = asyncio.run(measure(logger, log, args.requests))
+        print(f"  {label:<26} {wall / args.requests * 1e6:>16.2f} {cpu / args.requests * 1e6:>15.2f}")
+        if listener:
+            listener.stop()
+
+
+if __name__ == "__main__":
+    main()
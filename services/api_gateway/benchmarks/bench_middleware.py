@@ -0,0 +1,139 @@
+"""
+Requests per second on POST /api/v1/notifications/ with the old
+BaseHTTPMiddleware stack and the current pure ASGI middleware.
+
+The controller is stubbed out and the rate limiter talks to an in-memory
+script, so the numbers only reflect routing, validation and middleware
+overhead, which is what changed.
+
+    python -m benchmarks.bench_middleware --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.middleware.correlation_id import CorrelationIdMiddleware
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.rate_limiter import RateLimiter, RateLimiterMiddleware
+from app.routers import notification
+from app.schemas.notification_schema import NotificationResponse
+from benchmarks.bench_rate_limiter import SimulatedScript
+
+
+# The BaseHTTPMiddleware versions this replaced, kept here as the baseline
+class LegacyCorrelationIdMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        correlation_id = request.headers.get("X-Correlation-ID", str(uuid.uuid4()))
+        request.state.correlation_id = correlation_id
+        response = await call_next(request)
+        response.headers["X-Correlation-ID"] = correlation_id
+        return response
+
+
+class LegacyErrorHandlerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"success": False, "error": e.detail})
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
+
+
+class LegacyRateLimiterMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, limiter: RateLimiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next):
+        result = await self.limiter.check(request.client.host)
+        if result is not None and not result.allowed:
+            return JSONResponse(status_code=429, content={"success": False}, headers=result.headers())
+        response = await call_next(request)
+        if result is not None:
+            response.headers.update(result.headers())
+        return response
+
+
+def build_app(legacy: bool):
+    limiter = RateLimiter(limit=10_000_000, window=60)
+    limiter._script = SimulatedScript(0)
+
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    if legacy:
+        app.add_middleware(LegacyRateLimiterMiddleware, limiter=limiter)
+        app.add_middleware(LegacyCorrelationIdMiddleware)
+        app.add_middleware(LegacyErrorHandlerMiddleware)
+    else:
+        app.add_middleware(RateLimiterMiddleware, limiter=limiter)
+        app.add_middleware(CorrelationIdMiddleware)
+        app.add_middleware(ErrorHandlerMiddleware)
+    app.include_router(notification.router, prefix="/api/v1")
+    return app
+
+
+PAYLOAD = {
+    "notification_type": "email",
+    "user_id": "123e4567-e89b-12d3-a456-426614174000",
+    "template_code": "welcome_email",
+    "variables": {"name": "John Doe", "link": "https://example.com/verify"},
+    "request_id": "bench",
+    "priority": 5,
+}
+
+
+async def requests_per_second(app, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.post("/api/v1/notifications/", json=PAYLOAD)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    stub = AsyncMock(
+        return_value=NotificationResponse(
+            notification_id="bench", status="pending", message="Notification queued successfully"
+        )
+    )
+    with patch.object(notification.controller, "create_notification", stub):
+        results = {}
+        for name, legacy in (("BaseHTTPMiddleware", True), ("pure ASGI", False)):
+            app = build_app(legacy)
+            await requests_per_second(app, 500, args.concurrency)  # warm up
+            results[name] = max(
+                [await requests_per_second(app, args.requests, args.concurrency) for _ in range(args.rounds)]
+            )
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, best of {args.rounds}")
+    for name, rps in results.items():
+        print(f"{name:<20}{rps:>10.0f} req/s")
+    before, after = results["BaseHTTPMiddleware"], results["pure ASGI"]
+    print(f"{'change':<20}{(after / before - 1) * 100:>+9.1f} %")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Per-request latency added by the rate limiter middleware.
+
+Runs the same trivial endpoint through an in-process ASGI client with no
+limiter, with a limiter that checks Redis on every request (lease of one
+token) and with the default local token leasing, and prints the added
+latency per request for each.
+
+    python -m benchmarks.bench_rate_limiter                      # real Redis from settings
+    python -m benchmarks.bench_rate_limiter --simulated-rtt 0.5  # no Redis, fake 0.5ms round trip
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.config.redis import redis_manager
+from app.middleware.rate_limiter import RateLimiter, RateLimiterMiddleware
+
+
+class SimulatedScript:
+    """In-memory stand-in for the sliding window script with a fixed round trip"""
+
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.counters = {}
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        await asyncio.sleep(self.rtt)
+        limit, window, elapsed, lease_max = args
+        current = self.counters.get(keys[0], 0)
+        previous = self.counters.get(keys[1], 0)
+        available = limit - (previous * (window - elapsed) // window + current)
+        if available < 1:
+            return [0, 0]
+        granted = max(1, min(lease_max, available // 10))
+        self.counters[keys[0]] = current + granted
+        return [granted, available - granted]
+
+
+def build_app(limiter=None):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if limiter is not None:
+        app.add_middleware(RateLimiterMiddleware, limiter=limiter)
+    return app
+
+
+async def measure(app, requests: int, clients: int):
+    transport = httpx.ASGITransport(app=app)
+    timings = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(requests):
+            # Spread requests over several client addresses like real traffic
+            transport.client = (f"10.0.0.{i % clients}", 1234)
+            start = time.perf_counter()
+            response = await client.get("/ping")
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--simulated-rtt", type=float, default=None, metavar="MS")
+    args = parser.parse_args()
+
+    # Generous limit so the benchmark measures the check, not rejections
+    limit = args.requests * 10
+
+    def limiter(lease_max):
+        limiter = RateLimiter(limit=limit, window=60, lease_max=lease_max)
+        if args.simulated_rtt is not None:
+            limiter._script = SimulatedScript(args.simulated_rtt)
+        return limiter
+
+    if args.simulated_rtt is None:
+        await redis_manager.connect()
+
+    variants = [
+        ("no limiter", None),
+        ("redis every request", limiter(1)),
+        ("local token leasing", limiter(RateLimiter().lease_max)),
+    ]
+    baseline = None
+    print(f"{args.requests} requests from {args.clients} clients")
+    print(f"{'variant':<22}{'mean ms':>10}{'p99 ms':>10}{'added ms':>10}{'redis calls':>13}")
+    for name, variant in variants:
+        await measure(build_app(variant), 200, args.clients)  # warm up
+        if isinstance(variant, RateLimiter) and isinstance(variant._script, SimulatedScript):
+            variant._script.calls = 0
+        mean, p99 = await measure(build_app(variant), args.requests, args.clients)
+        baseline = mean if baseline is None else baseline
+        calls = getattr(getattr(variant, "_script", None), "calls", "-")
+        print(f"{name:<22}{mean * 1000:>10.3f}{p99 * 1000:>10.3f}{(mean - baseline) * 1000:>10.3f}{calls:>13}")
+
+    if args.simulated_rtt is None:
+        await redis_manager.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
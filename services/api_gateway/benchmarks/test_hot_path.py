@@ -0,0 +1,85 @@
+"""
+Micro-benchmarks (pytest-benchmark) of gateway code that runs for every
+notification. Not part of the test run; from the repo root,
+scripts/run_benchmarks.sh runs them, saves a baseline and compares against it.
+
+    python -m pytest benchmarks -o addopts="" --benchmark-only
+"""
+import json
+import logging
+import uuid
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.notification_schema import NotificationRequest
+from app.utils import codec
+from app.utils.logger import JSONFormatter
+from benchmarks.bench_codec import email_message, push_message
+
+MESSAGES = {"email": email_message(), "push": push_message()}
+
+REQUEST = {
+    "notification_type": "email",
+    "user_id": str(uuid.uuid4()),
+    "template_code": "welcome_email",
+    "variables": {
+        "name": "John Doe",
+        "link": "https://example.com/activate?token=abc123",
+        "meta": {"plan": "pro", "referrer": "newsletter"},
+    },
+    "request_id": str(uuid.uuid4()),
+    "priority": 5,
+    "metadata": {"campaign": "spring"},
+}
+
+
+@pytest.mark.benchmark(group="logging")
+def test_json_formatter(benchmark):
+    """One create_notification log record with its extra fields"""
+    record = logging.makeLogRecord({
+        "msg": "Notification %s queued to %s",
+        "args": (str(uuid.uuid4()), "email.priority.queue"),
+        "levelno": logging.INFO,
+        "levelname": "INFO",
+        "event": "notification_queued",
+        "notification_id": str(uuid.uuid4()),
+        "queue": "email.priority.queue",
+        "correlation_id": str(uuid.uuid4()),
+    })
+    benchmark(JSONFormatter().format, record)
+
+
+@pytest.mark.parametrize("queue", sorted(MESSAGES))
+@pytest.mark.benchmark(group="queue-serialization")
+def test_publish_with_jsonable_encoder(benchmark, queue):
+    """What QueueService.publish does now: jsonable_encoder, then encode"""
+    message = MESSAGES[queue]
+    benchmark(lambda: codec.encode(jsonable_encoder(message)))
+
+
+@pytest.mark.parametrize("queue", sorted(MESSAGES))
+@pytest.mark.benchmark(group="queue-serialization")
+def test_publish_direct(benchmark, queue):
+    """Encoding the message dict directly, it only holds JSON types"""
+    benchmark(codec.encode, MESSAGES[queue])
+
+
+@pytest.mark.parametrize("queue", sorted(MESSAGES))
+@pytest.mark.benchmark(group="queue-serialization")
+def test_publish_json_dumps(benchmark, queue):
+    """The stdlib json.dumps the gateway used before the codec"""
+    message = MESSAGES[queue]
+    benchmark(lambda: json.dumps(message).encode())
+
+
+@pytest.mark.benchmark(group="request-validation")
+def test_notification_request_from_dict(benchmark):
+    benchmark(NotificationRequest.model_validate, REQUEST)
+
+
+@pytest.mark.benchmark(group="request-validation")
+def test_notification_request_from_json(benchmark):
+    """Parsing and validating the raw body in one step"""
+    body = json.dumps(REQUEST).encode()
+    benchmark(NotificationRequest.model_validate_json, body)
@@ -0,0 +1,201 @@
+"""
+Open-loop load test of POST /api/v1/notifications/.
+
+Requests are started on a fixed schedule (or Poisson arrivals) at --rate
+per second, whether or not earlier ones have finished, so a slow gateway
+shows up as growing latency instead of a quietly lower request rate.
+Latency is measured from the moment a request was due, not from when it
+was sent, for the same reason.
+
+Prints throughput and latency percentiles and writes them, with the run's
+settings, to --output as JSON. --max-p99-ms and --max-error-rate make it
+exit with status 1 when exceeded, for use as a regression check.
+
+    python -m loadtest.run --url http://localhost:8020 --rate 200 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import httpx
+
+ENDPOINT = "/api/v1/notifications/"
+
+
+def notification(args, rng: random.Random) -> dict:
+    notification_type = "email" if rng.random() < args.email_ratio else "push"
+    return {
+        "notification_type": notification_type,
+        # A bounded user population, so the user cache sees realistic hit rates
+        "user_id": f"loadtest-user-{rng.randrange(args.users)}",
+        "template_code": f"loadtest_{notification_type}_{rng.randrange(args.templates)}",
+        "variables": {"name": "Load Test", "link": "https://example.com/loadtest"},
+        "request_id": str(uuid.uuid4()),
+        "priority": rng.randint(1, 10),
+    }
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Run:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.in_flight = 0
+        # (due time, latency seconds, outcome) of each request in the measured window
+        self.samples: list = []
+        self.skipped = 0
+        self.started_at = None
+
+    async def send(self, client: httpx.AsyncClient, due: float, measured: bool):
+        outcome = "error"
+        try:
+            response = await client.post(ENDPOINT, json=notification(self.args, self.rng))
+            outcome = str(response.status_code)
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        if measured:
+            self.samples.append((due, time.perf_counter() - due, outcome))
+
+    async def run(self) -> dict:
+        args = self.args
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+        async with httpx.AsyncClient(
+            base_url=args.url, limits=limits, headers=headers, timeout=args.timeout
+        ) as client:
+            tasks = set()
+            self.started_at = datetime.now(timezone.utc).isoformat()
+            start = time.perf_counter()
+            measure_from = start + args.warmup
+            end = measure_from + args.duration
+            due = start
+            while due < end:
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                measured = due >= measure_from
+                if self.in_flight >= args.max_in_flight:
+                    # The generator itself is saturated, don't let it pile up forever
+                    self.skipped += measured
+                else:
+                    self.in_flight += 1
+                    task = asyncio.create_task(self.send(client, due, measured))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if args.arrivals == "poisson":
+                    due += self.rng.expovariate(args.rate)
+                else:
+                    due += 1 / args.rate
+            if tasks:
+                await asyncio.wait(tasks)
+        return self.report()
+
+    def report(self) -> dict:
+        args = self.args
+        outcomes = Counter(outcome for _, _, outcome in self.samples)
+        ok = sorted(latency for _, latency, outcome in self.samples if outcome.startswith("2"))
+        everything = sorted(latency for _, latency, _ in self.samples)
+        attempted = len(self.samples) + self.skipped
+
+        def summary(values):
+            return {
+                name: round(value * 1000, 3) if value is not None else None
+                for name, value in (
+                    ("p50_ms", percentile(values, 50)),
+                    ("p90_ms", percentile(values, 90)),
+                    ("p95_ms", percentile(values, 95)),
+                    ("p99_ms", percentile(values, 99)),
+                    ("p999_ms", percentile(values, 99.9)),
+                    ("max_ms", values[-1] if values else None),
+                )
+            }
+
+        return {
+            "started_at": self.started_at,
+            "config": {
+                key: value for key, value in vars(args).items() if key not in ("output", "token")
+            },
+            "requests": attempted,
+            "completed": len(self.samples),
+            "skipped": self.skipped,
+            "outcomes": dict(sorted(outcomes.items())),
+            "target_rps": args.rate,
+            "throughput_rps": round(len(ok) / args.duration, 2),
+            "error_rate": round(1 - len(ok) / attempted, 5) if attempted else None,
+            "latency_ok": summary(ok),
+            "latency_all": summary(everything),
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8020", help="gateway base URL")
+    parser.add_argument("--rate", type=float, default=100.0, help="requests started per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds at --rate before measuring")
+    parser.add_argument("--arrivals", choices=("constant", "poisson"), default="poisson")
+    parser.add_argument("--users", type=int, default=10000, help="distinct user IDs")
+    parser.add_argument("--templates", type=int, default=10, help="distinct template codes per type")
+    parser.add_argument("--email-ratio", type=float, default=0.7, help="fraction of email notifications")
+    parser.add_argument("--max-in-flight", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--token", help="bearer token, if the gateway requires one")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--label", default="", help="free text stored with the results")
+    parser.add_argument("--output", default="loadtest-results.json")
+    parser.add_argument("--max-p99-ms", type=float, help="fail if the p99 of successes is higher")
+    parser.add_argument("--max-error-rate", type=float, help="fail if the error rate is higher")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = asyncio.run(Run(args).run())
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    latency = result["latency_ok"]
+    print(
+        f"{result['requests']} requests at {args.rate:g}/s for {args.duration:g}s "
+        f"({result['skipped']} skipped by the generator)"
+    )
+    print(f"  outcomes        {result['outcomes']}")
+    print(f"  throughput      {result['throughput_rps']} ok/s ({result['error_rate'] or 0:.2%} errors)")
+    print(
+        f"  latency (ok)    p50 {latency['p50_ms']} ms  p95 {latency['p95_ms']} ms  "
+        f"p99 {latency['p99_ms']} ms  max {latency['max_ms']} ms"
+    )
+    print(f"  results written to {args.output}")
+
+    failures = []
+    if args.max_p99_ms is not None and (latency["p99_ms"] is None or latency["p99_ms"] > args.max_p99_ms):
+        failures.append(f"p99 {latency['p99_ms']} ms > {args.max_p99_ms} ms")
+    if args.max_error_rate is not None and (result["error_rate"] or 0) > args.max_error_rate:
+        failures.append(f"error rate {result['error_rate']} > {args.max_error_rate}")
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
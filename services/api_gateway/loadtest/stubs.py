@@ -0,0 +1,110 @@
+"""
+Stand-ins for the user service and the template service.
+
+They answer the two calls the gateway makes per notification with the same
+response shapes as the real services, after a configurable delay, and fail
+a configurable fraction of requests with a 503 so the circuit breakers and
+error paths can be loaded too. Any user ID and template code is accepted;
+the template listing used for cache warm-up holds the codes run.py sends.
+
+    python -m loadtest.stubs user --port 3001 --latency-ms 20 --error-rate 0.01
+    python -m loadtest.stubs template --port 8003 --latency-ms 5
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+def template(template_code: str, language: str = "en") -> dict:
+    return {
+        "id": template_code,
+        "logical_id": template_code,
+        "name": template_code,
+        "subject": "Hello {{name}}",
+        "body": "<p>Hi {{name}}, continue at {{link}}.</p>" * 8,
+        "language": language,
+        "version": 1,
+    }
+
+
+def create_app(
+    kind: str, latency_ms: float, jitter_ms: float, error_rate: float, templates: int = 10
+) -> FastAPI:
+    app = FastAPI(title=f"{kind} service stub")
+
+    async def delay():
+        seconds = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000
+        if seconds:
+            await asyncio.sleep(seconds)
+        if random.random() < error_rate:
+            return JSONResponse(
+                {"success": False, "error": "stub error", "message": "Injected failure"},
+                status_code=503,
+            )
+        return None
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": f"{kind}-stub"}
+
+    if kind == "user":
+        @app.get("/api/v1/users/{user_id}")
+        async def get_user(user_id: str):
+            return await delay() or {
+                "success": True,
+                "data": {
+                    "id": user_id,
+                    "name": "Load Test",
+                    "email": f"{user_id}@loadtest.invalid",
+                    "push_token": "f" * 152,
+                    "preference": {"email_enabled": True, "push_enabled": True},
+                },
+                "message": "User retrieved successfully",
+            }
+    else:
+        @app.get("/api/templates/{template_code}")
+        async def get_template(template_code: str, language: str = "en"):
+            return await delay() or {
+                "success": True,
+                "data": template(template_code, language),
+                "message": "Template retrieved successfully",
+            }
+
+        @app.get("/api/templates")
+        async def list_templates():
+            data = [
+                template(f"loadtest_{notification_type}_{i}")
+                for notification_type in ("email", "push")
+                for i in range(templates)
+            ]
+            return await delay() or {
+                "success": True,
+                "data": data,
+                "message": "Templates retrieved successfully",
+                "meta": {"total": len(data), "version": "loadtest"},
+            }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("kind", choices=("user", "template"))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="mean response delay")
+    parser.add_argument("--jitter-ms", type=float, default=2.0, help="standard deviation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with a 503")
+    parser.add_argument("--templates", type=int, default=10, help="template codes per type in the listing")
+    args = parser.parse_args()
+
+    app = create_app(args.kind, args.latency_ms, args.jitter_ms, args.error_rate, args.templates)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.controllers.notification_controller import NotificationController
+from app.schemas.notification_schema import NotificationRequest
+from app.services.status_stream import StatusStream
+
+
+def make_request(request_id, user_id="user-1", template_code="welcome"):
+    return NotificationRequest(
+        notification_type="email",
+        user_id=user_id,
+        template_code=template_code,
+        variables={"name": "John", "link": "https://example.com"},
+        request_id=request_id,
+    )
+
+
+class TestNotificationControllerBatch:
+    @pytest.fixture
+    def controller(self):
+        controller = NotificationController()
+        controller.idempotency_service = MagicMock()
+        controller.idempotency_service.reserve_many = AsyncMock(return_value={})
+        controller.idempotency_service.store_result = AsyncMock()
+        controller.idempotency_service.release = AsyncMock()
+        controller.user_service.get_user = AsyncMock(
+            return_value={"email": "john@example.com", "data": {"preference": {}}}
+        )
+        controller.template_service.get_template = AsyncMock(
+            return_value={"data": {"body": "Hello {{name}}"}}
+        )
+        controller.queue_service.publish_many = AsyncMock(
+            side_effect=lambda messages: [None] * len(messages)
+        )
+        controller.tracker.track = AsyncMock()
+        return controller
+
+    @pytest.fixture
+    def pipeline(self):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        with patch("app.controllers.notification_controller.redis_manager") as manager:
+            manager.pipeline.return_value = pipe
+            yield pipe
+
+    async def test_batch_dedupes_lookups(self, controller, pipeline):
+        """Users and templates shared by several items are fetched once"""
+        notifications = [make_request(f"req-{i}") for i in range(5)]
+
+        result = await controller.create_notifications_batch(notifications, "corr-1")
+
+        assert result.total == 5
+        assert result.queued == 5
+        controller.user_service.get_user.assert_awaited_once_with("user-1")
+        controller.template_service.get_template.assert_awaited_once_with("welcome")
+        controller.idempotency_service.reserve_many.assert_awaited_once()
+        controller.queue_service.publish_many.assert_awaited_once()
+        pipeline.execute.assert_awaited_once()
+
+    async def test_batch_reports_per_item_results(self, controller, pipeline):
+        """Known duplicates, missing users and repeated request IDs get their own results"""
+        controller.idempotency_service.reserve_many.return_value = {
+            "req-done": {
+                "notification_id": "notif-1",
+                "status": "pending",
+                "message": "Notification queued successfully",
+            }
+        }
+        controller.user_service.get_user = AsyncMock(
+            side_effect=lambda user_id: None if user_id == "missing" else {"data": {}}
+        )
+        notifications = [
+            make_request("req-done"),
+            make_request("req-new"),
+            make_request("req-bad", user_id="missing"),
+            make_request("req-new"),
+        ]
+
+        result = await controller.create_notifications_batch(notifications, "corr-1")
+
+        assert [r.success for r in result.results] == [True, True, False, True]
+        assert result.results[0].data.notification_id == "notif-1"
+        assert "not found" in result.results[2].error
+        assert result.results[3].index == 3
+        assert result.results[3].data == result.results[1].data
+        controller.queue_service.publish_many.assert_awaited_once()
+        assert len(controller.queue_service.publish_many.call_args.args[0]) == 1
+        controller.idempotency_service.release.assert_awaited_once()
+        assert controller.idempotency_service.release.call_args.args[0] == "req-bad"
+
+    async def test_batch_failure_before_publish_releases_reservations(self, controller, pipeline):
+        """A batch that fails before publishing can be retried straight away"""
+        controller.template_service.get_template = AsyncMock(side_effect=ConnectionError("down"))
+
+        with pytest.raises(ConnectionError):
+            await controller.create_notifications_batch(
+                [make_request("req-1"), make_request("req-2")], "corr-1"
+            )
+
+        reserved = dict(controller.idempotency_service.reserve_many.call_args.args[0])
+        released = {call.args for call in controller.idempotency_service.release.await_args_list}
+        assert released == set(reserved.items())
+        controller.queue_service.publish_many.assert_not_awaited()
+
+
+class TestNotificationControllerCreate:
+    async def test_user_and_template_fetched_concurrently(self):
+        """Both lookups are in flight together and the writes share one pipeline"""
+        controller = NotificationController()
+        controller.idempotency_service = MagicMock()
+        controller.idempotency_service.reserve = AsyncMock(return_value=None)
+        controller.idempotency_service.store_result = AsyncMock()
+        controller.tracker.track = AsyncMock()
+        controller.queue_service.publish = AsyncMock()
+
+        started = []
+        both_started = asyncio.Event()
+
+        async def lookup(name, value):
+            started.append(name)
+            if len(started) == 2:
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+            return value
+
+        controller.user_service.get_user = lambda user_id: lookup(
+            "user", {"email": "john@example.com", "data": {"preference": {}}}
+        )
+        controller.template_service.get_template = lambda code: lookup(
+            "template", {"data": {"body": "Hello"}}
+        )
+
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        with patch("app.controllers.notification_controller.redis_manager") as manager:
+            manager.pipeline.return_value = pipe
+            result = await controller.create_notification(make_request("req-1"), "corr-1")
+
+        assert result.status == "pending"
+        assert sorted(started) == ["template", "user"]
+        controller.tracker.track.assert_awaited_once()
+        assert controller.tracker.track.call_args.kwargs["pipe"] is pipe
+        assert controller.idempotency_service.store_result.call_args.kwargs["pipe"] is pipe
+        pipe.execute.assert_awaited_once()
+
+    async def test_in_progress_duplicate_skips_processing(self):
+        """A retry of a request that is still being processed does no work"""
+        controller = NotificationController()
+        controller.idempotency_service = MagicMock()
+        controller.idempotency_service.reserve = AsyncMock(
+            return_value={
+                "notification_id": "notif-1",
+                "status": "pending",
+                "message": "Request is already being processed",
+                "in_progress": True,
+            }
+        )
+        controller.user_service.get_user = AsyncMock()
+        controller.queue_service.publish = AsyncMock()
+
+        result = await controller.create_notification(make_request("req-1"), "corr-1")
+
+        assert result.notification_id == "notif-1"
+        controller.user_service.get_user.assert_not_awaited()
+        controller.queue_service.publish.assert_not_awaited()
+
+    async def test_failure_before_publish_releases_reservation(self):
+        """A request that fails before publishing can be retried straight away"""
+        controller = NotificationController()
+        controller.idempotency_service = MagicMock()
+        controller.idempotency_service.reserve = AsyncMock(return_value=None)
+        controller.idempotency_service.release = AsyncMock()
+        controller.user_service.get_user = AsyncMock(return_value=None)
+        controller.template_service.get_template = AsyncMock(return_value={"data": {}})
+
+        with pytest.raises(Exception, match="not found"):
+            await controller.create_notification(make_request("req-1"), "corr-1")
+
+        notification_id = controller.idempotency_service.reserve.call_args.args[1]
+        controller.idempotency_service.release.assert_awaited_once_with("req-1", notification_id)
+
+
+class TestNotificationControllerStatus:
+    async def test_bulk_status_is_one_lookup_in_request_order(self):
+        """Repeated IDs are looked up once and unknown IDs come back without a status"""
+        controller = NotificationController()
+        controller.tracker.get_statuses = AsyncMock(
+            return_value={"notif-1": {"status": "delivered", "updated_at": "2024-01-01T00:00:00"}}
+        )
+
+        result = await controller.get_notification_statuses(["notif-1", "notif-2", "notif-1"])
+
+        controller.tracker.get_statuses.assert_awaited_once_with(["notif-1", "notif-2"])
+        assert result.total == 3
+        assert result.found == 2
+        assert [status.status for status in result.statuses] == ["delivered", None, "delivered"]
+
+
+    async def test_stream_sends_current_status_then_changes(self):
+        """A stream starts with the current statuses and unsubscribes when closed"""
+        controller = NotificationController()
+        controller.tracker.get_statuses = AsyncMock(return_value={
+            "notif-1": {"notification_id": "notif-1", "status": "pending", "created_at": "x"}
+        })
+        with patch("app.controllers.notification_controller.status_stream", StatusStream()) as stream:
+            subscription = controller.open_status_stream(["notif-1"], None)
+            events = controller.stream_statuses(subscription, ["notif-1"])
+
+            assert await events.__anext__() == {"notification_id": "notif-1", "status": "pending"}
+            stream.dispatch({"notification_id": "notif-1", "status": "delivered"})
+            assert (await events.__anext__())["status"] == "delivered"
+            await events.aclose()
+
+            assert len(stream) == 0
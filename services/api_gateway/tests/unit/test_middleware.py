@@ -0,0 +1,125 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock
+from prometheus_client import REGISTRY
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from app.middleware.correlation_id import CorrelationIdMiddleware
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limiter import RateLimiter, RateLimiterMiddleware
+
+
+@pytest.fixture
+def limiter():
+    limiter = RateLimiter(limit=100, window=60, lease_max=5)
+    limiter._script = AsyncMock(return_value=[5, 95])
+    return limiter
+
+
+@pytest.fixture
+def client(limiter):
+    app = FastAPI()
+
+    @app.get("/echo")
+    async def echo(request: Request):
+        return {"correlation_id": request.state.correlation_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"item_id": item_id}
+
+    app.add_middleware(RateLimiterMiddleware, limiter=limiter)
+    app.add_middleware(CorrelationIdMiddleware)
+    app.add_middleware(ErrorHandlerMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+
+def requests_total(endpoint: str, metric: str = "api_gateway_requests_total") -> float:
+    return REGISTRY.get_sample_value(metric, {"endpoint": endpoint, "method": "GET"}) or 0.0
+
+
+class TestMiddleware:
+    def test_correlation_id_is_echoed(self, client):
+        """The caller's correlation ID reaches the handler and the response"""
+        response = client.get("/echo", headers={"X-Correlation-ID": "corr-1"})
+
+        assert response.json() == {"correlation_id": "corr-1"}
+        assert response.headers["X-Correlation-ID"] == "corr-1"
+
+    def test_correlation_id_is_generated(self, client):
+        """Requests without a correlation ID get a fresh one"""
+        response = client.get("/echo")
+
+        assert response.headers["X-Correlation-ID"] == response.json()["correlation_id"]
+
+    def test_unhandled_error_uses_json_envelope(self, client):
+        """Unhandled exceptions become a 500 with the usual error body"""
+        response = client.get("/boom")
+
+        assert response.status_code == 500
+        assert response.json() == {
+            "success": False,
+            "error": "Internal server error",
+            "message": "boom",
+        }
+
+    def test_rate_limit_headers(self, client, limiter):
+        """Allowed requests carry X-RateLimit-*, rejected ones get a 429"""
+        response = client.get("/echo")
+        assert response.headers["X-RateLimit-Limit"] == "100"
+        assert response.headers["X-RateLimit-Remaining"] == "99"
+
+        limiter._leases.clear()
+        limiter._script.return_value = [0, 0]
+        response = client.get("/echo")
+        assert response.status_code == 429
+        assert response.json()["error"] == "Rate limit exceeded"
+        assert "Retry-After" in response.headers
+
+    def test_metrics_are_labelled_with_route_templates(self, client, limiter):
+        """IDs in paths share one series, and requests answered before routing are counted"""
+        items, echo_failed = requests_total("/items/{item_id}"), requests_total(
+            "/echo", "api_gateway_requests_failed_total"
+        )
+        unmatched = requests_total("unmatched")
+
+        client.get("/items/1")
+        client.get("/items/2")
+        limiter._leases.clear()
+        limiter._script.return_value = [0, 0]
+        assert client.get("/echo").status_code == 429
+        client.get("/wp-login.php")
+
+        assert requests_total("/items/{item_id}") == items + 2
+        assert requests_total("/items/1") == 0
+        assert requests_total("/echo", "api_gateway_requests_failed_total") == echo_failed + 1
+        assert requests_total("unmatched") == unmatched + 1
+
+    def test_metrics_are_aggregated_across_workers(self, tmp_path):
+        """With PROMETHEUS_MULTIPROC_DIR set, /metrics reports every worker's samples"""
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+        service_dir = Path(__file__).parents[2]
+        worker = (
+            "from app.services.metrics import REQUESTS_TOTAL\n"
+            "REQUESTS_TOTAL.labels(endpoint='/x', method='GET').inc()"
+        )
+        for _ in range(2):
+            subprocess.run([sys.executable, "-c", worker], env=env, cwd=service_dir, check=True)
+
+        scrape = subprocess.run(
+            [sys.executable, "-c",
+             "from app.services.metrics import prometheus_metrics\n"
+             "print(prometheus_metrics().body.decode())"],
+            env=env, cwd=service_dir, check=True, capture_output=True, text=True,
+        ).stdout
+
+        assert 'api_gateway_requests_total{endpoint="/x",method="GET"} 2.0' in scrape
@@ -0,0 +1,845 @@
+import asyncio
+import itertools
+import json
+import logging
+import queue
+import sqlite3
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.config.http_client import HTTPClientManager
+from aio_pika.exceptions import DeliveryError, PublishError
+from pamqp.commands import Basic
+from redis.exceptions import ResponseError
+from app.config.rabbitmq import PRIORITY_QUEUES, QUEUES, RabbitMQManager
+from app.config.settings import settings
+from app.middleware.rate_limiter import EXEMPT_PATHS, RateLimiter, RateLimiterMiddleware
+from app.services.cache_service import CacheService, LocalCache, handle_invalidation, template_cache
+from app.services.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError, CircuitState
+from app.services.health_monitor import HealthMonitor
+from app.services.idempotency_service import IdempotencyService
+from app.services.notification_tracker import NotificationTracker
+from app.services.outbox import Outbox
+from app.services.queue_service import QueueService
+from app.services.status_stream import StatusStream
+from app.services.template_service import TemplateService
+from app.schemas.notification_schema import NotificationStatus
+from app.utils import codec
+from app.utils.logger import AsyncQueueHandler, JSONFormatter, SamplingFilter, parse_sample_rates
+from app.utils.single_flight import SingleFlight
+
+
+class TestHTTPClientManager:
+    async def test_get_client_is_shared(self):
+        """The same pooled client is reused for every call to an upstream"""
+        manager = HTTPClientManager()
+        await manager.connect()
+        try:
+            client = manager.get_client("user")
+            assert manager.get_client("user") is client
+            assert manager.get_client("template") is not client
+        finally:
+            await manager.disconnect()
+
+    async def test_pool_stats_for_unused_client(self):
+        """A pool with no traffic reports no active, idle or waiting entries"""
+        manager = HTTPClientManager()
+        manager.get_client("template")
+        try:
+            assert manager.pool_stats("template") == {"active": 0, "idle": 0, "waiting": 0}
+            assert manager.pool_stats("unknown") == {"active": 0, "idle": 0, "waiting": 0}
+        finally:
+            await manager.disconnect()
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used(self):
+        """The least recently used entry is evicted once the cache is full"""
+        cache = LocalCache("test-lru", max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expired_entries_are_misses(self):
+        """Entries older than the TTL are not served"""
+        cache = LocalCache("test-ttl", max_size=10, ttl=0)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_invalidate_key_and_prefix(self):
+        """Exact keys drop one entry, keys ending in ':' drop a prefix"""
+        cache = LocalCache("test-invalidate", max_size=10, ttl=60)
+        cache.set("template:welcome:default", 1)
+        cache.set("template:welcome:fr", 2)
+        cache.set("user:1", 3)
+        cache.set("user:12", 4)
+
+        assert cache.invalidate("template:welcome:") == 2
+        assert cache.invalidate("user:1") == 1
+        assert cache.get("user:12") == 4
+
+
+class TestCacheService:
+    async def test_redis_read_is_kept_in_process(self):
+        """A Redis hit is parsed once and then served from the L1"""
+        cache = CacheService("test-tiered", max_size=10, local_ttl=60)
+        with patch("app.services.cache_service.redis_manager") as redis_manager:
+            redis_manager.get = AsyncMock(return_value='{"id": "u1"}')
+
+            assert await cache.get("user:u1") == {"id": "u1"}
+            assert await cache.get("user:u1") == {"id": "u1"}
+            redis_manager.get.assert_awaited_once_with("user:u1")
+
+    async def test_invalidation_message_drops_local_copies(self):
+        """Invalidation messages from other services clear every worker cache"""
+        cache = CacheService("test-pubsub", max_size=10, local_ttl=60)
+        cache.local.set("user:u1", {"id": "u1"})
+        with patch("app.services.cache_service.redis_manager") as redis_manager:
+            redis_manager.delete = AsyncMock()
+
+            await handle_invalidation("user:u1")
+
+            assert cache.local.get("user:u1") is None
+            redis_manager.delete.assert_awaited_once()
+            assert "user:u1" in redis_manager.delete.await_args.args
+
+    async def test_redis_keys_are_prefixed(self):
+        """The prefix applies to Redis only, invalidation keys stay unprefixed"""
+        cache = CacheService("test-prefix", max_size=10, local_ttl=60, key_prefix="gateway:")
+        with patch("app.services.cache_service.redis_manager") as redis_manager:
+            redis_manager.set = AsyncMock()
+            redis_manager.delete = AsyncMock()
+            redis_manager.delete_prefix = AsyncMock()
+
+            await cache.set("template:welcome:en", {"id": "t1"})
+            await handle_invalidation("template:welcome:")
+
+            redis_manager.set.assert_awaited_once_with("gateway:template:welcome:en", '{"id": "t1"}', ttl=None)
+            redis_manager.delete.assert_not_awaited()
+            redis_manager.delete_prefix.assert_awaited_once_with("gateway:template:welcome:")
+            assert cache.local.get("template:welcome:en") is None
+
+
+class TestTemplateCacheWarmup:
+    async def test_warmed_templates_are_served_without_fetching(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request.url.path)
+            return httpx.Response(200, json={
+                "success": True,
+                "data": [
+                    {"id": "t1", "logical_id": "welcome", "name": "Welcome",
+                     "subject": "Hi {{name}}", "body": "Hello {{name}}", "language": "en"},
+                    {"id": "t2", "logical_id": "bienvenue", "name": "Bienvenue",
+                     "subject": None, "body": "Bonjour {{name}}", "language": "fr"},
+                ],
+                "message": "Templates retrieved successfully",
+                "meta": {"total": 2, "version": "abc"},
+            })
+
+        client = httpx.AsyncClient(base_url="http://template", transport=httpx.MockTransport(handler))
+        with patch("app.services.template_service.http_client_manager") as manager, \
+                patch("app.services.cache_service.redis_manager") as redis_manager:
+            manager.get_client.return_value = client
+            pipe = redis_manager.pipeline.return_value
+            pipe.execute = AsyncMock()
+            redis_manager.get = AsyncMock(return_value=None)
+            service = TemplateService()
+
+            assert await service.warm_cache() == 2
+            welcome = await service.get_template("welcome")
+            bienvenue = await service.get_template("bienvenue", "fr")
+
+        assert requests == ["/api/templates"]
+        assert welcome["data"]["body"] == "Hello {{name}}"
+        assert bienvenue["data"]["body"] == "Bonjour {{name}}"
+        # English templates also answer requests without a language; all in one round trip
+        pipe.execute.assert_awaited_once()
+        assert {call.args[0] for call in pipe.set.call_args_list} == {
+            "gateway:template:welcome:en", "gateway:template:welcome:default", "gateway:template:bienvenue:fr"
+        }
+        template_cache.local.clear()
+        await client.aclose()
+
+    async def test_failed_warmup_is_not_fatal(self):
+        client = httpx.AsyncClient(
+            base_url="http://template",
+            transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+        )
+        with patch("app.services.template_service.http_client_manager") as manager:
+            manager.get_client.return_value = client
+
+            assert await TemplateService().warm_cache() == 0
+        await client.aclose()
+
+
+class TestIdempotencyService:
+    @pytest.fixture
+    def reserve_script(self):
+        script = AsyncMock()
+        with patch.object(IdempotencyService, "_reserve_script", script), \
+                patch.object(IdempotencyService, "_release_script", AsyncMock()):
+            yield script
+
+    async def test_reserve_claims_free_key(self, reserve_script):
+        """A free request ID is claimed with an in-progress marker"""
+        reserve_script.return_value = None
+
+        assert await IdempotencyService().reserve("req-1", "notif-1") is None
+        marker = reserve_script.call_args.kwargs["args"][0]
+        assert '"in_progress": true' in marker
+        assert '"notif-1"' in marker
+
+    async def test_reserve_waits_for_in_progress_request(self, reserve_script):
+        """A duplicate waits for the holder and gets its final result"""
+        reserve_script.side_effect = [
+            '{"notification_id": "notif-1", "status": "pending", "message": "", "in_progress": true}',
+            '{"notification_id": "notif-1", "status": "pending", "message": "queued"}',
+        ]
+
+        result = await IdempotencyService().reserve("req-1", "notif-2")
+
+        assert result == {"notification_id": "notif-1", "status": "pending", "message": "queued"}
+        assert reserve_script.await_count == 2
+
+    async def test_reserve_returns_marker_after_wait(self, reserve_script):
+        """A duplicate gets the in-progress state once the wait runs out"""
+        reserve_script.return_value = (
+            '{"notification_id": "notif-1", "status": "pending", "message": "", "in_progress": true}'
+        )
+
+        result = await IdempotencyService().reserve("req-1", "notif-2", wait=0)
+
+        assert IdempotencyService.is_in_progress(result)
+        assert result["notification_id"] == "notif-1"
+
+
+class TestNotificationTracker:
+    @pytest.fixture
+    def update_script(self):
+        script = AsyncMock(return_value=1)
+        with patch.object(NotificationTracker, "_update_script", script):
+            yield script
+
+    async def test_update_is_one_script_call(self, update_script):
+        """A status update is a single atomic script call"""
+        updated = await NotificationTracker().update_status(
+            "notif-1", NotificationStatus.failed, "bounced"
+        )
+
+        assert updated is True
+        update_script.assert_awaited_once()
+        kwargs = update_script.call_args.kwargs
+        assert kwargs["keys"] == ["notification:notif-1"]
+        assert kwargs["args"][0] == "failed"
+        assert kwargs["args"][2] == "bounced"
+
+    async def test_rejected_transition_is_not_an_update(self, update_script):
+        """The script refusing to move a status backwards is reported as no update"""
+        update_script.return_value = -1
+
+        assert not await NotificationTracker().update_status(
+            "notif-1", NotificationStatus.pending
+        )
+
+    async def test_get_status_reads_legacy_json_records(self):
+        """Records stored as JSON strings before the switch to hashes are still readable"""
+        with patch("app.services.notification_tracker.redis_manager") as redis_manager:
+            redis_manager.hgetall = AsyncMock(side_effect=ResponseError("WRONGTYPE"))
+            redis_manager.get = AsyncMock(
+                return_value='{"notification_id": "notif-1", "status": "pending"}'
+            )
+
+            result = await NotificationTracker().get_status("notif-1")
+
+        assert result == {"notification_id": "notif-1", "status": "pending"}
+
+
+    async def test_get_statuses_pipelines_hash_reads(self):
+        """Hashes come from one pipeline, legacy JSON records from one MGET"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[
+            {"notification_id": "notif-1", "status": "delivered"},
+            {},
+            ResponseError("WRONGTYPE"),
+        ])
+        with patch("app.services.notification_tracker.redis_manager") as redis_manager:
+            redis_manager.pipeline.return_value = pipe
+            redis_manager.mget = AsyncMock(return_value={
+                "notification:notif-3": '{"notification_id": "notif-3", "status": "pending"}'
+            })
+
+            result = await NotificationTracker().get_statuses(["notif-1", "notif-2", "notif-3"])
+
+        assert pipe.hgetall.call_count == 3
+        assert result == {
+            "notif-1": {"notification_id": "notif-1", "status": "delivered"},
+            "notif-3": {"notification_id": "notif-3", "status": "pending"},
+        }
+
+class TestRateLimiter:
+    @pytest.mark.parametrize("path,exempt", [
+        ("/api/v1/health/ready", True),
+        ("/api/v1/metrics", True),
+        ("/api/v1/email/status/", True),
+        ("/api/v1/notifications/status", False),
+        ("/api/v1/notifications/", False),
+    ])
+    def test_probe_and_callback_paths_are_exempt(self, path, exempt):
+        assert bool(EXEMPT_PATHS.match(path)) is exempt
+
+    def test_client_behind_trusted_proxy_keyed_on_forwarded_address(self):
+        """Only X-Forwarded-For hops added by trusted proxies are believed"""
+        middleware = RateLimiterMiddleware(None, RateLimiter(), trusted_proxies=["172.18.0.0/16"])
+
+        def scope(peer, forwarded=None):
+            headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+            return {"client": (peer, 1234), "headers": headers}
+
+        assert middleware.client_id(scope("172.18.0.5", "1.2.3.4, 5.6.7.8")) == "5.6.7.8"
+        assert middleware.client_id(scope("172.18.0.5", "5.6.7.8, 172.18.0.9")) == "5.6.7.8"
+        assert middleware.client_id(scope("172.18.0.5")) == "172.18.0.5"
+        # Anyone else's header is ignored
+        assert middleware.client_id(scope("9.9.9.9", "5.6.7.8")) == "9.9.9.9"
+
+    async def test_leased_tokens_are_spent_locally(self):
+        """One Redis call leases tokens that serve the following requests"""
+        limiter = RateLimiter(limit=100, window=60, lease_max=5)
+        limiter._script = AsyncMock(return_value=[5, 95])
+
+        results = [await limiter.check("10.0.0.1") for _ in range(5)]
+
+        assert all(result.allowed for result in results)
+        assert [result.remaining for result in results] == [99, 98, 97, 96, 95]
+        limiter._script.assert_awaited_once()
+
+    async def test_limited_client_gets_headers_and_is_cached(self):
+        """A rejected client gets Retry-After and is rejected locally for a while"""
+        limiter = RateLimiter(limit=100, window=60, lease_max=5)
+        limiter._script = AsyncMock(return_value=[0, 0])
+
+        first = await limiter.check("10.0.0.1")
+        second = await limiter.check("10.0.0.1")
+
+        assert not first.allowed and not second.allowed
+        headers = first.headers()
+        assert headers["X-RateLimit-Limit"] == "100"
+        assert headers["X-RateLimit-Remaining"] == "0"
+        assert int(headers["Retry-After"]) >= 1
+        limiter._script.assert_awaited_once()
+
+    async def test_fails_open_when_redis_is_down(self):
+        """Redis errors let the request through instead of failing it"""
+        limiter = RateLimiter(limit=100, window=60, lease_max=5)
+        limiter._script = AsyncMock(side_effect=ConnectionError("redis down"))
+
+        assert await limiter.check("10.0.0.1") is None
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_execution(self):
+        """Concurrent callers for the same key get one shared result"""
+        group = SingleFlight("test-coalesce")
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"id": "t1"}
+
+        waiters = [asyncio.create_task(group.do("template:t1", fetch)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert calls == 1
+        assert all(result == {"id": "t1"} for result in results)
+        assert len(group) == 0
+
+    async def test_cancelled_caller_does_not_cancel_fetch(self):
+        """Cancelling the first caller leaves the shared fetch running for others"""
+        group = SingleFlight("test-cancel")
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "value"
+
+        first = asyncio.create_task(group.do("key", fetch))
+        second = asyncio.create_task(group.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "value"
+
+
+class TestCodec:
+    def test_json_round_trip_without_properties(self):
+        """Bodies without content properties are JSON, as older producers send them"""
+        body, content_type, content_encoding = codec.encode({"n": 1, "name": "Zoë"})
+
+        assert (content_type, content_encoding) == (codec.JSON, None)
+        assert codec.decode(body) == {"n": 1, "name": "Zoë"}
+
+    def test_only_large_bodies_are_compressed(self):
+        """Compression is skipped below the size threshold"""
+        small = codec.encode({"n": 1}, compression=codec.GZIP, min_compress_size=64)
+        large = codec.encode({"body": "x" * 4096}, compression=codec.GZIP, min_compress_size=64)
+
+        assert small[2] is None
+        assert large[2] == codec.GZIP and len(large[0]) < 4096
+        assert codec.decode(*large) == {"body": "x" * 4096}
+
+    def test_msgpack_falls_back_to_json_when_not_installed(self):
+        """A producer without msgpack keeps publishing readable JSON"""
+        with patch.object(codec, "msgpack", None):
+            body, content_type, _ = codec.encode({"n": 1}, content_type=codec.MSGPACK)
+
+        assert content_type == codec.JSON
+        assert codec.decode(body, content_type) == {"n": 1}
+
+    def test_unknown_format_is_rejected(self):
+        """Consumers refuse formats they can't read instead of misparsing them"""
+        with pytest.raises(codec.UnsupportedFormatError):
+            codec.decode(b"...", "application/protobuf")
+        with pytest.raises(codec.UnsupportedFormatError):
+            codec.decode(b"...", codec.JSON, "br")
+
+class TestLogging:
+    @staticmethod
+    def record(level=logging.INFO, **extra):
+        record = logging.makeLogRecord({"msg": "Notification %s queued", "args": ("n-1",), "levelno": level})
+        record.__dict__.update(extra)
+        return record
+
+    def test_extra_fields_are_logged_and_user_data_redacted(self):
+        """Extra fields reach the output, user payloads inside them don't"""
+        entry = json.loads(JSONFormatter().format(self.record(
+            event="notification_queued",
+            notification_id="n-1",
+            user={"email": "john@example.com"},
+            metadata={"campaign": "spring", "push_token": "abc"},
+        )))
+
+        assert entry["message"] == "Notification n-1 queued"
+        assert entry["event"] == "notification_queued"
+        assert entry["notification_id"] == "n-1"
+        assert entry["user"] == "[REDACTED]"
+        assert entry["metadata"] == {"campaign": "spring", "push_token": "[REDACTED]"}
+
+    def test_sampling_keeps_a_fraction_of_an_event(self):
+        """Sampled events keep their rate, other events and warnings are all kept"""
+        sampler = SamplingFilter(parse_sample_rates("notification_queued=0.1, user_fetched=0"))
+
+        kept = [r for r in (self.record(event="notification_queued") for _ in range(100)) if sampler.filter(r)]
+
+        assert len(kept) == 10
+        assert all(r.sample_rate == 0.1 for r in kept)
+        assert not sampler.filter(self.record(event="user_fetched"))
+        assert sampler.filter(self.record(logging.WARNING, event="user_fetched"))
+        assert sampler.filter(self.record(event="notification_disabled"))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """The caller never waits on the log thread"""
+        handler = AsyncQueueHandler(queue.Queue(maxsize=1))
+
+        handler.handle(self.record())
+        handler.handle(self.record())
+
+        assert handler.queue.qsize() == 1
+        assert handler.queue.get_nowait().getMessage() == "Notification n-1 queued"
+
+class TestRabbitMQManager:
+    @pytest.fixture
+    def manager(self):
+        manager = RabbitMQManager()
+        manager.channel = MagicMock()
+        manager.channel.declare_exchange = AsyncMock()
+        manager.channel.declare_queue = AsyncMock(return_value=MagicMock(bind=AsyncMock()))
+        self.exchange = MagicMock(publish=AsyncMock())
+        publish_channel = MagicMock()
+        publish_channel.get_exchange = AsyncMock(return_value=self.exchange)
+        manager.publish_channels = [publish_channel]
+        manager._channel_cycle = itertools.cycle(manager.publish_channels)
+        self.legacy_queue = MagicMock(unbind=AsyncMock())
+        throwaway_channel = MagicMock(is_closed=False, close=AsyncMock())
+        throwaway_channel.get_queue = AsyncMock(return_value=self.legacy_queue)
+        manager.connection = MagicMock()
+        manager.connection.channel = AsyncMock(return_value=throwaway_channel)
+        return manager
+
+    async def test_topology_is_declared_once_per_queue(self, manager):
+        """Publishes after the first one skip the declare/bind round trips"""
+        for _ in range(3):
+            await manager.publish_message("email.queue", {"n": 1})
+
+        manager.channel.declare_queue.assert_awaited_once_with(
+            "email.priority.queue", durable=True, arguments={"x-max-priority": 10}
+        )
+        assert self.exchange.publish.await_count == 3
+        assert self.exchange.publish.call_args.kwargs["routing_key"] == "email"
+        assert self.exchange.publish.call_args.args[0].content_type == "application/json"
+
+    async def test_reconnect_redeclares_topology(self, manager):
+        """A reconnect clears the topology cache and declares it again"""
+        await manager.publish_message("email.queue", {"n": 1})
+
+        await manager._on_reconnect(None)
+
+        assert manager.channel.declare_queue.await_count == 1 + len(QUEUES)
+        assert manager._declared_queues == set(QUEUES)
+        assert self.legacy_queue.unbind.await_count == len(PRIORITY_QUEUES)
+
+    async def test_request_priority_becomes_message_priority(self, manager):
+        """Priority queues get the request priority, other queues none"""
+        await manager.publish_message("email.queue", {"priority": "10"})
+        await manager.publish_message("failed.queue", {"priority": 10})
+
+        email, failed = [call.args[0] for call in self.exchange.publish.call_args_list]
+        assert email.priority == 10
+        assert not failed.priority
+        assert "x-published-at" in email.headers
+
+    async def test_confirm_window_bounds_unconfirmed_publishes(self, manager):
+        """No more than the window size of publishes wait for a confirm at once"""
+        manager._confirm_window = asyncio.Semaphore(2)
+        in_flight, peak = 0, 0
+        release = asyncio.Event()
+
+        async def publish(message, routing_key, timeout):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await release.wait()
+            in_flight -= 1
+
+        self.exchange.publish = publish
+        publishes = asyncio.gather(
+            *(manager.publish_message("email.queue", {"n": i}) for i in range(5))
+        )
+        await asyncio.sleep(0.01)
+        assert peak == 2
+        release.set()
+        await publishes
+        assert manager._in_flight == 0
+
+    async def test_nack_fails_the_publish(self, manager):
+        """A broker nack reaches the caller as an error"""
+        self.exchange.publish = AsyncMock(side_effect=DeliveryError(None, None))
+
+        with pytest.raises(DeliveryError):
+            await manager.publish_message("email.queue", {"n": 1})
+        assert manager._in_flight == 0
+
+    async def test_publish_channels_raise_on_returned_messages(self):
+        """Confirming channels are opened so a return fails the publish"""
+        manager = RabbitMQManager()
+        connection = MagicMock(channel=AsyncMock(), reconnect_callbacks=set())
+        with patch("app.config.rabbitmq.aio_pika.connect_robust", AsyncMock(return_value=connection)), \
+                patch.object(manager, "_declare_topology", AsyncMock()):
+            await manager.connect()
+
+        publish_channel_calls = [call for call in connection.channel.await_args_list if call.kwargs]
+        assert len(publish_channel_calls) == len(manager.publish_channels)
+        assert all(call.kwargs["on_return_raises"] for call in publish_channel_calls)
+
+    async def test_reconnect_retires_legacy_queues_under_topology_lock(self, manager):
+        """A publisher declaring topology waits until the legacy queues are unbound"""
+        order = []
+
+        async def retire():
+            order.append("retire start")
+            await asyncio.sleep(0.01)
+            order.append("retire end")
+
+        async def publisher_declares():
+            await asyncio.sleep(0)
+            await manager._ensure_topology("failed.queue")
+            order.append("declared")
+
+        manager._declared_queues.discard("failed.queue")
+        with patch.object(manager, "_retire_legacy_queues", retire):
+            await asyncio.gather(manager._on_reconnect(None), publisher_declares())
+
+        assert order.index("retire end") < order.index("declared")
+
+    async def test_returned_message_goes_to_outbox(self, manager, tmp_path):
+        """An unroutable publish is counted as returned and kept in the outbox"""
+        returned = MagicMock(delivery=Basic.Return(
+            reply_code=312, reply_text="NO_ROUTE", exchange="notifications.direct", routing_key="email"
+        ))
+        self.exchange.publish = AsyncMock(side_effect=PublishError(returned, None))
+        outbox = Outbox(str(tmp_path / "outbox.db"))
+        await outbox.open()
+
+        with pytest.raises(PublishError):
+            await manager.publish_message("email.queue", {"n": 1})
+        with patch("app.services.queue_service.rabbitmq_manager", manager), \
+                patch("app.services.queue_service.outbox", outbox):
+            await QueueService().publish("email.queue", {"notification_id": "n1"})
+
+        assert (await outbox.claim(10))[0][1:] == ("email.queue", {"notification_id": "n1"})
+        await outbox.close()
+
+
+class TestOutbox:
+    @pytest.fixture
+    async def outbox(self, tmp_path):
+        outbox = Outbox(str(tmp_path / "outbox.db"))
+        await outbox.open()
+        yield outbox
+        await outbox.close()
+
+    async def test_replays_and_deletes_delivered_messages(self, outbox):
+        """Delivered messages leave the outbox, failed ones stay for the next drain"""
+        await outbox.append("email.queue", {"n": 1})
+        await outbox.append("push.queue", {"n": 2})
+
+        async def publish(queue_name, message):
+            if queue_name == "push.queue":
+                raise ConnectionError("broker down")
+
+        with pytest.raises(Exception, match="1 of 2"):
+            await outbox.drain_once(publish)
+        assert await outbox.depth() == 1
+
+        published = []
+
+        async def publish_ok(queue_name, message):
+            published.append((queue_name, message))
+
+        assert await outbox.drain_once(publish_ok) == 1
+        assert published == [("push.queue", {"n": 2})]
+        assert await outbox.depth() == 0
+
+    async def test_claimed_messages_are_not_handed_out_twice(self, outbox):
+        """A second drainer doesn't get rows another one is publishing"""
+        await outbox.append("email.queue", {"n": 1})
+
+        assert len(await outbox.claim(10)) == 1
+        assert await outbox.claim(10) == []
+
+    async def test_drainer_waits_while_rows_are_claimed_elsewhere(self, outbox):
+        """Rows claimed by another drainer don't make this one spin"""
+        await outbox.append("email.queue", {"n": 1})
+        await outbox.claim(10)
+        manager = MagicMock(connection=object(), publish_message=AsyncMock())
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+            raise asyncio.CancelledError
+
+        with patch("app.config.rabbitmq.rabbitmq_manager", manager), \
+                patch("app.services.outbox.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await outbox._drain()
+
+        assert sleeps == [settings.OUTBOX_DRAIN_INTERVAL]
+        manager.publish_message.assert_not_called()
+
+    async def test_locked_database_does_not_block_the_loop(self, outbox, tmp_path):
+        """An append waiting on another worker's write lock leaves the loop free"""
+        other = sqlite3.connect(str(tmp_path / "outbox.db"), isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        append = asyncio.create_task(outbox.append("email.queue", {"n": 1}))
+
+        started = time.perf_counter()
+        await asyncio.sleep(0.05)
+        assert time.perf_counter() - started < 1
+        assert not append.done()
+
+        other.execute("COMMIT")
+        other.close()
+        await asyncio.wait_for(append, 5)
+        assert await outbox.depth() == 1
+
+    async def test_queue_service_falls_back_to_outbox(self, outbox):
+        """A failed publish is stored locally instead of failing the request"""
+        service = QueueService()
+        with patch("app.services.queue_service.outbox", outbox), patch(
+            "app.services.queue_service.rabbitmq_manager"
+        ) as manager:
+            manager.publish_message = AsyncMock(side_effect=ConnectionError("broker down"))
+
+            await service.publish("email.queue", {"notification_id": "n1"})
+
+        assert (await outbox.claim(10))[0][1:] == ("email.queue", {"notification_id": "n1"})
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def redis(self):
+        with patch("app.services.circuit_breaker.redis_manager") as redis_manager:
+            redis_manager.get = AsyncMock(return_value=None)
+            redis_manager.set = AsyncMock()
+            yield redis_manager
+
+    @pytest.fixture
+    def breaker(self, redis):
+        breaker = CircuitBreaker("test-dependency", slow_call_seconds=0.05)
+        breaker.minimum_calls = 4
+        breaker.failure_rate_threshold = 0.5
+        breaker.slow_call_rate_threshold = 0.5
+        return breaker
+
+    @staticmethod
+    async def ok():
+        return "ok"
+
+    @staticmethod
+    async def fail():
+        raise ConnectionError("down")
+
+    async def test_opens_on_failure_rate_and_shares_it(self, breaker, redis):
+        """Half the calls in the window failing opens the circuit for every worker"""
+        for func in (self.ok, self.fail, self.ok, self.fail):
+            try:
+                await breaker.call(func)
+            except ConnectionError:
+                pass
+
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call(self.ok)
+        key, value = redis.set.call_args.args
+        assert key == "circuit_breaker:test-dependency"
+        assert '"state": "open"' in value
+
+    async def test_opens_on_slow_calls(self, breaker):
+        """Calls that succeed but are too slow open the circuit too"""
+        async def slow():
+            await asyncio.sleep(0.06)
+
+        for _ in range(2):
+            await breaker.call(self.ok)
+        for _ in range(2):
+            await breaker.call(slow)
+
+        assert breaker.state == CircuitState.OPEN
+
+    async def test_trial_call_closes_circuit(self, breaker):
+        """After the timeout one successful trial call closes the circuit"""
+        breaker._open(0)
+
+        assert await breaker.call(self.ok) == "ok"
+        assert breaker.state == CircuitState.CLOSED
+
+    async def test_adopts_state_opened_by_another_worker(self, breaker, redis):
+        """A worker rejects calls once another worker has opened the circuit"""
+        redis.get.return_value = (
+            f'{{"state": "open", "open_until": {time.time() + 60}, "changed_at": {time.time()}}}'
+        )
+
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call(self.ok)
+        assert breaker.snapshot()["state"] == "open"
+
+
+class TestStatusStream:
+    async def test_ten_thousand_subscribers_on_one_worker(self):
+        """One pub/sub handler fans events out to 10k waiting clients"""
+        stream = StatusStream()
+        subscriptions = [
+            stream.subscribe([f"notif-{i}"], "corr-shared") for i in range(10000)
+        ]
+
+        async def listen(subscription):
+            return [await subscription.get(timeout=5), await subscription.get(timeout=5)]
+
+        listeners = [asyncio.create_task(listen(subscription)) for subscription in subscriptions]
+        await asyncio.sleep(0)
+        for i in range(10000):
+            await stream.handle_event(
+                json.dumps({"notification_id": f"notif-{i}", "status": "delivered"})
+            )
+        await stream.handle_event(json.dumps(
+            {"notification_id": "notif-x", "correlation_id": "corr-shared", "status": "failed"}
+        ))
+        results = await asyncio.gather(*listeners)
+
+        assert len(stream) == 10000
+        assert all(own["notification_id"] == f"notif-{i}" for i, (own, _) in enumerate(results))
+        assert all(shared["notification_id"] == "notif-x" for _, shared in results)
+
+        for subscription in subscriptions:
+            stream.unsubscribe(subscription)
+        assert len(stream) == 0
+        assert stream._topics == {}
+
+    async def test_slow_client_keeps_newest_events(self):
+        """A client that doesn't read loses its oldest events, not the stream"""
+        stream = StatusStream()
+        subscription = stream.subscribe(["notif-1"], None)
+
+        for i in range(subscription.queue.maxsize + 5):
+            stream.dispatch({"notification_id": "notif-1", "status": "pending", "seq": i})
+
+        assert subscription.queue.qsize() == subscription.queue.maxsize
+        assert (await subscription.get(timeout=1))["seq"] == 5
+
+
+class TestHealthMonitor:
+    async def test_snapshot_served_without_probing(self):
+        """Reading the snapshot doesn't run the probes again"""
+        ping = AsyncMock(return_value=True)
+        monitor = HealthMonitor(interval=60, timeout=1)
+        monitor.register("redis", ping)
+
+        assert monitor.snapshot()["dependencies"] == {"redis": {"status": "unknown"}}
+
+        await monitor.refresh()
+        for _ in range(100):
+            snapshot = monitor.snapshot()
+
+        assert ping.await_count == 1
+        assert snapshot["dependencies"]["redis"]["status"] == "up"
+        assert snapshot["checked_at"].endswith("Z")
+        assert 0 <= snapshot["age_seconds"] < 1
+
+    async def test_failing_and_slow_probes_are_down(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        monitor = HealthMonitor(interval=60, timeout=0.05)
+        monitor.register("rabbitmq", AsyncMock(side_effect=ConnectionError("refused")))
+        monitor.register("redis", hang)
+        monitor.register("cache", AsyncMock(return_value=True))
+
+        started = time.perf_counter()
+        await monitor.refresh()
+
+        # Probes run concurrently, so one hanging dependency doesn't hold up the others
+        assert time.perf_counter() - started < 1
+        dependencies = monitor.snapshot()["dependencies"]
+        assert dependencies["rabbitmq"] == {
+            "status": "down", "latency_ms": dependencies["rabbitmq"]["latency_ms"], "error": "refused"
+        }
+        assert dependencies["redis"]["status"] == "down"
+        assert "timed out" in dependencies["redis"]["error"]
+        assert dependencies["cache"]["status"] == "up"
+
+    async def test_background_refresh(self):
+        ping = AsyncMock(side_effect=[True, False, False, False])
+        monitor = HealthMonitor(interval=0.01, timeout=1)
+        monitor.register("redis", ping)
+
+        await monitor.start()
+        assert monitor.snapshot()["dependencies"]["redis"]["status"] == "up"
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        assert ping.await_count >= 2
+        assert monitor.snapshot()["dependencies"]["redis"]["status"] == "down"
@@ -1,19 +1,50 @@
-import pika
+import aio_pika
+from typing import Optional
 from app.config.settings import settings
+from app.utils.logger import logger
 
-def get_rabbitmq_connection():
-    credentials = pika.PlainCredentials(
-        settings.rabbitmq_user,
-        settings.rabbitmq_password
-    )
-    parameters = pika.ConnectionParameters(
-        host=settings.rabbitmq_host,
-        port=settings.rabbitmq_port,
-        virtual_host=settings.rabbitmq_vhost,
-        credentials=credentials
-    )
-    return pika.BlockingConnection(parameters)
-
-def get_rabbitmq_channel():
-    connection = get_rabbitmq_connection()
-    return connection.channel()
+
+class RabbitMQManager:
+    """
+    The process's one connection to RabbitMQ, on the FastAPI event loop.
+
+    The connection is robust: after a broker restart it reconnects and
+    restores channels, QoS, queues and consumers on its own. Consumers open
+    their own channels on it; `channel` is for publishing retries and dead
+    letters.
+    """
+
+    def __init__(self):
+        self.connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self.channel: Optional[aio_pika.abc.AbstractRobustChannel] = None
+
+    async def connect(self):
+        self.connection = await aio_pika.connect_robust(
+            host=settings.rabbitmq_host,
+            port=settings.rabbitmq_port,
+            login=settings.rabbitmq_user,
+            password=settings.rabbitmq_password,
+            virtualhost=settings.rabbitmq_vhost,
+        )
+        self.channel = await self.connection.channel()
+        logger.info("Connected to RabbitMQ", extra={"event": "rabbitmq_connected"})
+
+    async def disconnect(self):
+        if self.connection:
+            await self.connection.close()
+        self.connection = None
+        self.channel = None
+
+    async def publish(self, routing_key: str, body: bytes, **properties):
+        """Publish a persistent message to a queue through the default exchange"""
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(
+                body,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                **properties
+            ),
+            routing_key=routing_key
+        )
+
+
+rabbitmq_manager = RabbitMQManager()
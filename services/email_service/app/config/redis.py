@@ -6,5 +6,8 @@ def get_redis_client():
         host=settings.redis_host,
         port=settings.redis_port,
         db=settings.redis_db,
-        decode_responses=True
+        decode_responses=True,
+        # Callers wait on these from the event loop, through a thread
+        socket_connect_timeout=settings.redis_socket_timeout,
+        socket_timeout=settings.redis_socket_timeout
     )
@@ -17,11 +17,42 @@ class Settings(BaseSettings):
     rabbitmq_user: str = os.getenv("RABBITMQ_USER", "guest")
     rabbitmq_password: str = os.getenv("RABBITMQ_PASSWORD", "guest")
     rabbitmq_vhost: str = os.getenv("RABBITMQ_VHOST", "/")
+    # Priority queue the gateway publishes to, and the FIFO queue it replaced
+    # which is drained until empty
+    email_queue: str = os.getenv("EMAIL_QUEUE", "email.priority.queue")
+    email_legacy_queue: str = os.getenv("EMAIL_LEGACY_QUEUE", "email.queue")
+    email_queue_max_priority: int = int(os.getenv("EMAIL_QUEUE_MAX_PRIORITY", 10))
+    # Messages each process holds between delivery and ack (sent or scheduled
+    # for retry), as tasks on its event loop
+    email_consumer_concurrency: int = int(os.getenv("EMAIL_CONSUMER_CONCURRENCY", 20))
+    # Unacked messages held by the consumer, which also caps how many are in
+    # flight; 0 means the concurrency. Messages already delivered can't be
+    # overtaken by more urgent ones, so keep it at the concurrency: every
+    # delivered message is already in the pipeline and the rest wait in the
+    # broker in priority order.
+    email_prefetch_count: int = int(os.getenv("EMAIL_PREFETCH_COUNT", 0))
+    # Retry messages republished at once, also the retry consumer's prefetch;
+    # the retry queue has no priorities to protect
+    email_retry_concurrency: int = int(os.getenv("EMAIL_RETRY_CONCURRENCY", 20))
+    # Workers per pipeline stage: decode and render, provider send (also the
+    # send thread pool size) and status report to the gateway
+    email_render_concurrency: int = int(os.getenv("EMAIL_RENDER_CONCURRENCY", 4))
+    email_send_concurrency: int = int(os.getenv("EMAIL_SEND_CONCURRENCY", 10))
+    email_report_concurrency: int = int(os.getenv("EMAIL_REPORT_CONCURRENCY", 10))
+    # Items each stage queue holds before the stage in front of it waits
+    email_stage_queue_size: int = int(os.getenv("EMAIL_STAGE_QUEUE_SIZE", 100))
+    # Seconds a sent notification ID is remembered, so a message the gateway
+    # published twice is sent once
+    email_sent_ttl: int = int(os.getenv("EMAIL_SENT_TTL", 86400))
+    # Seconds shutdown waits for messages in flight; the rest are redelivered
+    email_consumer_shutdown_timeout: float = float(os.getenv("EMAIL_CONSUMER_SHUTDOWN_TIMEOUT", 20.0))
 
     # Redis settings
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", 6379))
     redis_db: int = int(os.getenv("REDIS_DB", 0))
+    # Seconds a Redis connect or command may take before it fails
+    redis_socket_timeout: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))
 
     # SMTP settings
     smtp_host: Optional[str] = os.getenv("SMTP_HOST")
@@ -41,12 +72,30 @@ class Settings(BaseSettings):
 
     # Template service
     template_service_url: str = os.getenv("TEMPLATE_SERVICE_URL", "http://template-service:8003")
+    # Keep every template in process, loaded at startup, and render locally
+    template_cache_enabled: bool = os.getenv("TEMPLATE_CACHE_ENABLED", "true").lower() == "true"
+    template_cache_refresh_interval: float = float(os.getenv("TEMPLATE_CACHE_REFRESH_INTERVAL", 60.0))
 
     API_GATEWAY_URL: str = os.getenv("API_GATEWAY_URL", "http://api-gateway:8020")
 
-    # Circuit breaker
-    circuit_breaker_failure_threshold: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5))
+    # Circuit breaker (one per email provider, state shared through Redis)
+    circuit_breaker_window_seconds: int = int(os.getenv("CIRCUIT_BREAKER_WINDOW_SECONDS", 60))
+    circuit_breaker_minimum_calls: int = int(os.getenv("CIRCUIT_BREAKER_MINIMUM_CALLS", 10))
+    circuit_breaker_failure_rate: float = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", 0.5))
+    circuit_breaker_slow_call_rate: float = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8))
+    circuit_breaker_slow_call_seconds: float = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 10.0))
     circuit_breaker_recovery_timeout: int = int(os.getenv("CIRCUIT_BREAKER_RECOVERY_TIMEOUT", 60))
+    circuit_breaker_sync_interval: float = float(os.getenv("CIRCUIT_BREAKER_SYNC_INTERVAL", 1.0))
+
+    # Dependency health probes, run in the background; /api/health serves the last result
+    health_check_interval: float = float(os.getenv("HEALTH_CHECK_INTERVAL", 5.0))
+    health_check_timeout: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", 2.0))
+
+    # Logging (formatted and written to stdout on a background thread)
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    # Fraction of INFO records to keep per event, e.g. "message_received=0.1"
+    log_sample_rates: str = os.getenv("LOG_SAMPLE_RATES", "")
 
     # Retry settings
     max_retries: int = int(os.getenv("MAX_RETRIES", 3))
@@ -1,157 +1,243 @@
 from datetime import datetime
-import json
 import asyncio
 import time
-import threading
-from app.config.rabbitmq import get_rabbitmq_channel
+from dataclasses import dataclass
+from typing import Any, Optional
+from aio_pika.abc import AbstractIncomingMessage
+from app.consumers.pipeline import Stage
+from app.consumers.queue_consumer import QueueConsumer
 from app.models.email_message import EmailMessage
 from app.models.delivery_status import DeliveryStatus, DeliveryStatusEnum
 from app.services.email_service import EmailService
 from app.services.template_service import TemplateServiceClient
 from app.services.retry_service import RetryService
+from app.services.sent_log import SentLog
 from app.services.status_updater import StatusUpdater
+from app.utils import codec
 from app.utils.logger import logger
-from app.routers.metrics import QUEUE_MESSAGES_PROCESSED, DELIVERY_TIME
-
-class EmailQueueConsumer:
-    def __init__(self):
+from app.config.settings import settings
+from app.routers.metrics import QUEUE_MESSAGES_PROCESSED, DELIVERY_TIME, QUEUE_WAIT_TIME
+
+
+@dataclass
+class EmailJob:
+    """A delivery on its way through the pipeline"""
+    body: bytes
+    properties: Any
+    # Resolved once the email is sent or scheduled for retry; the delivery
+    # is acked then, or nacked if it holds an exception
+    done: asyncio.Future
+    message: Optional[EmailMessage] = None
+    subject: str = ""
+    rendered_body: str = ""
+    started_at: float = 0.0
+
+
+class EmailQueueConsumer(QueueConsumer):
+    """
+    Email queue consumer, a pipeline of three stages with their own workers
+    and bounded queues: decode and render, provider send, and status report.
+    A slow provider doesn't hold up rendering, and the ack is sent when the
+    email is sent, not after the status update to the gateway.
+    """
+
+    name = "email"
+
+    def __init__(self, concurrency: int = None, prefetch_count: int = None):
+        super().__init__(concurrency, prefetch_count)
         self.email_service = EmailService()
         self.template_client = TemplateServiceClient()
         self.retry_service = RetryService()
         self.status_updater = StatusUpdater()
-        self.queue_name = 'email.queue'
-        self.channel = None
-        self._thread = None
-        self._stop_flag = False
+        self.sent_log = SentLog()
+        self.queue_name = settings.email_queue
+        self.legacy_queue_name = settings.email_legacy_queue
+
+        queue_size = settings.email_stage_queue_size
+        self.report_stage = Stage("report", self._report, settings.email_report_concurrency, queue_size)
+        self.send_stage = Stage(
+            "send", self._send, settings.email_send_concurrency, queue_size,
+            next_stage=self.report_stage, on_error=self._job_failed
+        )
+        self.render_stage = Stage(
+            "render", self._render, settings.email_render_concurrency, queue_size,
+            next_stage=self.send_stage, on_error=self._job_failed
+        )
+        self.stages = (self.render_stage, self.send_stage, self.report_stage)
+
+    async def declare_queues(self):
+        queue = await self.channel.declare_queue(
+            self.queue_name,
+            durable=True,
+            arguments={'x-max-priority': settings.email_queue_max_priority}
+        )
+        # The legacy queue gets no new messages, consuming it drains it
+        legacy_queue = await self.channel.declare_queue(self.legacy_queue_name, durable=True)
+        return [queue, legacy_queue]
 
     async def start_consuming(self):
-        """Start consuming messages from email queue in a separate thread"""
-        self._thread = threading.Thread(target=self._blocking_consume, daemon=True)
-        self._thread.start()
-        
-        # Give it a moment to start up
-        await asyncio.sleep(0.1)
-        logger.info("Email queue consumer thread started", extra={"event": "consumer_thread_started"})
-
-    def _blocking_consume(self):
-        """Blocking consume method that runs in a separate thread"""
+        for stage in self.stages:
+            stage.start()
+        await super().start_consuming()
+
+    async def stop(self, timeout: float = None):
+        await super().stop(timeout)
+        # Messages not acked by now are redelivered, don't send them twice;
+        # status reports for sent ones still go out
+        await self.render_stage.stop()
+        await self.send_stage.stop()
+        await self.report_stage.stop(
+            settings.email_consumer_shutdown_timeout if timeout is None else timeout
+        )
+
+    async def handle(self, message: AbstractIncomingMessage):
+        self._observe_wait(message)
+        job = self._job(message.body, message)
+        await self.render_stage.put(job)
+        await job.done
+
+    @staticmethod
+    def _job(body: bytes, properties) -> EmailJob:
+        return EmailJob(body=body, properties=properties, done=asyncio.get_running_loop().create_future())
+
+    @staticmethod
+    def _job_failed(job: EmailJob, error: Exception):
+        """A stage raised past its own handling; requeue the delivery"""
+        if not job.done.done():
+            job.done.set_exception(error)
+
+    @staticmethod
+    def _observe_wait(properties):
+        """Record how long the message waited in the queue, per priority"""
+        published_at = (getattr(properties, "headers", None) or {}).get("x-published-at")
+        if published_at is None:
+            return
+        QUEUE_WAIT_TIME.labels(priority=str(properties.priority or 0)).observe(
+            max(0.0, time.time() - float(published_at))
+        )
+
+    async def _process_message(self, body: bytes, properties=None):
+        """Process one message through every stage in turn, without the queues"""
+        job = self._job(body, properties)
+        job = await self._render(job)
+        status = await self._send(job) if job else None
+        if status:
+            await self._report(status)
+        # Raises what a stage failed the job with
+        return await job.done if job else None
+
+    async def _render(self, job: EmailJob) -> Optional[EmailJob]:
+        """Decode the message and render its template; returns the job for the send stage"""
         try:
-            self.channel = get_rabbitmq_channel()
-            self.channel.queue_declare(queue=self.queue_name, durable=True)
-            
-            def callback(ch, method, properties, body):
-                try:
-                    # Process message synchronously (create new event loop for this thread)
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(self._process_message(body))
-                        ch.basic_ack(delivery_tag=method.delivery_tag)
-                    finally:
-                        loop.close()
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}")
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-
-            self.channel.basic_consume(
-                queue=self.queue_name, 
-                on_message_callback=callback,
-                auto_ack=False
-            )
-
-            logger.info(
-                "Email queue consumer started", 
-                extra={"event": "consumer_started", "queue": self.queue_name}
-            )
-
-            # This blocks, but it's okay because it's in a separate thread
-            self.channel.start_consuming()
-            
-        except KeyboardInterrupt:
-            self.stop()
-        except Exception as e:
-            logger.error(
-                f"Error in email queue consumer: {str(e)}", 
-                extra={"event": "consumer_error", "error": str(e)}
+            # Producers may send JSON or msgpack, optionally compressed
+            data = codec.decode(
+                job.body,
+                getattr(job.properties, "content_type", None),
+                getattr(job.properties, "content_encoding", None),
             )
-
-    def stop(self):
-        """Stop consuming messages"""
-        self._stop_flag = True
-        if self.channel and self.channel.is_open:
-            self.channel.stop_consuming()
-            self.channel.close()
-            logger.info("Email queue consumer stopped", extra={"event": "consumer_stopped"})
-
-    async def _process_message(self, body: bytes):
-        """Process individual email message"""
-        try:
-            data = json.loads(body)
-            message = EmailMessage(**data)
-            start_time = time.time()
+            job.message = EmailMessage(**data)
+            job.started_at = time.time()
 
             logger.info(
                 "Processing email message",
                 extra={
-                    "notification_id": message.notification_id,
+                    "notification_id": job.message.notification_id,
                     "event": "message_received",
-                    "template_id": message.template_id
+                    "template_id": job.message.template_id
                 }
             )
 
             # Get rendered template
             template_data = await self.template_client.get_rendered_template(
-                message.template_id,
-                message.variables,
-                message.language
+                job.message.template_id,
+                job.message.variables,
+                job.message.language
             )
 
             if not template_data:
                 raise Exception("Failed to get template")
 
-            rendered_body = template_data.get("body", "")
-            subject = template_data.get("subject", "Notification")
-
-            # Send email
-            success = await self.email_service.send_email(message, rendered_body, subject)
-
-            if success:
-                # Update status
-                status = DeliveryStatus(
-                    notification_id=message.notification_id,
-                    status=DeliveryStatusEnum.sent,
-                    provider="email_service",
-                    timestamp=datetime.utcnow()
-                )
-                await self.status_updater.update_status(status)
-
-                processing_time = time.time() - start_time
-                DELIVERY_TIME.observe(processing_time)
-
-                logger.info(
-                    "Email sent successfully",
-                    extra={
-                        "notification_id": message.notification_id,
-                        "event": "email_sent",
-                        "processing_time": processing_time
-                    }
+            job.rendered_body = template_data.get("body", "")
+            job.subject = template_data.get("subject", "Notification")
+            return job
+
+        except codec.UnsupportedFormatError as e:
+            # Requeueing would loop it between the broker and every consumer
+            try:
+                await self.retry_service.dead_letter_undecodable(
+                    job.body,
+                    getattr(job.properties, "content_type", None),
+                    getattr(job.properties, "content_encoding", None),
+                    str(e),
                 )
+            except Exception as publish_error:
+                job.done.set_exception(publish_error)
             else:
-                raise Exception("Failed to send email")
-
-            QUEUE_MESSAGES_PROCESSED.inc()
-
+                job.done.set_result(None)
         except Exception as e:
-            error_str = str(e)
-            logger.error(
-                f"Failed to process email message: {error_str}",
-                extra={
-                    "notification_id": message.notification_id if 'message' in locals() else "unknown",
-                    "event": "message_processing_failed",
-                    "error": error_str
-                }
+            await self._fail(job, str(e))
+        return None
+
+    async def _send(self, job: EmailJob) -> Optional[DeliveryStatus]:
+        """Send the email; returns its status for the report stage"""
+        if await self.sent_log.was_sent(job.message.notification_id):
+            logger.info(
+                "Email already sent, skipping duplicate message",
+                extra={"notification_id": job.message.notification_id, "event": "duplicate_skipped"}
             )
+            job.done.set_result(None)
+            return None
 
-            # Retry or dead letter
-            if 'message' in locals():
-                self.retry_service.retry_message(message, error_str)
\ No newline at end of file
+        try:
+            success = await self.email_service.send_email(job.message, job.rendered_body, job.subject)
+        except Exception as e:
+            await self._fail(job, str(e))
+            return None
+        if not success:
+            await self._fail(job, "Failed to send email")
+            return None
+
+        await self.sent_log.mark_sent(job.message.notification_id)
+        processing_time = time.time() - job.started_at
+        DELIVERY_TIME.observe(processing_time)
+        QUEUE_MESSAGES_PROCESSED.inc()
+        logger.info(
+            "Email sent successfully",
+            extra={
+                "notification_id": job.message.notification_id,
+                "event": "email_sent",
+                "processing_time": processing_time
+            }
+        )
+        job.done.set_result(None)
+
+        return DeliveryStatus(
+            notification_id=job.message.notification_id,
+            status=DeliveryStatusEnum.sent,
+            provider="email_service",
+            timestamp=datetime.utcnow()
+        )
+
+    async def _report(self, status: DeliveryStatus):
+        """Tell the gateway; the message was already acked"""
+        await self.status_updater.update_status(status)
+
+    async def _fail(self, job: EmailJob, error: str):
+        """Schedule a retry (or dead letter) and let the delivery be acked"""
+        logger.error(
+            f"Failed to process email message: {error}",
+            extra={
+                "notification_id": job.message.notification_id if job.message else "unknown",
+                "event": "message_processing_failed",
+                "error": error
+            }
+        )
+        try:
+            # Retry or dead letter; a message that can't be parsed is dropped
+            if job.message:
+                await self.retry_service.retry_message(job.message, error)
+        except Exception as e:
+            # Not rescheduled, so requeue the delivery itself
+            job.done.set_exception(e)
+            return
+        job.done.set_result(None)
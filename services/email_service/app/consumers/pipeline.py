@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+from app.utils.logger import logger
+from app.routers.metrics import (
+    PIPELINE_STAGE_DURATION,
+    PIPELINE_STAGE_QUEUE_DEPTH,
+    PIPELINE_STAGE_WAIT,
+)
+
+
+class Stage:
+    """
+    One step of a message pipeline: a bounded queue and `concurrency`
+    worker tasks that run `handler` on its items.
+
+    Whatever the handler returns (other than None) is put on `next_stage`.
+    If the handler raises, `on_error(item, error)` is called so whoever
+    waits on the item isn't left hanging. A full queue makes `put` wait,
+    so a slow stage holds back the one before it instead of growing
+    without bound. Time spent queued and handling is recorded per stage.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Any]],
+        concurrency: int,
+        queue_size: int,
+        next_stage: Optional["Stage"] = None,
+        on_error: Optional[Callable[[Any, Exception], None]] = None
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.next_stage = next_stage
+        self.on_error = on_error
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._depth = PIPELINE_STAGE_QUEUE_DEPTH.labels(stage=name)
+        self._wait = PIPELINE_STAGE_WAIT.labels(stage=name)
+        self._duration = PIPELINE_STAGE_DURATION.labels(stage=name)
+
+    async def put(self, item: Any):
+        await self.queue.put((time.perf_counter(), item))
+        self._depth.set(self.queue.qsize())
+
+    def start(self):
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work(), name=f"{self.name}-stage-{i}")
+                for i in range(self.concurrency)
+            ]
+
+    async def stop(self, timeout: float = 0):
+        """Give the queued items up to `timeout` seconds, then stop the workers"""
+        if timeout and self._workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Stopping {self.name} stage with {self.queue.qsize()} items queued",
+                    extra={"event": "pipeline_stage_abandoned", "stage": self.name}
+                )
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self):
+        while True:
+            enqueued_at, item = await self.queue.get()
+            self._depth.set(self.queue.qsize())
+            started = time.perf_counter()
+            self._wait.observe(started - enqueued_at)
+            try:
+                result = await self.handler(item)
+            except Exception as e:
+                # Handlers deal with their own failures, this keeps the worker alive
+                logger.error(f"Unhandled error in {self.name} stage: {e}")
+                if self.on_error:
+                    self.on_error(item, e)
+                result = None
+            # Handling only, waiting for room in the next stage shows as its depth
+            self._duration.observe(time.perf_counter() - started)
+            try:
+                if result is not None and self.next_stage:
+                    await self.next_stage.put(result)
+            finally:
+                self.queue.task_done()
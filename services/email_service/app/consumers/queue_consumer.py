@@ -0,0 +1,97 @@
+import asyncio
+from typing import List, Set, Tuple
+from aio_pika.abc import AbstractIncomingMessage, AbstractQueue
+from app.config.rabbitmq import rabbitmq_manager
+from app.config.settings import settings
+from app.utils.logger import logger
+from app.routers.metrics import CONSUMER_IN_FLIGHT
+
+
+class QueueConsumer:
+    """
+    Consumes queues on the event loop with up to `concurrency` messages in
+    flight, each in its own task.
+
+    The broker delivers up to `prefetch_count` unacked messages and each
+    delivery is handled as a task; a semaphore keeps the number being
+    processed at `concurrency`. A prefetch below it caps the messages in
+    flight, a prefetch above it only buffers. A message is acked when
+    `handle` returns and nacked (with `requeue_on_error`) when it raises.
+    Subclasses declare their queues in `declare_queues` and process a
+    message in `handle`.
+    """
+
+    name = "queue"
+    requeue_on_error = True
+
+    def __init__(self, concurrency: int = None, prefetch_count: int = None):
+        self.concurrency = concurrency or settings.email_consumer_concurrency
+        self.prefetch_count = prefetch_count or settings.email_prefetch_count or self.concurrency
+        self.channel = None
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._consumers: List[Tuple[AbstractQueue, str]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._in_flight = CONSUMER_IN_FLIGHT.labels(consumer=self.name)
+
+    async def declare_queues(self) -> List[AbstractQueue]:
+        raise NotImplementedError
+
+    async def handle(self, message: AbstractIncomingMessage):
+        raise NotImplementedError
+
+    async def start_consuming(self):
+        """Open a channel on the shared connection and start the consumers"""
+        self.channel = await rabbitmq_manager.connection.channel()
+        await self.channel.set_qos(prefetch_count=self.prefetch_count)
+        for queue in await self.declare_queues():
+            self._consumers.append((queue, await queue.consume(self._on_message)))
+
+        logger.info(
+            f"{self.name.capitalize()} queue consumer started",
+            extra={
+                "event": "consumer_started",
+                "queues": [queue.name for queue, _ in self._consumers],
+                "concurrency": self.concurrency,
+                "prefetch_count": self.prefetch_count
+            }
+        )
+
+    async def _on_message(self, message: AbstractIncomingMessage):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            async with self._slots:
+                self._in_flight.inc()
+                try:
+                    await self.handle(message)
+                except Exception as e:
+                    logger.error(f"Error processing {self.name} message: {e}")
+                    await message.nack(requeue=self.requeue_on_error)
+                else:
+                    await message.ack()
+                finally:
+                    self._in_flight.dec()
+        finally:
+            self._tasks.discard(task)
+
+    async def stop(self, timeout: float = None):
+        """
+        Stop taking deliveries and wait up to `timeout` seconds for the
+        messages in flight; unfinished ones are redelivered once the channel
+        closes.
+        """
+        for queue, consumer_tag in self._consumers:
+            try:
+                await queue.cancel(consumer_tag)
+            except Exception as e:
+                logger.debug(f"Could not cancel consumer {consumer_tag}: {e}")
+        self._consumers = []
+
+        if self._tasks:
+            await asyncio.wait(
+                set(self._tasks),
+                timeout=settings.email_consumer_shutdown_timeout if timeout is None else timeout
+            )
+        if self.channel and not self.channel.is_closed:
+            await self.channel.close()
+        logger.info(f"{self.name.capitalize()} queue consumer stopped", extra={"event": "consumer_stopped"})
@@ -1,95 +1,49 @@
-import json
-import asyncio
-import time
-import threading
-from app.config.rabbitmq import get_rabbitmq_channel
+from aio_pika.abc import AbstractIncomingMessage
+from app.consumers.queue_consumer import QueueConsumer
+from app.config.settings import settings
 from app.models.email_message import EmailMessage
 from app.services.retry_service import RetryService
+from app.utils import codec
 from app.utils.logger import logger
 
-class RetryQueueConsumer:
-    def __init__(self):
+class RetryQueueConsumer(QueueConsumer):
+    name = "retry"
+
+    def __init__(self, concurrency: int = None, prefetch_count: int = None):
+        concurrency = concurrency or settings.email_retry_concurrency
+        super().__init__(concurrency, prefetch_count or concurrency)
         self.retry_service = RetryService()
         self.queue_name = 'email.retry.queue'
-        self.channel = None
-        self._thread = None
-        self._stop_flag = False
-
-    async def start_consuming(self):
-        """Start consuming messages from retry queue in a separate thread"""
-        self._thread = threading.Thread(target=self._blocking_consume, daemon=True)
-        self._thread.start()
-        
-        # Give it a moment to start up
-        await asyncio.sleep(0.1)
-        logger.info("Retry queue consumer thread started", extra={"event": "consumer_thread_started"})
-
-    def _blocking_consume(self):
-        """Blocking consume method that runs in a separate thread"""
-        try:
-            self.channel = get_rabbitmq_channel()
-            self.channel.queue_declare(queue=self.queue_name, durable=True)
-            
-            def callback(ch, method, properties, body):
-                try:
-                    # Process message synchronously (create new event loop for this thread)
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(self._process_message(body))
-                        ch.basic_ack(delivery_tag=method.delivery_tag)
-                    finally:
-                        loop.close()
-                except Exception as e:
-                    logger.error(f"Error processing retry message: {e}")
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-
-            self.channel.basic_consume(
-                queue=self.queue_name, 
-                on_message_callback=callback,
-                auto_ack=False
-            )
 
-            logger.info(
-                "Retry queue consumer started", 
-                extra={"event": "consumer_started", "queue": self.queue_name}
-            )
-
-            # This blocks, but it's okay because it's in a separate thread
-            self.channel.start_consuming()
-            
-        except KeyboardInterrupt:
-            self.stop()
-        except Exception as e:
-            logger.error(
-                f"Error in retry queue consumer: {str(e)}", 
-                extra={"event": "consumer_error", "error": str(e)}
-            )
+    async def declare_queues(self):
+        return [await self.channel.declare_queue(self.queue_name, durable=True)]
 
-    def stop(self):
-        """Stop consuming messages"""
-        self._stop_flag = True
-        if self.channel and self.channel.is_open:
-            self.channel.stop_consuming()
-            self.channel.close()
-            logger.info("Retry queue consumer stopped", extra={"event": "consumer_stopped"})
+    async def handle(self, message: AbstractIncomingMessage):
+        await self._process_message(message.body, message)
 
-    async def _process_message(self, body: bytes):
+    async def _process_message(self, body: bytes, properties=None):
         """Process individual retry message"""
         try:
-            data = json.loads(body)
-            message = EmailMessage(**data)
-            
-            logger.info(
-                "Processing retry message",
-                extra={
-                    "correlation_id": message.correlation_id,
-                    "event": "retry_message_received"
-                }
+            # Producers may send JSON or msgpack, optionally compressed
+            data = codec.decode(
+                body,
+                getattr(properties, "content_type", None),
+                getattr(properties, "content_encoding", None),
             )
-            
-            # Re-publish to main queue for retry
-            self.retry_service.republish_message(message)
-            
+            message = EmailMessage(**data)
         except Exception as e:
-            logger.error(f"Failed to process retry message: {str(e)}")
\ No newline at end of file
+            # A retry message that can't be read would fail the same way again
+            logger.error(f"Dropping unreadable retry message: {str(e)}")
+            return
+
+        logger.info(
+            "Processing retry message",
+            extra={
+                "correlation_id": message.correlation_id,
+                "event": "retry_message_received"
+            }
+        )
+
+        # Re-publish to main queue for retry; a failure propagates, so the
+        # delivery is nacked and requeued instead of acked and lost
+        await self.retry_service.republish_message(message)
\ No newline at end of file
@@ -1,11 +1,16 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-import asyncio
+from app.middleware.correlation_id import CorrelationIdMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from app.routers.health import router as health_router
 from app.routers.metrics import router as metrics_router
 from app.routers.webhooks import router as webhooks_router
 from app.consumers.email_queue_consumer import EmailQueueConsumer
 from app.consumers.retry_queue_consumer import RetryQueueConsumer
+from app.config.rabbitmq import rabbitmq_manager
+from app.services.health_monitor import health_monitor
+from app.services.template_service import template_cache
+from app.config.settings import settings
 from app.utils.logger import logger
 
 @asynccontextmanager
@@ -13,16 +18,24 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Email Service", extra={"service_name": "email-service", "event": "service_startup"})
     
+    # Load the templates before the first message arrives
+    if settings.template_cache_enabled:
+        await template_cache.start()
+
     # Store consumer instances
     consumer_instances = []
     
     try:
+        # One connection for the process, each consumer works on its own channel
+        await rabbitmq_manager.connect()
+
         email_consumer = EmailQueueConsumer()
         retry_consumer = RetryQueueConsumer()
         
         consumer_instances = [email_consumer, retry_consumer]
         
-        # Start consumers (they run in daemon threads, so just await the startup)
+        # Consumers run as tasks on this event loop, settings.email_consumer_concurrency
+        # messages at a time each
         await email_consumer.start_consuming()
         await retry_consumer.start_consuming()
         
@@ -30,14 +43,32 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to start consumers: {e}. Service will run without queue processing.", extra={"event": "consumer_startup_failed"})
     
+    # RabbitMQ is up while the consumers' channels are open; probing it
+    # this way needs no connection of its own
+    def consumers_connected():
+        return bool(consumer_instances) and all(
+            consumer.channel is not None and not consumer.channel.is_closed
+            for consumer in consumer_instances
+        )
+
+    health_monitor.register("rabbitmq", consumers_connected)
+    await health_monitor.start()
+
     yield  # <-- This should now be reached!
     
     # Shutdown
     logger.info("Shutting down Email Service", extra={"service_name": "email-service", "event": "service_shutdown"})
     
-    # Stop consumers
+    await health_monitor.stop()
+    await template_cache.stop()
+
+    # Stop consumers, letting the messages in flight finish
     for consumer in consumer_instances:
-        consumer.stop()
+        try:
+            await consumer.stop()
+        except Exception as e:
+            logger.warning(f"Failed to stop {consumer.name} consumer: {e}")
+    await rabbitmq_manager.disconnect()
 
 app = FastAPI(
     title="Email Service",
@@ -46,6 +77,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(CorrelationIdMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(health_router, prefix="/api", tags=["health"])
 app.include_router(metrics_router, prefix="/api", tags=["metrics"])
 app.include_router(webhooks_router, prefix="/api/webhooks", tags=["webhooks"])
@@ -0,0 +1,26 @@
+import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class CorrelationIdMiddleware:
+    """Echo X-Correlation-ID back, generating one when the caller sent none"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = Headers(scope=scope).get("X-Correlation-ID") or str(uuid.uuid4())
+        # Exposed to handlers as request.state.correlation_id
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+
+        async def send_with_correlation_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Correlation-ID"] = correlation_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_correlation_id)
@@ -0,0 +1,43 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.routers.metrics import ERRORS_TOTAL, REQUEST_DURATION, REQUESTS_TOTAL
+
+
+class MetricsMiddleware:
+    """Record request count, latency and errors for every HTTP request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        error_type = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            error_type = type(e).__name__
+            raise
+        finally:
+            method = scope["method"]
+            # Route template rather than raw path, so scanners probing random
+            # URLs all land in one "unmatched" series
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUESTS_TOTAL.labels(method=method, endpoint=endpoint, status=str(status_code)).inc()
+            REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(time.perf_counter() - start)
+            if error_type is None and status_code >= 500:
+                error_type = f"http_{status_code}"
+            if error_type:
+                ERRORS_TOTAL.labels(method=method, endpoint=endpoint, error_type=error_type).inc()
@@ -1,39 +1,35 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
 from datetime import datetime
-import redis
-import pika
 from app.config.settings import settings
-from app.config.redis import get_redis_client
-from app.config.rabbitmq import get_rabbitmq_connection
+from app.services.circuit_breaker import circuit_breakers
+from app.services.health_monitor import health_monitor
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
-    checks = {
-        "redis": "healthy",
-        "rabbitmq": "healthy"
-    }
-
-    try:
-        redis_client = get_redis_client()
-        redis_client.ping()
-    except Exception:
-        checks["redis"] = "unhealthy"
-
-    try:
-        connection = get_rabbitmq_connection()
-        connection.close()
-    except Exception:
-        checks["rabbitmq"] = "unhealthy"
+    # Probes run in the background (app.services.health_monitor), this only
+    # reads their last result
+    snapshot = health_monitor.snapshot()
+    checks = {name: result["status"] for name, result in snapshot["checks"].items()}
 
     status = "healthy"
-    if "unhealthy" in checks.values():
+    if any(value != "healthy" for value in checks.values()):
         status = "degraded"
 
     return {
         "status": status,
         "service": settings.service_name,
         "timestamp": datetime.utcnow().isoformat() + "Z",
-        "checks": checks
+        "checks": checks,
+        "details": snapshot["checks"],
+        "checked_at": snapshot["checked_at"],
+        "age_seconds": snapshot["age_seconds"]
+    }
+
+@router.get("/circuit-breakers")
+async def circuit_breaker_states():
+    return {
+        "service": settings.service_name,
+        "circuit_breakers": circuit_breakers.snapshot()
     }
@@ -48,6 +48,37 @@ DELIVERY_TIME = prometheus_client.Histogram(
     'Time from enqueue to delivery'
 )
 
+QUEUE_WAIT_TIME = prometheus_client.Histogram(
+    'email_service_queue_wait_seconds',
+    'Time from the gateway publishing a message to it being consumed',
+    ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600)
+)
+
+CONSUMER_IN_FLIGHT = prometheus_client.Gauge(
+    'email_service_consumer_in_flight',
+    'Messages being processed by a queue consumer',
+    ['consumer']
+)
+
+PIPELINE_STAGE_QUEUE_DEPTH = prometheus_client.Gauge(
+    'email_service_pipeline_stage_queue_depth',
+    'Items waiting for a pipeline stage (render, send, report)',
+    ['stage']
+)
+
+PIPELINE_STAGE_WAIT = prometheus_client.Histogram(
+    'email_service_pipeline_stage_wait_seconds',
+    'Time an item waited in a pipeline stage queue',
+    ['stage']
+)
+
+PIPELINE_STAGE_DURATION = prometheus_client.Histogram(
+    'email_service_pipeline_stage_duration_seconds',
+    'Time a pipeline stage spent handling an item',
+    ['stage']
+)
+
 QUEUE_LENGTH = prometheus_client.Gauge(
     'email_service_queue_length',
     'Current queue length'
@@ -58,6 +89,42 @@ WEBHOOK_EVENTS_RECEIVED = prometheus_client.Counter(
     'Total webhook events received from providers'
 )
 
+CIRCUIT_BREAKER_STATE = prometheus_client.Gauge(
+    'email_service_circuit_breaker_state',
+    'Circuit breaker state per provider (0 = closed, 1 = half open, 2 = open)',
+    ['provider']
+)
+
+CIRCUIT_BREAKER_TRANSITIONS_TOTAL = prometheus_client.Counter(
+    'email_service_circuit_breaker_transitions_total',
+    'Circuit breaker state changes per provider',
+    ['provider', 'from_state', 'to_state']
+)
+
+CIRCUIT_BREAKER_CALLS_TOTAL = prometheus_client.Counter(
+    'email_service_circuit_breaker_calls_total',
+    'Provider calls through a circuit breaker (success, failure, slow, rejected)',
+    ['provider', 'result']
+)
+
+TEMPLATE_CACHE_LOOKUPS_TOTAL = prometheus_client.Counter(
+    'email_service_template_cache_lookups_total',
+    'Template lookups answered from the in-process cache (hit) or the template service (miss)',
+    ['result']
+)
+
+DEPENDENCY_UP = prometheus_client.Gauge(
+    'email_service_dependency_up',
+    'Whether the last health probe of a dependency succeeded (1 = up, 0 = down)',
+    ['dependency']
+)
+
+LOG_RECORDS_DISCARDED_TOTAL = prometheus_client.Counter(
+    'email_service_log_records_discarded_total',
+    'Log records not written, sampled out or dropped with the log queue full',
+    ['reason']
+)
+
 @router.get("/metrics")
 async def metrics():
     return Response(
@@ -1,35 +1,217 @@
-import asyncio
+import json
 import time
-from typing import Callable, Any
+import asyncio
+from collections import deque
+from typing import Callable, Any, Dict
 from app.config.settings import settings
+from app.config.redis import get_redis_client
+from app.utils.logger import logger
+from app.routers.metrics import (
+    CIRCUIT_BREAKER_CALLS_TOTAL,
+    CIRCUIT_BREAKER_STATE,
+    CIRCUIT_BREAKER_TRANSITIONS_TOTAL,
+)
+
+STATE_VALUES = {"closed": 0, "half-open": 1, "open": 2}
+
+
+class CircuitBreakerOpenError(Exception):
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"Circuit breaker for {name} is open")
+
 
 class CircuitBreaker:
-    def __init__(self):
-        self.failure_count = 0
-        self.last_failure_time = 0
+    """
+    Circuit breaker for one email provider.
+
+    Opens when the failure rate or slow call rate over the rolling window
+    reaches its threshold, lets one trial call through after the recovery
+    timeout, and shares open/closed decisions with the other email service
+    instances through Redis. A provider call that returns False (provider
+    not configured) is not counted either way.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
         self.state = "closed"  # closed, open, half-open
+        self.open_until = 0.0
+        self.changed_at = 0.0
+        # One [second, calls, failures, slow calls] bucket per second
+        self._buckets = deque()
+        self._trial_in_flight = False
+        self._last_sync = 0.0
+        # Every consumer runs on the one event loop and state changes happen
+        # between awaits, so no lock; only the Redis calls leave the loop
+        self._redis = None
+        CIRCUIT_BREAKER_STATE.labels(provider=name).set(0)
+
+    @property
+    def redis_key(self) -> str:
+        return f"circuit_breaker:email:{self.name}"
 
     async def call(self, func: Callable, *args, **kwargs) -> Any:
+        await self._sync()
+
         if self.state == "open":
-            if time.time() - self.last_failure_time > settings.circuit_breaker_recovery_timeout:
-                self.state = "half-open"
-            else:
-                raise Exception("Circuit breaker is open")
+            if time.time() < self.open_until:
+                CIRCUIT_BREAKER_CALLS_TOTAL.labels(provider=self.name, result="rejected").inc()
+                raise CircuitBreakerOpenError(self.name)
+            self._transition("half-open")
+        trial = self.state == "half-open"
+        if trial:
+            if self._trial_in_flight:
+                CIRCUIT_BREAKER_CALLS_TOTAL.labels(provider=self.name, result="rejected").inc()
+                raise CircuitBreakerOpenError(self.name)
+            self._trial_in_flight = True
 
+        start = time.perf_counter()
         try:
             result = await func(*args, **kwargs)
-            self._on_success()
+        except Exception:
+            await self._record(False, time.perf_counter() - start, trial)
+            raise
+        finally:
+            if trial:
+                self._trial_in_flight = False
+        if result is False:
+            # Provider is not configured, nothing was attempted
             return result
+        await self._record(True, time.perf_counter() - start, trial)
+        return result
+
+    def snapshot(self) -> dict:
+        calls, failures, slow = self._totals(time.time())
+        return {
+            "provider": self.name,
+            "state": self.state,
+            "open_until": self.open_until if self.state == "open" else None,
+            "window_seconds": settings.circuit_breaker_window_seconds,
+            "calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow / calls if calls else 0.0,
+        }
+
+    async def _record(self, success: bool, duration: float, trial: bool):
+        now = time.time()
+        slow = duration >= settings.circuit_breaker_slow_call_seconds
+        result = "failure" if not success else "slow" if slow else "success"
+        CIRCUIT_BREAKER_CALLS_TOTAL.labels(provider=self.name, result=result).inc()
+
+        second = int(now)
+        if self._buckets and self._buckets[-1][0] == second:
+            bucket = self._buckets[-1]
+        else:
+            bucket = [second, 0, 0, 0]
+            self._buckets.append(bucket)
+        bucket[1] += 1
+        bucket[2] += 0 if success else 1
+        bucket[3] += 1 if slow else 0
+
+        if trial:
+            if success and not slow:
+                self._buckets.clear()
+                self._transition("closed")
+            else:
+                self._open(now)
+        elif self.state == "closed":
+            calls, failures, slow_calls = self._totals(now)
+            if calls < settings.circuit_breaker_minimum_calls:
+                return
+            if (
+                failures / calls < settings.circuit_breaker_failure_rate
+                and slow_calls / calls < settings.circuit_breaker_slow_call_rate
+            ):
+                return
+            logger.warning(
+                f"Circuit breaker for {self.name} opened "
+                f"({failures}/{calls} failed, {slow_calls}/{calls} slow)"
+            )
+            self._open(now)
+        else:
+            return
+        shared = json.dumps({
+            "state": self.state,
+            "open_until": self.open_until,
+            "changed_at": self.changed_at,
+        })
+
+        try:
+            await asyncio.to_thread(
+                self._client().set,
+                self.redis_key, shared,
+                ex=max(settings.circuit_breaker_recovery_timeout * 2, 60)
+            )
         except Exception as e:
-            self._on_failure()
-            raise e
-
-    def _on_success(self):
-        self.failure_count = 0
-        self.state = "closed"
-
-    def _on_failure(self):
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-        if self.failure_count >= settings.circuit_breaker_failure_threshold:
-            self.state = "open"
+            logger.debug(f"Could not share circuit breaker state for {self.name}: {e}")
+
+    def _totals(self, now: float):
+        oldest = int(now) - settings.circuit_breaker_window_seconds
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+        calls = sum(bucket[1] for bucket in self._buckets)
+        failures = sum(bucket[2] for bucket in self._buckets)
+        slow = sum(bucket[3] for bucket in self._buckets)
+        return calls, failures, slow
+
+    def _open(self, now: float):
+        self.open_until = now + settings.circuit_breaker_recovery_timeout
+        self._transition("open")
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        CIRCUIT_BREAKER_TRANSITIONS_TOTAL.labels(
+            provider=self.name, from_state=self.state, to_state=state
+        ).inc()
+        CIRCUIT_BREAKER_STATE.labels(provider=self.name).set(STATE_VALUES[state])
+        logger.info(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.changed_at = time.time()
+
+    async def _sync(self):
+        """Adopt a newer open/closed decision made by another instance"""
+        now = time.time()
+        if now - self._last_sync < settings.circuit_breaker_sync_interval:
+            return
+        # Set before the read, so concurrent calls don't all go to Redis
+        self._last_sync = now
+        try:
+            value = await asyncio.to_thread(self._client().get, self.redis_key)
+        except Exception as e:
+            logger.debug(f"Could not read circuit breaker state for {self.name}: {e}")
+            return
+        if not value:
+            return
+
+        shared = json.loads(value)
+        if shared["changed_at"] <= self.changed_at:
+            return
+        if shared["state"] == "open" and shared["open_until"] > now:
+            self.open_until = shared["open_until"]
+            self._transition("open")
+        elif shared["state"] == "closed" and self.state != "closed":
+            self._buckets.clear()
+            self._transition("closed")
+        self.changed_at = shared["changed_at"]
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = get_redis_client()
+        return self._redis
+
+
+class CircuitBreakerRegistry:
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(name)
+        return self._breakers[name]
+
+    def snapshot(self) -> list:
+        return [breaker.snapshot() for breaker in list(self._breakers.values())]
+
+
+circuit_breakers = CircuitBreakerRegistry()
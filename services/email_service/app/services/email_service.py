@@ -1,36 +1,59 @@
+import asyncio
+import functools
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
 from app.config.settings import settings
 from app.models.email_message import EmailMessage
 from app.utils.logger import logger
-from app.services.circuit_breaker import CircuitBreaker
+from app.services.circuit_breaker import CircuitBreakerOpenError, circuit_breakers
 from app.routers.metrics import EMAILS_SENT, EMAILS_FAILED
 
-class EmailService:
-    def __init__(self):
-        self.circuit_breaker = CircuitBreaker()
+# smtplib and requests block, so provider calls run here, off the event loop
+# the consumers share. One thread per send stage worker.
+_send_executor = ThreadPoolExecutor(
+    max_workers=settings.email_send_concurrency,
+    thread_name_prefix="email-send"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking provider call in the send thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_send_executor, functools.partial(func, *args, **kwargs))
+
 
+class EmailService:
     async def send_email(self, message: EmailMessage, rendered_template: str, subject: str) -> bool:
-        """Send email using available providers with circuit breaker"""
+        """Send email using available providers, skipping those whose circuit is open"""
         providers = [
-            self._send_via_smtp,
-            self._send_via_sendgrid,
-            self._send_via_mailgun,
-            self._send_via_gmail,
-            self._send_via_zoho
+            ("smtp", self._send_via_smtp),
+            ("sendgrid", self._send_via_sendgrid),
+            ("mailgun", self._send_via_mailgun),
+            ("gmail", self._send_via_gmail),
+            ("zoho", self._send_via_zoho)
         ]
 
-        for provider in providers:
-            if await self.circuit_breaker.call(provider, message, rendered_template, subject):
+        for name, provider in providers:
+            try:
+                sent = await circuit_breakers.get(name).call(provider, message, rendered_template, subject)
+            except CircuitBreakerOpenError:
+                continue
+            except Exception as e:
+                # Fall back to the next provider
+                logger.warning(f"Provider {name} failed: {str(e)}")
+                continue
+
+            if sent:
                 EMAILS_SENT.inc()
                 logger.info(
-                    f"Email sent successfully via {provider.__name__}",
+                    f"Email sent successfully via {name}",
                     extra={
                         "notification_id": message.notification_id,
                         "event": "email_sent",
-                        "provider": provider.__name__
+                        "provider": name
                     }
                 )
                 return True
@@ -57,17 +80,25 @@ class EmailService:
 
             msg.attach(MIMEText(rendered_template, 'html'))
 
-            server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
+            await run_blocking(self._smtp_send, msg)
+            return True
+        except Exception as e:
+            logger.error(f"SMTP send failed: {str(e)}")
+            raise e
+
+    @staticmethod
+    def _smtp_send(msg: MIMEMultipart):
+        server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
+        try:
             if settings.smtp_use_tls:
                 server.starttls()
             if settings.smtp_user and settings.smtp_password:
                 server.login(settings.smtp_user, settings.smtp_password)
             server.send_message(msg)
-            server.quit()
-            return True
-        except Exception as e:
-            logger.error(f"SMTP send failed: {str(e)}")
-            raise e
+        except Exception:
+            server.close()
+            raise
+        server.quit()
 
     async def _send_via_sendgrid(self, message: EmailMessage, rendered_template: str, subject: str) -> bool:
         if not settings.sendgrid_api_key:
@@ -87,7 +118,7 @@ class EmailService:
                 "subject": subject,
                 "content": [{"type": "text/html", "value": rendered_template}]
             }
-            response = requests.post(url, json=data, headers=headers)
+            response = await run_blocking(requests.post, url, json=data, headers=headers)
             response.raise_for_status()
             return True
         except Exception as e:
@@ -107,7 +138,7 @@ class EmailService:
                 "subject": subject,
                 "html": rendered_template
             }
-            response = requests.post(url, auth=auth, data=data)
+            response = await run_blocking(requests.post, url, auth=auth, data=data)
             response.raise_for_status()
             return True
         except Exception as e:
@@ -138,7 +169,7 @@ class EmailService:
                 "subject": subject,
                 "html": rendered_template
             }
-            response = requests.post(url, json=data, headers=headers)
+            response = await run_blocking(requests.post, url, json=data, headers=headers)
             response.raise_for_status()
             return True
         except Exception as e:
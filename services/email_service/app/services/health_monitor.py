@@ -0,0 +1,119 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import redis
+from app.config.settings import settings
+from app.utils.logger import logger
+from app.routers.metrics import DEPENDENCY_UP
+
+
+class HealthMonitor:
+    """
+    Dependency health, probed in the background.
+
+    Every health_check_interval seconds each registered probe runs once, in
+    a worker thread so blocking clients stay off the event loop, and the
+    results replace the snapshot. /api/health serves the snapshot with its
+    age, so a Kubernetes probe never opens a connection.
+    """
+
+    def __init__(self, interval: float = None, timeout: float = None):
+        self.interval = interval or settings.health_check_interval
+        self.timeout = timeout or settings.health_check_timeout
+        self.probes: Dict[str, Callable[[], bool]] = {}
+        self.results: Dict[str, dict] = {}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, probe: Callable[[], bool]):
+        """Add a blocking probe; it returns True when the dependency is up"""
+        self.probes[name] = probe
+
+    async def refresh(self):
+        """Run every probe once and store the results"""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name) for name in names))
+        self.results = dict(zip(names, results))
+        self.checked_at = time.time()
+
+    async def _probe(self, name: str) -> dict:
+        started = time.perf_counter()
+        error = None
+        try:
+            up = bool(await asyncio.wait_for(asyncio.to_thread(self.probes[name]), self.timeout))
+        except asyncio.TimeoutError:
+            up, error = False, f"timed out after {self.timeout}s"
+        except Exception as e:
+            up, error = False, (str(e) or type(e).__name__).splitlines()[0]
+
+        DEPENDENCY_UP.labels(dependency=name).set(1 if up else 0)
+        result = {
+            "status": "healthy" if up else "unhealthy",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def snapshot(self) -> dict:
+        """The last results, with when they were taken and how long ago"""
+        if self.checked_at is None:
+            return {
+                "checks": {name: {"status": "unknown"} for name in self.probes},
+                "checked_at": None,
+                "age_seconds": None,
+            }
+        return {
+            "checks": self.results,
+            "checked_at": datetime.utcfromtimestamp(self.checked_at).isoformat() + "Z",
+            "age_seconds": round(time.time() - self.checked_at, 3),
+        }
+
+    async def start(self):
+        """Take a first snapshot, then keep refreshing it in the background"""
+        if self._task is None:
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresher"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Health check refresh failed: {e}", extra={"event": "health_check_failed"})
+
+
+# One client for every probe instead of a new connection pool per check. The
+# socket timeouts end a hung ping, which wait_for can't do for the thread.
+_redis_client = None
+
+
+def check_redis() -> bool:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            socket_connect_timeout=settings.health_check_timeout,
+            socket_timeout=settings.health_check_timeout,
+        )
+    return bool(_redis_client.ping())
+
+
+health_monitor = HealthMonitor()
+health_monitor.register("redis", check_redis)
@@ -1,8 +1,8 @@
 import json
 import time
-import pika
+from typing import Optional
 from app.config.settings import settings
-from app.config.rabbitmq import get_rabbitmq_channel
+from app.config.rabbitmq import rabbitmq_manager
 from app.models.email_message import EmailMessage
 from app.utils.logger import logger
 from app.utils.exponential_backoff import exponential_backoff
@@ -11,29 +11,30 @@ class RetryService:
     def __init__(self):
         self.max_retries = settings.max_retries
         self.retry_delay = settings.retry_delay
+        self._declared = set()
 
-    def retry_message(self, message: EmailMessage, error: str):
+    async def _declare(self, queue: str):
+        """Declare a queue once per process instead of before every publish"""
+        if queue not in self._declared:
+            await rabbitmq_manager.channel.declare_queue(queue, durable=True)
+            self._declared.add(queue)
+
+    async def retry_message(self, message: EmailMessage, error: str):
         """Retry sending message with exponential backoff"""
         if message.retry_count >= self.max_retries:
-            self._move_to_dead_letter(message, error)
+            await self._move_to_dead_letter(message, error)
             return
 
         message.retry_count += 1
         delay = exponential_backoff(message.retry_count, self.retry_delay)
 
         # Publish to retry queue with delay
-        channel = get_rabbitmq_channel()
-        channel.queue_declare(queue='email.retry', durable=True)
-        channel.basic_publish(
-            exchange='',
-            routing_key='email.retry',
-            body=json.dumps(message.dict()),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # persistent
-                headers={'x-delay': int(delay * 1000)}  # delay in ms
-            )
+        await self._declare('email.retry')
+        await rabbitmq_manager.publish(
+            'email.retry',
+            json.dumps(message.dict()).encode(),
+            headers={'x-delay': int(delay * 1000)}  # delay in ms
         )
-        channel.close()
 
         logger.info(
             f"Message scheduled for retry {message.retry_count}/{self.max_retries} in {delay}s",
@@ -44,21 +45,56 @@ class RetryService:
             }
         )
 
-    def _move_to_dead_letter(self, message: EmailMessage, error: str):
+    async def republish_message(self, message: EmailMessage):
+        """Put a message from the retry queue back on the email queue, at its priority"""
+        await rabbitmq_manager.publish(
+            settings.email_queue,
+            json.dumps(message.dict()).encode(),
+            content_type="application/json",
+            priority=self.message_priority(message)
+        )
+
+    @staticmethod
+    def message_priority(message: EmailMessage) -> Optional[int]:
+        """
+        AMQP priority for a message, from the request priority the gateway
+        put in its body (10 is the most urgent); None if it isn't a number
+        """
+        try:
+            return max(0, min(settings.email_queue_max_priority, int(message.priority)))
+        except (TypeError, ValueError):
+            return None
+
+    async def dead_letter_undecodable(self, body: bytes, content_type: str, content_encoding: str, error: str):
+        """
+        Park a message no instance can decode on the dead letter queue as it
+        arrived, body and format intact, so it can be inspected or re-driven
+        """
+        await self._declare('failed.queue')
+        await rabbitmq_manager.publish(
+            'failed.queue',
+            body,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            headers={'x-error': error, 'x-failed-at': time.time()}
+        )
+
+        logger.error(
+            f"Undecodable message moved to dead letter queue: {error}",
+            extra={"notification_id": "unknown", "event": "message_dead_lettered", "error": error}
+        )
+
+    async def _move_to_dead_letter(self, message: EmailMessage, error: str):
         """Move failed message to dead letter queue"""
-        channel = get_rabbitmq_channel()
-        channel.queue_declare(queue='failed.queue', durable=True)
-        channel.basic_publish(
-            exchange='',
-            routing_key='failed.queue',
-            body=json.dumps({
+        await self._declare('failed.queue')
+        await rabbitmq_manager.publish(
+            'failed.queue',
+            json.dumps({
                 "message": message.dict(),
                 "error": error,
                 "failed_at": time.time()
-            }),
-            properties=pika.BasicProperties(delivery_mode=2)
+            }).encode()
         )
-        channel.close()
 
         logger.error(
             f"Message moved to dead letter queue after {self.max_retries} retries",
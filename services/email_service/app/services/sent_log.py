@@ -0,0 +1,51 @@
+import asyncio
+import redis
+from app.config.settings import settings
+from app.utils.logger import logger
+
+# Socket timeouts so a Redis outage costs a send at most this much
+REDIS_TIMEOUT = 1.0
+
+
+class SentLog:
+    """
+    Notification IDs whose email was already sent, kept in Redis for
+    `email_sent_ttl` seconds.
+
+    The gateway publishes at least once: a publish that times out after the
+    broker took it also goes to the outbox and is replayed. Checking here
+    before sending keeps that from mailing the recipient twice. Redis errors
+    only log, the email is sent rather than dropped.
+    """
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or settings.email_sent_ttl
+        self._redis = None
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                socket_connect_timeout=REDIS_TIMEOUT,
+                socket_timeout=REDIS_TIMEOUT,
+            )
+        return self._redis
+
+    @staticmethod
+    def _key(notification_id: str) -> str:
+        return f"email:sent:{notification_id}"
+
+    async def was_sent(self, notification_id: str) -> bool:
+        try:
+            return bool(await asyncio.to_thread(self._client().exists, self._key(notification_id)))
+        except Exception as e:
+            logger.warning(f"Could not check sent log for {notification_id}: {e}")
+            return False
+
+    async def mark_sent(self, notification_id: str):
+        try:
+            await asyncio.to_thread(self._client().set, self._key(notification_id), "1", ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Could not record {notification_id} as sent: {e}")
@@ -1,14 +1,105 @@
+import asyncio
 import httpx
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from app.config.settings import settings
 from app.utils.logger import logger
+from app.utils.template_parser import render_template
+from app.routers.metrics import TEMPLATE_CACHE_LOOKUPS_TOTAL
+
+
+class TemplateCache:
+    """
+    Every template from the template service, held in process.
+
+    Loaded from the bulk endpoint (GET /api/templates) when the service
+    starts and reloaded every template_cache_refresh_interval seconds. The
+    reload sends the last version as If-None-Match, so it costs a 304 while
+    nothing changed. Cached templates are rendered locally instead of
+    calling the template service's render endpoint for every message.
+    """
+
+    def __init__(self, base_url: str = None, refresh_interval: float = None):
+        self.base_url = base_url or settings.template_service_url
+        self.refresh_interval = refresh_interval or settings.template_cache_refresh_interval
+        # (logical_id, language) -> template; built from a response and
+        # swapped in whole, so renders on the event loop see the old set or
+        # the new one, never a mix
+        self.templates: Dict[Tuple[str, str], dict] = {}
+        self.version: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, template_id: str, language: str) -> Optional[dict]:
+        return self.templates.get((template_id, language))
+
+    async def refresh(self) -> bool:
+        """Reload the templates; False when they haven't changed"""
+        headers = {"If-None-Match": f'"{self.version}"'} if self.version else None
+        async with httpx.AsyncClient(base_url=self.base_url) as client:
+            response = await client.get("/api/templates", headers=headers)
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+
+        data = response.json()
+        self.templates = {
+            (template["logical_id"], template["language"]): template
+            for template in data.get("data") or []
+        }
+        self.version = (data.get("meta") or {}).get("version")
+        logger.info(
+            f"Loaded {len(self.templates)} templates",
+            extra={"event": "template_cache_loaded", "version": self.version}
+        )
+        return True
+
+    async def start(self):
+        """Load the templates, then keep them fresh in the background"""
+        if self._task is None:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Template cache warm-up failed: {e}", extra={"event": "template_cache_failed"})
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Template cache refresh failed: {e}", extra={"event": "template_cache_failed"})
+
+
+template_cache = TemplateCache()
+
 
 class TemplateServiceClient:
-    def __init__(self):
+    def __init__(self, cache: TemplateCache = None):
         self.base_url = settings.template_service_url
+        self.cache = cache or template_cache
 
     async def get_rendered_template(self, template_id: str, variables: Dict[str, str], language: str = "en") -> Optional[Dict]:
-        """Fetch and render template from template service"""
+        """Render a cached template locally, or fetch and render it from template service"""
+        template = self.cache.get(template_id, language) if settings.template_cache_enabled else None
+        if template:
+            TEMPLATE_CACHE_LOOKUPS_TOTAL.labels(result="hit").inc()
+            return {
+                "subject": render_template(template.get("subject") or "", variables),
+                "body": render_template(template["body"], variables)
+            }
+        TEMPLATE_CACHE_LOOKUPS_TOTAL.labels(result="miss").inc()
+
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
@@ -0,0 +1,129 @@
+"""
+Queue message codec
+
+Bodies are JSON (orjson when installed) or msgpack, optionally compressed
+with zstd or gzip. The format travels in the AMQP content_type and
+content_encoding properties, so a consumer decodes whatever it is given and
+producers can switch formats without a coordinated deploy. A message
+without these properties is plain JSON, which is what older producers send.
+
+The API gateway carries a copy of this module; keep the two in sync.
+"""
+
+import gzip
+import json
+import threading
+from typing import Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional codec
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional compression
+    zstandard = None
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# Older msgpack producers use the unregistered x- form
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+
+ZSTD = "zstd"
+GZIP = "gzip"
+
+
+class UnsupportedFormatError(ValueError):
+    """The body uses a content type or encoding this process can't read"""
+
+
+def available_codecs() -> Tuple[str, ...]:
+    """Content types this process can encode and decode"""
+    return (JSON, MSGPACK) if msgpack else (JSON,)
+
+
+def available_compressions() -> Tuple[str, ...]:
+    """Content encodings this process can compress and decompress"""
+    return (ZSTD, GZIP) if zstandard else (GZIP,)
+
+
+def encode(
+    message: dict,
+    content_type: str = JSON,
+    compression: Optional[str] = None,
+    min_compress_size: int = 1024,
+) -> Tuple[bytes, str, Optional[str]]:
+    """
+    Serialize a message
+
+    Returns (body, content_type, content_encoding). Falls back to JSON if
+    msgpack isn't installed, and only compresses bodies of at least
+    min_compress_size bytes, since small ones can come out larger.
+    """
+    if content_type in MSGPACK_ALIASES and msgpack:
+        body = msgpack.packb(message, use_bin_type=True)
+        content_type = MSGPACK
+    else:
+        body = orjson.dumps(message) if orjson else json.dumps(message).encode()
+        content_type = JSON
+
+    content_encoding = None
+    if compression and len(body) >= min_compress_size:
+        if compression == ZSTD and zstandard:
+            body = _zstd_compressor().compress(body)
+            content_encoding = ZSTD
+        elif compression in (ZSTD, GZIP):
+            body = gzip.compress(body, compresslevel=6)
+            content_encoding = GZIP
+    return body, content_type, content_encoding
+
+
+def decode(
+    body: bytes,
+    content_type: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+) -> dict:
+    """Deserialize a message using the properties it was published with"""
+    if content_encoding == ZSTD:
+        if not zstandard:
+            raise UnsupportedFormatError("zstd body but zstandard is not installed")
+        body = _zstd_decompressor().decompress(body)
+    elif content_encoding == GZIP:
+        body = gzip.decompress(body)
+    elif content_encoding not in (None, "", "identity", "utf-8"):
+        raise UnsupportedFormatError(f"Unsupported content encoding: {content_encoding}")
+
+    if content_type in MSGPACK_ALIASES:
+        if not msgpack:
+            raise UnsupportedFormatError("msgpack body but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False)
+    if content_type in (None, "", JSON, "text/plain"):
+        return orjson.loads(body) if orjson else json.loads(body)
+    raise UnsupportedFormatError(f"Unsupported content type: {content_type}")
+
+
+# Per thread, zstd contexts are not thread-safe; the email consumer decodes on
+# the event loop, but benchmarks and scripts may call in from other threads
+_zstd = threading.local()
+
+
+def _zstd_compressor():
+    # Reused because creating a context costs more than compressing a message
+    compressor = getattr(_zstd, "compressor", None)
+    if compressor is None:
+        compressor = _zstd.compressor = zstandard.ZstdCompressor(level=3)
+    return compressor
+
+
+def _zstd_decompressor():
+    decompressor = getattr(_zstd, "decompressor", None)
+    if decompressor is None:
+        decompressor = _zstd.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
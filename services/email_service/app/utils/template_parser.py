@@ -1,5 +1,7 @@
 import re
-from typing import Dict
+from typing import Any, Dict
+
+VARIABLE_PATTERN = re.compile(r'\{\{(\w+)\}\}')
 
 def parse_template_variables(template: str) -> list:
     """Extract variable names from template"""
@@ -11,3 +13,11 @@ def validate_variables(template: str, variables: Dict[str, str]) -> bool:
     """Check if all required variables are provided"""
     required_vars = parse_template_variables(template)
     return all(var in variables for var in required_vars)
+
+def render_template(template: str, variables: Dict[str, Any]) -> str:
+    """Substitute variables the way the template service renders them,
+    leaving placeholders without a value in place"""
+    return VARIABLE_PATTERN.sub(
+        lambda match: str(variables.get(match.group(1), match.group(0))),
+        template
+    )
@@ -0,0 +1,159 @@
+"""
+Email consumer throughput (messages/sec) against a stub provider.
+
+"before" replays the old pika consumer: one message at a time per process,
+each run on a new event loop that is created and closed around it. "after"
+is the current consumer, QueueConsumer._on_message as aio_pika calls it:
+every delivery a task on one loop, at most --concurrency processed at once
+and at most --prefetch unacked. Each message goes through the render, send
+and report stages (EMAIL_*_CONCURRENCY workers each) and is acked once it
+is sent, so the status update doesn't hold prefetch credit.
+
+No broker or network is involved. The provider is a blocking call of
+--send-ms (smtplib and requests block), the status update to the gateway an
+async wait of --status-ms, and the template comes from the local cache.
+
+    python -m benchmarks.bench_consumer --messages 500 --send-ms 50 --concurrency 1 10 50
+    python -m benchmarks.bench_consumer --skip-before --status-ms 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config.settings import settings
+from app.consumers.email_queue_consumer import EmailQueueConsumer
+from app.services import email_service
+from app.services.email_service import EmailService, run_blocking
+from app.services.sent_log import SentLog
+from app.services.status_updater import StatusUpdater
+from app.services.template_service import template_cache
+from app.utils import codec
+
+
+class StubIncomingMessage:
+    """What aio_pika hands the consumer; ack/nack give back prefetch credit"""
+
+    def __init__(self, body: bytes, content_type: str, credit: asyncio.Semaphore = None):
+        self.body = body
+        self.content_type = content_type
+        self.content_encoding = None
+        self.headers = {"x-published-at": time.time()}
+        self.priority = 5
+        self.credit = credit
+
+    async def ack(self):
+        if self.credit:
+            self.credit.release()
+
+    async def nack(self, requeue: bool = True):
+        raise RuntimeError("message failed, the stub provider should always succeed")
+
+
+def messages(count: int):
+    bodies = []
+    for _ in range(count):
+        body, content_type, _ = codec.encode({
+            "notification_id": str(uuid.uuid4()),
+            "correlation_id": str(uuid.uuid4()),
+            "to_email": "john.doe@example.com",
+            "template_id": "bench_welcome",
+            "variables": {"name": "John Doe", "link": "https://example.com/activate?token=abc123"},
+            "language": "en",
+            "priority": "5",
+        })
+        bodies.append((body, content_type))
+    return bodies
+
+
+def stub_dependencies(send_seconds: float, status_seconds: float, threads: int):
+    async def send(self, message, rendered_template, subject):
+        await run_blocking(time.sleep, send_seconds)
+        return True
+
+    async def update_status(self, status):
+        await asyncio.sleep(status_seconds)
+
+    async def was_sent(self, notification_id):
+        return False
+
+    async def mark_sent(self, notification_id):
+        pass
+
+    EmailService._send_via_smtp = send
+    StatusUpdater.update_status = update_status
+    SentLog.was_sent = was_sent
+    SentLog.mark_sent = mark_sent
+    email_service._send_executor = ThreadPoolExecutor(max_workers=threads)
+    template_cache.templates = {
+        ("bench_welcome", "en"): {
+            "logical_id": "bench_welcome",
+            "language": "en",
+            "subject": "Welcome {{name}}",
+            "body": "<p>Hi {{name}}, continue at {{link}}.</p>" * 20,
+        }
+    }
+
+
+def run_before(bodies) -> float:
+    consumer = EmailQueueConsumer(concurrency=1)
+    started = time.perf_counter()
+    for body, content_type in bodies:
+        message = StubIncomingMessage(body, content_type)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(consumer._process_message(message.body, message))
+        finally:
+            loop.close()
+    return time.perf_counter() - started
+
+
+async def run_after(bodies, concurrency: int, prefetch: int) -> float:
+    consumer = EmailQueueConsumer(concurrency=concurrency, prefetch_count=prefetch)
+    for stage in consumer.stages:
+        stage.start()
+    credit = asyncio.Semaphore(prefetch)
+    tasks = []
+    started = time.perf_counter()
+    for body, content_type in bodies:
+        # The broker stops delivering once `prefetch` messages are unacked
+        await credit.acquire()
+        message = StubIncomingMessage(body, content_type, credit)
+        tasks.append(asyncio.create_task(consumer._on_message(message)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await consumer.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--send-ms", type=float, default=50.0, help="blocking provider call per message")
+    parser.add_argument("--status-ms", type=float, default=5.0, help="status update to the gateway")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--prefetch", type=int, default=None, help="default: the concurrency")
+    parser.add_argument("--send-concurrency", type=int, default=None, help="default: the concurrency")
+    parser.add_argument("--skip-before", action="store_true")
+    args = parser.parse_args()
+
+    stub_dependencies(args.send_ms / 1000, args.status_ms / 1000, max(args.concurrency))
+    bodies = messages(args.messages)
+
+    print(f"{args.messages} messages, {args.send_ms:g}ms send, {args.status_ms:g}ms status update")
+    print(f"  {'':<28} {'messages/sec':>12}")
+    if not args.skip_before:
+        elapsed = run_before(bodies)
+        print(f"  {'before (pika, loop per msg)':<28} {args.messages / elapsed:>12.1f}")
+    for concurrency in args.concurrency:
+        prefetch = args.prefetch or concurrency
+        settings.email_send_concurrency = args.send_concurrency or concurrency
+        elapsed = asyncio.run(run_after(bodies, concurrency, prefetch))
+        label = f"after, {concurrency} in flight"
+        print(f"  {label:<28} {args.messages / elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmarks (pytest-benchmark) of email service code that runs for
+every message. From the repo root, scripts/run_benchmarks.sh runs them,
+saves a baseline and compares against it.
+
+    python -m pytest benchmarks --benchmark-only
+"""
+import logging
+import uuid
+
+import pytest
+
+from app.models.email_message import EmailMessage
+from app.utils import codec
+from app.utils.exponential_backoff import exponential_backoff
+from app.utils.logger import JSONFormatter
+
+MESSAGE = {
+    "notification_id": str(uuid.uuid4()),
+    "correlation_id": str(uuid.uuid4()),
+    "to_email": "john.doe@example.com",
+    "template_id": "welcome_email",
+    "variables": {"name": "John Doe", "link": "https://example.com/activate?token=abc123"},
+    "language": "en",
+    "priority": "1",
+    "retry_count": 0,
+}
+
+
+@pytest.mark.benchmark(group="message-parsing")
+def test_email_message(benchmark):
+    """EmailMessage(**data) as the consumers build it"""
+    benchmark(lambda: EmailMessage(**MESSAGE))
+
+
+@pytest.mark.benchmark(group="message-parsing")
+def test_decode_and_email_message(benchmark):
+    """The whole step from a queue body to an EmailMessage"""
+    body, content_type, content_encoding = codec.encode(MESSAGE)
+    benchmark(lambda: EmailMessage(**codec.decode(body, content_type, content_encoding)))
+
+
+@pytest.mark.benchmark(group="logging")
+def test_json_formatter(benchmark):
+    """The email_sent record, with its provider and notification_id"""
+    record = logging.makeLogRecord({
+        "msg": "Email sent successfully via smtp",
+        "levelno": logging.INFO,
+        "levelname": "INFO",
+        "event": "email_sent",
+        "notification_id": str(uuid.uuid4()),
+        "provider": "smtp",
+    })
+    benchmark(JSONFormatter().format, record)
+
+
+@pytest.mark.parametrize("retry_count", [1, 5, 20])
+@pytest.mark.benchmark(group="retry")
+def test_exponential_backoff(benchmark, retry_count):
+    benchmark(exponential_backoff, retry_count)
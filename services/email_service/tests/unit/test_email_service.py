@@ -1,7 +1,17 @@
+import asyncio
+import json
+import time
+import httpx
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from app.services.email_service import EmailService
 from app.models.email_message import EmailMessage
+from app.services.template_service import TemplateCache, TemplateServiceClient
+from app.consumers.queue_consumer import QueueConsumer
+from app.consumers.pipeline import Stage
+from app.services.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
+from app.consumers.email_queue_consumer import EmailQueueConsumer
+from app.consumers.retry_queue_consumer import RetryQueueConsumer
 
 
 class TestEmailService:
@@ -136,3 +146,348 @@ class TestEmailService:
             )
 
             assert result is False
+
+
+class TestTemplateServiceClient:
+    TEMPLATES = [
+        {"id": "t1", "logical_id": "welcome", "name": "Welcome", "language": "en",
+         "subject": "Welcome {{name}}", "body": "<h1>Hello {{name}}</h1><p>{{company}} {{missing}}</p>"},
+    ]
+
+    @pytest.fixture
+    def template_cache(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request.headers.get("if-none-match"))
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={
+                "success": True, "data": self.TEMPLATES, "meta": {"total": 1, "version": "v1"}
+            })
+
+        client_class = httpx.AsyncClient
+        with patch(
+            "app.services.template_service.httpx.AsyncClient",
+            lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs)
+        ):
+            cache = TemplateCache(base_url="http://template-service")
+            cache.requests = requests
+            yield cache
+
+    @pytest.mark.asyncio
+    async def test_cached_template_rendered_locally(self, template_cache):
+        """Once loaded, templates render without calling the template service"""
+        assert await template_cache.refresh() is True
+        client = TemplateServiceClient(template_cache)
+
+        with patch("app.services.template_service.httpx.AsyncClient") as http_client:
+            result = await client.get_rendered_template("welcome", {"name": "John", "company": "TestCo"})
+            http_client.assert_not_called()
+
+        assert result == {
+            "subject": "Welcome John",
+            "body": "<h1>Hello John</h1><p>TestCo {{missing}}</p>"
+        }
+
+    @pytest.mark.asyncio
+    async def test_unchanged_templates_not_reloaded(self, template_cache):
+        assert await template_cache.refresh() is True
+        assert await template_cache.refresh() is False
+        assert template_cache.requests == [None, '"v1"']
+        assert template_cache.get("welcome", "en")["id"] == "t1"
+        assert template_cache.get("welcome", "fr") is None
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_shared_state_read_off_the_event_loop(self):
+        """A slow Redis read delays the call, not every other task on the loop"""
+        def slow_get(key):
+            time.sleep(0.2)
+            return json.dumps({"state": "open", "open_until": time.time() + 60, "changed_at": time.time()})
+
+        breaker = CircuitBreaker("test-provider")
+        breaker._redis = Mock(get=slow_get)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call(AsyncMock(return_value=True))
+        ticking.cancel()
+
+        assert ticks >= 5
+        assert breaker.state == "open"
+
+
+class FakeIncomingMessage:
+    def __init__(self, body: bytes = b"{}"):
+        self.body = body
+        self.headers = {}
+        self.priority = 0
+        self.ack = AsyncMock()
+        self.nack = AsyncMock()
+
+
+class TestQueueConsumer:
+    class SlowConsumer(QueueConsumer):
+        name = "test"
+
+        def __init__(self, concurrency):
+            super().__init__(concurrency=concurrency)
+            self.active = 0
+            self.peak = 0
+
+        async def handle(self, message):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(0.02)
+                if message.body == b"bad":
+                    raise ValueError("cannot process")
+            finally:
+                self.active -= 1
+
+    @pytest.mark.asyncio
+    async def test_messages_processed_concurrently_up_to_limit(self):
+        consumer = self.SlowConsumer(concurrency=5)
+        messages = [FakeIncomingMessage() for _ in range(20)]
+
+        await asyncio.gather(*(consumer._on_message(message) for message in messages))
+
+        assert consumer.peak == 5
+        assert all(message.ack.await_count == 1 for message in messages)
+        assert not any(message.nack.await_count for message in messages)
+
+    @pytest.mark.asyncio
+    async def test_failed_message_nacked_when_its_task_ends(self):
+        consumer = self.SlowConsumer(concurrency=2)
+        good, bad = FakeIncomingMessage(), FakeIncomingMessage(b"bad")
+
+        await asyncio.gather(consumer._on_message(good), consumer._on_message(bad))
+
+        good.ack.assert_awaited_once()
+        bad.ack.assert_not_awaited()
+        bad.nack.assert_awaited_once_with(requeue=True)
+
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_messages_in_flight(self):
+        consumer = self.SlowConsumer(concurrency=2)
+        message = FakeIncomingMessage()
+        task = asyncio.create_task(consumer._on_message(message))
+        await asyncio.sleep(0)
+
+        await consumer.stop(timeout=1)
+
+        assert task.done()
+        message.ack.assert_awaited_once()
+
+
+class TestRetryQueueConsumer:
+    BODY = (
+        b'{"notification_id": "n1", "correlation_id": "c1", "to_email": "john@example.com",'
+        b' "template_id": "welcome", "variables": {}, "priority": "10", "retry_count": 1}'
+    )
+
+    @pytest.mark.asyncio
+    async def test_republished_at_its_priority(self):
+        consumer = RetryQueueConsumer()
+        message = FakeIncomingMessage(self.BODY)
+        with patch("app.services.retry_service.rabbitmq_manager") as manager:
+            manager.publish = AsyncMock()
+
+            await consumer._on_message(message)
+
+        assert manager.publish.await_args.kwargs["priority"] == 10
+        message.ack.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_republish_requeued(self):
+        consumer = RetryQueueConsumer()
+        message = FakeIncomingMessage(self.BODY)
+        with patch("app.services.retry_service.rabbitmq_manager") as manager:
+            manager.publish = AsyncMock(side_effect=ConnectionError("broker down"))
+
+            await consumer._on_message(message)
+
+        message.ack.assert_not_awaited()
+        message.nack.assert_awaited_once_with(requeue=True)
+
+
+class TestStage:
+    @pytest.mark.asyncio
+    async def test_results_passed_to_next_stage(self):
+        seen = []
+
+        async def double(item):
+            return item * 2 if item != 3 else None
+
+        async def collect(item):
+            seen.append(item)
+
+        last = Stage("test-last", collect, concurrency=1, queue_size=10)
+        first = Stage("test-first", double, concurrency=2, queue_size=10, next_stage=last)
+        first.start()
+        last.start()
+        for item in range(5):
+            await first.put(item)
+
+        await first.queue.join()
+        await last.stop(timeout=1)
+        await first.stop()
+
+        assert sorted(seen) == [0, 2, 4, 8]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_holds_back_producer(self):
+        release = asyncio.Event()
+
+        async def blocked(item):
+            await release.wait()
+
+        stage = Stage("test-bounded", blocked, concurrency=1, queue_size=1)
+        stage.start()
+        await stage.put(1)
+        await asyncio.sleep(0)
+        await stage.put(2)
+
+        put = asyncio.create_task(stage.put(3))
+        await asyncio.sleep(0.01)
+        assert not put.done()
+
+        release.set()
+        await asyncio.wait_for(put, 1)
+        await stage.stop(timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_handler_error_reported_and_worker_kept(self):
+        errors = []
+
+        async def handler(item):
+            if item == 1:
+                raise ValueError("bad item")
+            return item
+
+        async def collect(item):
+            errors.append(("ok", item))
+
+        last = Stage("test-errors-last", collect, concurrency=1, queue_size=10)
+        stage = Stage(
+            "test-errors", handler, concurrency=1, queue_size=10, next_stage=last,
+            on_error=lambda item, error: errors.append((item, str(error)))
+        )
+        stage.start()
+        last.start()
+        await stage.put(1)
+        await stage.put(2)
+
+        await stage.queue.join()
+        await last.stop(timeout=1)
+        await stage.stop()
+
+        assert errors == [(1, "bad item"), ("ok", 2)]
+
+
+class TestEmailQueueConsumer:
+    @pytest.fixture
+    def consumer(self):
+        consumer = EmailQueueConsumer(concurrency=2)
+        consumer.template_client.get_rendered_template = AsyncMock(
+            return_value={"subject": "Hi", "body": "<p>Hi</p>"}
+        )
+        consumer.email_service.send_email = AsyncMock(return_value=True)
+        consumer.retry_service.retry_message = AsyncMock()
+        consumer.status_updater.update_status = AsyncMock()
+        consumer.sent_log.was_sent = AsyncMock(return_value=False)
+        consumer.sent_log.mark_sent = AsyncMock()
+        return consumer
+
+    @staticmethod
+    def message():
+        return FakeIncomingMessage(
+            b'{"notification_id": "n1", "correlation_id": "c1", "to_email": "john@example.com",'
+            b' "template_id": "welcome", "variables": {"name": "John"}}'
+        )
+
+    @pytest.mark.asyncio
+    async def test_acked_before_status_reported(self, consumer):
+        reported = asyncio.Event()
+
+        async def slow_update(status):
+            await reported.wait()
+
+        consumer.status_updater.update_status = AsyncMock(side_effect=slow_update)
+        for stage in consumer.stages:
+            stage.start()
+        message = self.message()
+
+        await asyncio.wait_for(consumer._on_message(message), 1)
+
+        message.ack.assert_awaited_once()
+        assert not reported.is_set()
+        reported.set()
+        await consumer.stop(timeout=1)
+        consumer.status_updater.update_status.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_send_failure_retried_and_acked(self, consumer):
+        consumer.email_service.send_email = AsyncMock(return_value=False)
+        for stage in consumer.stages:
+            stage.start()
+        message = self.message()
+
+        await asyncio.wait_for(consumer._on_message(message), 1)
+        await consumer.stop(timeout=1)
+
+        consumer.retry_service.retry_message.assert_awaited_once()
+        message.ack.assert_awaited_once()
+        consumer.status_updater.update_status.assert_not_awaited()
+        consumer.sent_log.mark_sent.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unhandled_stage_error_requeues_instead_of_hanging(self, consumer):
+        consumer.sent_log.was_sent = AsyncMock(side_effect=ConnectionError("redis down"))
+        for stage in consumer.stages:
+            stage.start()
+        message = self.message()
+
+        await asyncio.wait_for(consumer._on_message(message), 1)
+        await consumer.stop(timeout=1)
+
+        consumer.email_service.send_email.assert_not_awaited()
+        message.nack.assert_awaited_once_with(requeue=True)
+
+    @pytest.mark.asyncio
+    async def test_undecodable_message_dead_lettered_not_requeued(self, consumer):
+        consumer.retry_service.dead_letter_undecodable = AsyncMock()
+        for stage in consumer.stages:
+            stage.start()
+        message = FakeIncomingMessage(b"\x00\x01")
+        message.content_type = "application/x-unknown"
+        message.content_encoding = None
+
+        await asyncio.wait_for(consumer._on_message(message), 1)
+        await consumer.stop(timeout=1)
+
+        consumer.retry_service.dead_letter_undecodable.assert_awaited_once()
+        assert consumer.retry_service.dead_letter_undecodable.await_args.args[:2] == (
+            b"\x00\x01", "application/x-unknown"
+        )
+        message.ack.assert_awaited_once()
+        message.nack.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_already_sent_message_acked_without_sending(self, consumer):
+        consumer.sent_log.was_sent = AsyncMock(return_value=True)
+        message = self.message()
+
+        await consumer._process_message(message.body, message)
+
+        consumer.email_service.send_email.assert_not_awaited()
+        consumer.status_updater.update_status.assert_not_awaited()
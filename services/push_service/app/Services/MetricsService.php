@@ -139,6 +139,24 @@ public function recordDuration(float $seconds): void
         );
     }
 
+    /**
+     * Record how long a message waited in the queue before being consumed
+     *
+     * @param int $priority AMQP message priority
+     * @param float $seconds Wait time in seconds
+     */
+    public function recordQueueWait(int $priority, float $seconds): void
+    {
+        $histogram = $this->registry->getOrRegisterHistogram(
+            $this->namespace,
+            'queue_wait_seconds',
+            'Time from the gateway publishing a message to it being consumed',
+            ['priority'],
+            [0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600]
+        );
+        $histogram->observe($seconds, [(string) $priority]);
+    }
+
     /**
      * Update queue metrics (messages ready, unacknowledged, and lag)
      */
@@ -4,6 +4,7 @@
 
 use PhpAmqpLib\Connection\AMQPStreamConnection;
 use PhpAmqpLib\Message\AMQPMessage;
+use PhpAmqpLib\Wire\AMQPTable;
 use App\Traits\JsonLogging;
 
 /**
@@ -48,11 +49,16 @@ private function connect(): void
 
         $this->channel = $this->connection->channel();
         $this->channel->exchange_declare($config['exchange'], 'direct', false, true, false);
-        $this->channel->queue_declare($config['queues']['push'], false, true, false, false);
+        $this->channel->queue_declare(
+            $config['queues']['push'], false, true, false, false, false,
+            new AMQPTable(['x-max-priority' => $config['max_priority']])
+        );
+        // Declared as before so it can be drained; it is no longer bound
+        $this->channel->queue_declare($config['queues']['push_legacy'], false, true, false, false);
         $this->channel->queue_declare($config['queues']['failed'], false, true, false, false);
         $this->channel->queue_bind($config['queues']['push'], $config['exchange'], 'push');
 
-        $this->channel->basic_qos(null, 1, null);
+        $this->channel->basic_qos(null, $config['prefetch_count'], null);
 
         $this->logJson('info', $this->serviceName, 'rabbitmq_connected', 'RabbitMQ connection and queues established');
     }
@@ -68,6 +74,7 @@ public function consume(): void
     {
         $callback = function (AMQPMessage $msg) {
             $this->metrics->incrementMessagesConsumed();
+            $this->recordQueueWait($msg);
             $start = microtime(true);
             $data = null;
 
@@ -114,7 +121,9 @@ public function consume(): void
             }
         };
 
+        // The legacy queue gets no new messages, consuming it drains it
         $this->channel->basic_consume(config('rabbitmq.queues.push'), '', false, false, false, false, $callback);
+        $this->channel->basic_consume(config('rabbitmq.queues.push_legacy'), '', false, false, false, false, $callback);
 
         $this->logJson('info', $this->serviceName, 'waiting_for_messages', 'Waiting for messages from RabbitMQ...');
 
@@ -124,6 +133,25 @@ public function consume(): void
     }
 
 
+    /**
+     * Record how long a message waited in the queue, per priority.
+     *
+     * @param AMQPMessage $msg
+     * @return void
+     */
+    private function recordQueueWait(AMQPMessage $msg): void
+    {
+        if (!$msg->has('application_headers')) {
+            return;
+        }
+        $headers = $msg->get('application_headers')->getNativeData();
+        if (!isset($headers['x-published-at'])) {
+            return;
+        }
+        $priority = $msg->has('priority') ? (int) $msg->get('priority') : 0;
+        $this->metrics->recordQueueWait($priority, max(0, microtime(true) - (float) $headers['x-published-at']));
+    }
+
     /**
      * Move a failed message to the dead-letter queue.
      *
@@ -10,9 +10,14 @@
     'vhost' => env('RABBITMQ_VHOST', '/'),
     'exchange' => env('RABBITMQ_EXCHANGE', 'notifications.direct'),
     'queues' => [
-        'push' => env('RABBITMQ_QUEUE_PUSH', 'push.queue'),
+        'push' => env('RABBITMQ_QUEUE_PUSH', 'push.priority.queue'),
+        // FIFO queue replaced by the priority queue, consumed until empty
+        'push_legacy' => env('RABBITMQ_QUEUE_PUSH_LEGACY', 'push.queue'),
         'failed' => env('RABBITMQ_QUEUE_FAILED', 'failed.queue'),
     ],
+    'max_priority' => (int) env('RABBITMQ_MAX_PRIORITY', 10),
+    // Messages already delivered can't be overtaken, keep this low
+    'prefetch_count' => (int) env('RABBITMQ_PREFETCH_COUNT', 1),
 
     // Management API for MetricsService
     'management_host' => env('RABBITMQ_MANAGEMENT_HOST', '127.0.0.1'),
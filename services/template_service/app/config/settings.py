@@ -22,6 +22,10 @@ class Settings(BaseSettings):
     redis_port: int = int(os.getenv("REDIS_PORT", 6379))
     redis_db: int = int(os.getenv("REDIS_DB", 0))
 
+    # Dependency health probes, run in the background; /api/health serves the last result
+    health_check_interval: float = float(os.getenv("HEALTH_CHECK_INTERVAL", 5.0))
+    health_check_timeout: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", 2.0))
+
     # Cache settings
     cache_ttl: int = int(os.getenv("CACHE_TTL", 3600))
 
@@ -1,10 +1,13 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.config.database import init_db
+from app.middleware.correlation_id import CorrelationIdMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from app.routers.health import router as health_router
 from app.routers.metrics import router as metrics_router
 from app.routers.template import router as template_router
 from app.routers.version import router as version_router
+from app.services.health_monitor import health_monitor
 from app.utils.logger import logger
 from seeds.default_templates import seed_default_data
 
@@ -19,9 +22,11 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to initialize Template Service: {e}")
         raise
+    await health_monitor.start()
     yield
     # Shutdown
     logger.info("Shutting down Template Service", extra={"service_name": "template-service", "event": "service_shutdown"})
+    await health_monitor.stop()
 
 app = FastAPI(
     title="Template Service",
@@ -30,6 +35,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(CorrelationIdMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(health_router, prefix="/api", tags=["health"])
 app.include_router(metrics_router, prefix="/api", tags=["metrics"])
 app.include_router(template_router, prefix="/api", tags=["templates"])
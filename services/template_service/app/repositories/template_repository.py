@@ -40,6 +40,15 @@ class TemplateRepository:
     def get_templates(self, skip: int = 0, limit: int = 100) -> List[Template]:
         return self.db.query(Template).offset(skip).limit(limit).all()
 
+    def list_templates(self, logical_ids: Optional[List[str]] = None, language: Optional[str] = None) -> List[Template]:
+        """Every template, or those with the given logical IDs, in one query"""
+        query = self.db.query(Template)
+        if logical_ids is not None:
+            query = query.filter(Template.logical_id.in_(logical_ids))
+        if language:
+            query = query.filter(Template.language == language)
+        return query.order_by(Template.logical_id, Template.language).all()
+
     def update_template(self, template_id: str, template_update: Union[TemplateUpdate, Dict]) -> Optional[Template]:
         db_template = self.get_template_by_id(template_id)
         if db_template:
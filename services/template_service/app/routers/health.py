@@ -1,44 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
 from datetime import datetime
-import redis
-from sqlalchemy import text
 from app.config.settings import settings
-from app.config.database import engine
+from app.services.health_monitor import health_monitor
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
-    checks = {
-        "database": "healthy",
-        "redis": "healthy"
-    }
-
-    try:
-        # Test database connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-    except Exception:
-        checks["database"] = "unhealthy"
-
-    try:
-        # Test Redis connection
-        redis_client = redis.Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            db=settings.redis_db
-        )
-        redis_client.ping()
-    except Exception:
-        checks["redis"] = "unhealthy"
+    # Probes run in the background (app.services.health_monitor), this only
+    # reads their last result
+    snapshot = health_monitor.snapshot()
+    checks = {name: result["status"] for name, result in snapshot["checks"].items()}
 
     status = "healthy"
-    if "unhealthy" in checks.values():
+    if any(value != "healthy" for value in checks.values()):
         status = "degraded"
 
     return {
         "status": status,
         "service": settings.service_name,
         "timestamp": datetime.utcnow().isoformat() + "Z",
-        "checks": checks
+        "checks": checks,
+        "details": snapshot["checks"],
+        "checked_at": snapshot["checked_at"],
+        "age_seconds": snapshot["age_seconds"]
     }
@@ -43,6 +43,12 @@ VERSION_COUNT_TOTAL = prometheus_client.Gauge(
     'Total template versions stored'
 )
 
+DEPENDENCY_UP = prometheus_client.Gauge(
+    'template_service_dependency_up',
+    'Whether the last health probe of a dependency succeeded (1 = up, 0 = down)',
+    ['dependency']
+)
+
 @router.get("/metrics")
 async def metrics():
     return Response(
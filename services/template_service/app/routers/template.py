@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.config.database import get_db
 from app.services.template_service import TemplateService
 from app.schemas.template_schema import (
-    TemplateCreate, TemplateUpdate, Template, TemplateResponse, TemplateRenderRequest
+    TemplateCreate, TemplateUpdate, Template, TemplateResponse, TemplateListResponse,
+    TemplateRenderRequest
 )
 from app.utils.logger import logger
 
@@ -35,6 +37,39 @@ async def create_template(
         logger.error(f"Failed to create template: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/templates", response_model=TemplateListResponse)
+async def list_templates(
+    request: Request,
+    response: Response,
+    ids: Optional[str] = None,
+    language: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk fetch: every template, or the comma-separated logical IDs in `ids`.
+    meta.version (also the ETag) changes whenever a template does, so
+    callers refreshing a cache send If-None-Match and get a 304 otherwise.
+    """
+    try:
+        service = TemplateService(db)
+        logical_ids = [i for i in ids.split(",") if i] if ids is not None else None
+        templates, version = service.list_templates(logical_ids, language)
+
+        etag = f'"{version}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+        return TemplateListResponse(
+            success=True,
+            data=templates,
+            message="Templates retrieved successfully",
+            meta={"total": len(templates), "version": version}
+        )
+    except Exception as e:
+        logger.error(f"Failed to list templates: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/templates/{template_id}", response_model=TemplateResponse)
 async def get_template(
     template_id: str,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class TemplateBase(BaseModel):
@@ -40,3 +40,10 @@ class TemplateResponse(BaseModel):
     error: Optional[str] = None
     message: str
     meta: Optional[Dict] = None
+
+class TemplateListResponse(BaseModel):
+    success: bool
+    data: List[Template] = []
+    error: Optional[str] = None
+    message: str
+    meta: Optional[Dict] = None
@@ -3,6 +3,10 @@ import json
 from typing import Any, Optional
 from app.config.settings import settings
 
+# Shared with the API gateway: keys (or key prefixes ending in ":") published
+# here are dropped from the gateway workers' in-process caches
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
 class CacheService:
     def __init__(self):
         self.redis_client = redis.Redis(
@@ -32,3 +36,10 @@ class CacheService:
             return self.redis_client.delete(key) > 0
         except Exception:
             return False
+
+    def publish_invalidation(self, key: str) -> bool:
+        try:
+            self.redis_client.publish(CACHE_INVALIDATION_CHANNEL, key)
+            return True
+        except Exception:
+            return False
@@ -1,5 +1,7 @@
 import re
-from typing import Dict, Any, Optional
+import json
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
 from app.repositories.template_repository import TemplateRepository
 from app.repositories.version_repository import VersionRepository
 from app.services.cache_service import CacheService
@@ -59,6 +61,24 @@ class TemplateService:
             logger.info(f"Cached template: {logical_id}")
         return template
 
+    def list_templates(self, logical_ids: Optional[List[str]] = None, language: Optional[str] = None) -> Tuple[List[dict], str]:
+        """
+        Templates for bulk fetches and cache warm-up, with a version marker
+        that changes whenever one of them is created, updated or deleted
+        """
+        templates = [
+            self._template_to_dict(template)
+            for template in self.template_repo.list_templates(logical_ids, language)
+        ]
+        return templates, self.templates_version(templates)
+
+    @staticmethod
+    def templates_version(templates: List[dict]) -> str:
+        digest = hashlib.sha1()
+        for template in templates:
+            digest.update(json.dumps(template, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:16]
+
     def get_template_by_id(self, template_id: str):
         # Try cache first
         cache_key = f"template:id:{template_id}"
@@ -95,6 +115,7 @@ class TemplateService:
             cache_key_id = f"template:id:{template_id}"
             self.cache_service.delete(cache_key)
             self.cache_service.delete(cache_key_id)
+            self.cache_service.publish_invalidation(f"template:{template.logical_id}:")
             logger.info(f"Invalidated cache for template: {template.logical_id}")
         
         return template
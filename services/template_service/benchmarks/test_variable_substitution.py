@@ -0,0 +1,57 @@
+"""
+Micro-benchmarks (pytest-benchmark) of template variable substitution.
+From the repo root, scripts/run_benchmarks.sh runs them, saves a baseline
+and compares against it.
+
+    python -m pytest benchmarks --benchmark-only
+"""
+import pytest
+
+from app.services.variable_substitution import VariableSubstitutionService
+
+VARIABLES = {
+    "name": "John Doe",
+    "company": "Example Inc",
+    "link": "https://example.com/activate?token=abc123",
+    "order_id": "ORD-2024-000123",
+    "amount": 149.99,
+    "support_email": "support@example.com",
+}
+
+# A typical transactional email: ~2 KB of HTML and a dozen placeholders
+REALISTIC = (
+    "<html><body><h1>Hello {{name}}</h1>"
+    "<p>Thanks for your order {{order_id}} from {{company}}.</p>"
+    "<p>Total charged: {{amount}}. Track it at <a href='{{link}}'>{{link}}</a>.</p>"
+    + "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua.</p>" * 12
+    + "<p>Questions? Write to {{support_email}} or reply to this email, {{name}}.</p>"
+    "<p>{{unsubscribe_link}}</p></body></html>"
+)
+
+# A newsletter-sized body: ~1 MB with thousands of placeholders
+LARGE = REALISTIC * 500
+
+# A large body without any placeholder, only the scan
+LARGE_PLAIN = "<p>" + "x" * (1024 * 1024) + "</p>"
+
+BODIES = {"realistic": REALISTIC, "large": LARGE, "large-plain": LARGE_PLAIN}
+
+
+@pytest.fixture(scope="module")
+def service():
+    return VariableSubstitutionService()
+
+
+@pytest.mark.parametrize("body", list(BODIES))
+@pytest.mark.benchmark(group="substitute")
+def test_substitute(benchmark, service, body):
+    result = benchmark(service.substitute, BODIES[body], VARIABLES)
+    assert "{{name}}" not in result
+
+
+@pytest.mark.benchmark(group="substitute")
+def test_substitute_missing_variables(benchmark, service):
+    """Placeholders without a value are left in place"""
+    result = benchmark(service.substitute, REALISTIC, {})
+    assert "{{name}}" in result
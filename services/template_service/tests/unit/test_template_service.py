@@ -93,6 +93,21 @@ class TestTemplateService:
 
             assert result is None
 
+    def test_list_templates_version(self, template_service, sample_template):
+        """The bulk fetch's version marker changes when a template does"""
+        sample_template.logical_id = "welcome"
+        template_service.template_repo = Mock()
+        template_service.template_repo.list_templates.return_value = [sample_template]
+
+        templates, version = template_service.list_templates(["welcome"])
+
+        assert [t["logical_id"] for t in templates] == ["welcome"]
+        template_service.template_repo.list_templates.assert_called_once_with(["welcome"], None)
+        assert template_service.list_templates()[1] == version
+
+        sample_template.updated_at = "2024-06-01 12:00:00+00:00"
+        assert template_service.list_templates()[1] != version
+
 
 class TestVariableSubstitutionService:
     @pytest.fixture
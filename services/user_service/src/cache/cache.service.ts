@@ -2,6 +2,10 @@ import { Injectable, OnModuleInit, OnModuleDestroy } from '@nestjs/common';
 import { ConfigService } from '@nestjs/config';
 import Redis from 'ioredis';
 
+// Shared with the API gateway: keys published here are dropped from the
+// gateway workers' in-process caches
+export const CACHE_INVALIDATION_CHANNEL = 'cache:invalidate';
+
 @Injectable()
 export class CacheService implements OnModuleInit, OnModuleDestroy {
   private redisClient: Redis;
@@ -143,6 +147,18 @@ export class CacheService implements OnModuleInit, OnModuleDestroy {
     }
   }
 
+  /**
+   * Publish a message on a pub/sub channel
+   */
+  async publish(channel: string, message: string): Promise<number> {
+    try {
+      return await this.redisClient.publish(channel, message);
+    } catch (error) {
+      console.error(`Error publishing to channel ${channel}:`, error);
+      throw error;
+    }
+  }
+
   /**
    * Get Redis connection status
    */
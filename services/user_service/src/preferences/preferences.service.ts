@@ -1,6 +1,9 @@
 import { Injectable, NotFoundException } from '@nestjs/common';
 import { PreferencesRepository } from './preferences.repository';
-import { CacheService } from '../cache/cache.service';
+import {
+  CacheService,
+  CACHE_INVALIDATION_CHANNEL,
+} from '../cache/cache.service';
 import { UpdatePreferenceDto } from './dto/update-preference.dto';
 import { UserPreference } from './entities/preference.entity';
 
@@ -105,5 +108,10 @@ export class PreferencesService {
    */
   private async invalidatePreferencesCache(userId: string): Promise<void> {
     await this.cacheService.delete(`user:${userId}:preferences`);
+    // The API gateway caches preferences inside the user payload
+    await this.cacheService.publish(
+      CACHE_INVALIDATION_CHANNEL,
+      `user:${userId}`,
+    );
   }
 }
@@ -4,7 +4,10 @@ import {
   //   ForbiddenException,
 } from '@nestjs/common';
 import { UsersRepository } from './users.repository';
-import { CacheService } from '../cache/cache.service';
+import {
+  CacheService,
+  CACHE_INVALIDATION_CHANNEL,
+} from '../cache/cache.service';
 import { CreateUserDto } from './dto/create-user.dto';
 import { UpdateUserDto } from './dto/update-user.dto';
 import { UpdateContactInfoDto } from './dto/update-contact-info.dto';
@@ -241,5 +244,10 @@ export class UsersService {
   ): Promise<void> {
     await this.cacheService.delete(`user:${userId}`);
     await this.cacheService.delete(`user:${email}:id`);
+    // Tell API gateway workers to drop their in-process copy of this user
+    await this.cacheService.publish(
+      CACHE_INVALIDATION_CHANNEL,
+      `user:${userId}`,
+    );
   }
 }